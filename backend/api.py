@@ -1,16 +1,29 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import sys
 import os
+import json
+import logging
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from search.search_engine import SpaceBiologySearchEngine
+from search.retrieval_methods import BM25Retrieval, DenseEmbeddingRetrieval
+from search.result_cache import ResultCache, SQLiteCacheBackend, json_default
+from search.instrumentation import render_counters
+from search.fanout import shared_executor
+from search.transformer_reranker import TransformerCrossEncoderReranker, HAS_TRANSFORMERS
 from kg.kg_storage import KGStorage
 from kg.kg_builder import KnowledgeGraphBuilder
+from kg.kg_schema import EvidenceTriple
+from corpus.passage_store import PassageStore
 
 app = Flask(__name__)
 CORS(app)
 
+# LOG_LEVEL=DEBUG logs one record per search with its stage timings
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'WARNING'),
+                    format='%(asctime)s %(levelname)s %(name)s %(message)s')
+
 # Initialize knowledge graph and search engine
 kg_storage = KGStorage('biology_kg.db')
 
@@ -20,13 +33,69 @@ if not triples:
     from populate_kg import populate_sample_data
     populate_sample_data()
 
-# Get documents from KG evidence
-triples = kg_storage.get_evidence_triples_ranked(0.0)
-documents = [t.evidence for t in triples if t.evidence]
-if not documents:
+# Search the chunked corpus (build_passages.py) when available, otherwise the KG evidence
+passage_store_dir = os.environ.get('PASSAGE_STORE_DIR', 'passages')
+documents_from_kg = not os.path.isdir(passage_store_dir)
+if not documents_from_kg:
+    documents = PassageStore(passage_store_dir)
+    print(f"Loaded {len(documents)} passages from {passage_store_dir}")
+else:
+    triples = kg_storage.get_evidence_triples_ranked(0.0)
+    documents = [t.evidence for t in triples if t.evidence]
+if not len(documents):
     documents = ["No knowledge graph data available"]
 
-search_engine = SpaceBiologySearchEngine(documents, kg_storage)
+# Optional BM25 backend, built offline with build_bm25_index.py over the same documents
+sparse_backend = None
+bm25_index_dir = os.environ.get('BM25_INDEX_DIR')
+if bm25_index_dir and os.path.isdir(bm25_index_dir):
+    sparse_backend = BM25Retrieval.open(bm25_index_dir)
+    if sparse_backend.index.num_docs != len(documents):
+        print(f"BM25 index {bm25_index_dir} has {sparse_backend.index.num_docs} documents, "
+              f"expected {len(documents)}; falling back to TF-IDF")
+        sparse_backend = None
+
+# Optional prebuilt embeddings + ANN index, built offline with build_dense_index.py
+dense_backend = None
+dense_index_dir = os.environ.get('DENSE_INDEX_DIR')
+if dense_index_dir and os.path.isdir(dense_index_dir):
+    dense_backend = DenseEmbeddingRetrieval.open(dense_index_dir, documents)
+    if dense_backend.index.num_docs != len(documents):
+        print(f"Dense index {dense_index_dir} has {dense_backend.index.num_docs} documents, "
+              f"expected {len(documents)}; falling back to in-memory embeddings")
+        dense_backend = None
+
+# Optional local transformer cross-encoder; the TF-IDF reranker is used otherwise
+reranker = None
+cross_encoder_model = os.environ.get('CROSS_ENCODER_MODEL')
+if cross_encoder_model:
+    if HAS_TRANSFORMERS and os.path.isdir(cross_encoder_model):
+        deadline_ms = os.environ.get('RERANK_DEADLINE_MS')
+        reranker = TransformerCrossEncoderReranker(
+            cross_encoder_model, deadline_ms=float(deadline_ms) if deadline_ms else None)
+    else:
+        print(f"Cross-encoder {cross_encoder_model} unavailable (needs transformers, torch and a local model); "
+              f"falling back to TF-IDF reranking")
+
+# Search result cache; RESULT_CACHE_DB adds a SQLite file shared by all workers on the host
+result_cache = None
+if os.environ.get('RESULT_CACHE_SIZE', '1024') != '0':
+    result_cache_db = os.environ.get('RESULT_CACHE_DB')
+    result_cache = ResultCache(maxsize=int(os.environ.get('RESULT_CACHE_SIZE', '1024')),
+                               ttl=float(os.environ.get('RESULT_CACHE_TTL', '300')),
+                               backend=SQLiteCacheBackend(result_cache_db) if result_cache_db else None)
+
+# RETRIEVAL_FANOUT=1 runs the retrievers and the evidence lookup concurrently;
+# RETRIEVER_TIMEOUTS_MS (e.g. "dense=50,evidence=80") drops slow ones from fusion
+executor = shared_executor() if os.environ.get('RETRIEVAL_FANOUT') == '1' else None
+retriever_timeouts = {}
+for item in filter(None, os.environ.get('RETRIEVER_TIMEOUTS_MS', '').split(',')):
+    method, ms = item.split('=')
+    retriever_timeouts[method.strip()] = float(ms) / 1000.0
+
+search_engine = SpaceBiologySearchEngine(documents, kg_storage, sparse=sparse_backend, dense=dense_backend,
+                                         reranker=reranker, result_cache=result_cache,
+                                         executor=executor, retriever_timeouts=retriever_timeouts)
 
 @app.route('/api/search', methods=['POST'])
 def search():
@@ -49,6 +118,41 @@ def search():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/search/batch', methods=['POST'])
+def search_batch():
+    """
+    Search many queries in one request, streaming one NDJSON line per query as it finishes
+    
+    With "methods": true each line carries the per-method results of /api/methods instead.
+    """
+    try:
+        data = request.get_json()
+        queries = data.get('queries', [])
+        top_k = data.get('top_k', 10)
+        use_mmr = data.get('use_mmr', False)
+        methods = data.get('methods', False)
+        
+        if not queries or not all(queries):
+            return jsonify({'error': 'Queries are required'}), 400
+        
+        def generate():
+            try:
+                if methods:
+                    for i, results in enumerate(search_engine.retrieval.retrieve_all_batch(queries, top_k)):
+                        yield json.dumps({'index': i, 'query': queries[i], 'method_results': results},
+                                         default=json_default) + "\n"
+                else:
+                    for i, results in search_engine.iter_search_batch(queries, top_k, use_mmr):
+                        yield json.dumps({'index': i, 'query': queries[i], 'results': results,
+                                          'total': len(results)}, default=json_default) + "\n"
+            except Exception as e:
+                yield json.dumps({'error': str(e)}) + "\n"
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/methods', methods=['POST'])
 def get_method_results():
     try:
@@ -96,5 +200,72 @@ def query_kg():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/documents', methods=['POST'])
+def add_documents():
+    try:
+        data = request.get_json()
+        texts = data.get('documents', [])
+        
+        if not texts:
+            return jsonify({'error': 'Documents are required'}), 400
+        
+        document_ids = search_engine.add_documents(texts)
+        
+        return jsonify({
+            'document_ids': document_ids,
+            'total': len(document_ids)
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/kg/triples', methods=['POST'])
+def add_triples():
+    try:
+        data = request.get_json()
+        items = data.get('triples', [])
+        
+        if not items:
+            return jsonify({'error': 'Triples are required'}), 400
+        
+        triples = [EvidenceTriple(
+            subject=t['subject'],
+            predicate=t['predicate'],
+            object=t['object'],
+            evidence=t.get('evidence', ''),
+            confidence=float(t.get('confidence', 0.5)),
+            source_id=t.get('source_id', '')
+        ) for t in items]
+        
+        # Without a passage store the searched documents are the KG evidence
+        document_ids = search_engine.add_triples(triples, add_evidence_documents=documents_from_kg)
+        
+        return jsonify({
+            'document_ids': document_ids,
+            'total': len(triples)
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    if result_cache is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **result_cache.stats()})
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    text = search_engine.metrics.render_prometheus()
+    if result_cache is not None:
+        stats = result_cache.stats()
+        text += render_counters('search_result_cache_events_total', 'Result cache lookups, evictions and expirations',
+                                {event: stats[event] for event in ('hits', 'shared_hits', 'misses',
+                                                                   'evictions', 'expirations')},
+                                label='event')
+    text += render_counters('search_retriever_timeouts_total', 'Retrieval methods dropped from fusion by their timeout',
+                            dict(search_engine.retrieval.timed_out), label='method')
+    return Response(text, mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
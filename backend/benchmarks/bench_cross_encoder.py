@@ -0,0 +1,59 @@
+"""Benchmark CrossEncoderReranker.rerank: per-candidate scoring vs one batched product"""
+import sys
+import os
+import time
+from pathlib import Path
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search.cross_encoder_reranker import CrossEncoderReranker
+from corpus.chunking import iter_passages
+
+CORPUS_DIR = Path(__file__).parent.parent.parent / 'sorted'
+QUERIES = ['microgravity bone loss', 'plant root gravitropism in spaceflight',
+           'radiation induced DNA damage in mice', 'muscle atrophy hindlimb unloading']
+
+def legacy_rerank(reranker, query, candidates, documents):
+    """The previous per-candidate loop, kept for comparison"""
+    reranked = []
+    for item_id, initial_score in candidates:
+        if documents and isinstance(item_id, (int, np.integer)):
+            doc_text = documents[item_id]
+        elif isinstance(item_id, str):
+            doc_text = item_id
+        else:
+            doc_text = str(item_id)
+        final_score = 0.7 * reranker.score_query_document(query, doc_text) + 0.3 * initial_score
+        reranked.append((item_id, final_score))
+    return sorted(reranked, key=lambda x: x[1], reverse=True)
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+def main():
+    documents = [p.text for p in iter_passages(CORPUS_DIR)]
+    reranker = CrossEncoderReranker()
+    reranker.fit(documents)
+    rng = np.random.default_rng(0)
+    print(f"{len(documents)} passages")
+    print(f"{'candidates':>10} {'legacy ms':>10} {'batched ms':>11} {'speedup':>8} {'max diff':>9}")
+    for num_candidates in [20, 100, 1000]:
+        legacy_total = batched_total = 0.0
+        max_diff = 0.0
+        for query in QUERIES:
+            ids = rng.choice(len(documents), size=num_candidates, replace=False)
+            candidates = [(int(i), 1.0 / (rank + 60)) for rank, i in enumerate(ids)]
+            legacy_ms, legacy = timed(lambda: legacy_rerank(reranker, query, candidates, documents), 1)
+            batched_ms, batched = timed(lambda: reranker.rerank(query, candidates, documents), 5)
+            legacy_scores = dict(legacy)
+            max_diff = max(max_diff, max(abs(score - legacy_scores[item]) for item, score in batched))
+            legacy_total += legacy_ms
+            batched_total += batched_ms
+        print(f"{num_candidates:>10} {legacy_total / len(QUERIES):>10.2f} {batched_total / len(QUERIES):>11.2f} "
+              f"{legacy_total / batched_total:>7.0f}x {max_diff:>9.1e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Recall@k and latency of IVF search against exact search over the same embeddings"""
+import sys
+import os
+import time
+from pathlib import Path
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search.dense_index import DenseIndex, HashingEncoder, encode_in_batches
+
+CORPUS_DIR = Path(__file__).parent.parent.parent / 'sorted'
+
+def corpus_passages(max_chars=1000):
+    """Fixed-size passages from the sorted/ corpus, enough rows to make ANN worthwhile"""
+    for path in sorted(CORPUS_DIR.glob('PMC*.txt')):
+        text = path.read_text(encoding='utf-8')
+        for start in range(0, len(text), max_chars):
+            yield text[start:start + max_chars]
+
+def top_k(ids, scores, k):
+    order = np.argsort(-scores, kind='stable')[:k]
+    return set(np.asarray(ids)[order].tolist())
+
+def main(k=10, num_queries=200):
+    encoder = HashingEncoder()
+    embeddings = encode_in_batches(encoder, corpus_passages())
+    index = DenseIndex.from_embeddings(embeddings, encoder)
+    print(f"{index.num_docs} passages, {index.nlist} IVF lists, dim {encoder.dim}")
+
+    # Queries: perturbed passages, so every query has meaningful neighbours
+    rng = np.random.default_rng(0)
+    queries = embeddings[rng.choice(len(embeddings), size=num_queries, replace=False)]
+    queries = queries + rng.normal(scale=0.02, size=queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    start = time.perf_counter()
+    exact = [top_k(*index.search(q), k) for q in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / num_queries
+    print(f"{'nprobe':>7} {'recall@' + str(k):>10} {'ms/query':>9}")
+    print(f"{'exact':>7} {1.0:>10.3f} {exact_ms:>9.3f}")
+
+    for nprobe in [1, 4, 8, 16, 32]:
+        start = time.perf_counter()
+        approx = [top_k(*index.search(q, nprobe), k) for q in queries]
+        ms = (time.perf_counter() - start) * 1000 / num_queries
+        recall = np.mean([len(a & e) / len(e) for a, e in zip(approx, exact)])
+        print(f"{nprobe:>7} {recall:>10.3f} {ms:>9.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Retrieval latency over the corpus passages: methods in turn vs fanned out on the shared pool"""
+import sys
+import os
+import contextlib
+import io
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search.search_engine import SpaceBiologySearchEngine
+from search.fanout import shared_executor
+from search.instrumentation import StageMetrics
+from corpus.chunking import iter_passages
+from kg.kg_storage import KGStorage
+from bench_result_formatting import make_kg
+
+CORPUS_DIR = Path(__file__).parent.parent.parent / 'sorted'
+QUERIES = ['microgravity bone loss', 'plant root gravitropism in spaceflight',
+           'radiation induced DNA damage in mice', 'muscle atrophy hindlimb unloading',
+           'immune response isolation', 'gene expression changes in flight samples']
+REPEAT = 10
+
+def time_methods(engine, query, top_k=10):
+    """Seconds per method when run on its own"""
+    tasks = engine._retrieval_tasks(query, top_k)
+    timings = {}
+    for name, task in tasks.items():
+        start = time.perf_counter()
+        task()
+        timings[name] = time.perf_counter() - start
+    return timings
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = KGStorage(os.path.join(tmp, 'kg.db'))
+        storage.store_kg(make_kg(50000))
+        # The evidence is searched too, as when api.py serves the KG evidence
+        documents = [p.text for p in iter_passages(CORPUS_DIR)]
+        documents += [t.evidence for t in storage.get_evidence_triples_ranked(0.0)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            engine = SpaceBiologySearchEngine(documents, storage)
+        print(f"{len(documents)} documents, 50000 triples, {os.cpu_count()} CPUs")
+
+        for query in QUERIES:
+            engine._retrieve(query, 10, StageMetrics().trace())  # warm up lazy builds
+
+        per_method = {}
+        for query in QUERIES:
+            for name, seconds in time_methods(engine, query).items():
+                per_method.setdefault(name, []).append(seconds)
+        print("  ".join(f"{name} {np.mean(seconds) * 1000:.1f}ms" for name, seconds in per_method.items()))
+
+        # Overlap needs free cores; the timeout bounds latency regardless
+        for label, executor, timeouts in [('in turn', None, {}), ('fanned out', shared_executor(), {}),
+                                          ('+ 25ms cap', shared_executor(), {'evidence': 0.025})]:
+            engine.retrieval.executor = executor
+            engine.retrieval.timeouts = timeouts
+            latencies = []
+            for _ in range(REPEAT):
+                for query in QUERIES:
+                    start = time.perf_counter()
+                    engine._retrieve(query, 10, StageMetrics().trace())
+                    latencies.append(time.perf_counter() - start)
+            print(f"{label:>11}: mean {np.mean(latencies) * 1000:.1f}ms  p99 {np.percentile(latencies, 99) * 1000:.1f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Benchmark GNNClassifier: build time and query latency on synthetic KGs up to 1M edges"""
+import sys
+import os
+import time
+from collections import namedtuple
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search.retrieval_methods import GNNClassifier
+
+Triple = namedtuple('Triple', 'subject predicate object confidence')
+WORDS = ['bone', 'muscle', 'radiation', 'microgravity', 'root', 'gene', 'protein', 'cell', 'mice',
+         'plant', 'stress', 'expression', 'oxidative', 'immune', 'calcium', 'spaceflight', 'loss',
+         'growth', 'signaling', 'density', 'arabidopsis', 'osteoclast', 'dna', 'damage', 'repair']
+QUERIES = [['microgravity', 'bone', 'loss'], ['radiation', 'dna', 'damage'], ['plant', 'root', 'growth']]
+
+class SyntheticKG:
+    """Stands in for KGStorage: power-law node popularity, multi-word entity names"""
+    def __init__(self, num_edges, seed=0):
+        rng = np.random.default_rng(seed)
+        num_nodes = max(10, num_edges // 4)
+        words = rng.choice(WORDS, size=(num_nodes, 2))
+        self.names = [f"{a} {b} {i}" for i, (a, b) in enumerate(words)]
+        popularity = 1.0 / np.arange(1, num_nodes + 1) ** 0.8
+        popularity /= popularity.sum()
+        self.subjects = rng.choice(num_nodes, size=num_edges, p=popularity)
+        self.objects = rng.choice(num_nodes, size=num_edges, p=popularity)
+        self.confidences = rng.uniform(0.3, 1.0, size=num_edges)
+
+    def get_all_triples(self):
+        return [Triple(self.names[s], 'related_to', self.names[o], c)
+                for s, o, c in zip(self.subjects.tolist(), self.objects.tolist(), self.confidences.tolist())]
+
+def legacy_classify(adjacency, node_features, query_terms, top_k):
+    """The previous dict-of-lists scoring loop, kept for comparison"""
+    scores = {}
+    for node in node_features:
+        term_match = sum(1 for term in query_terms if term.lower() in node.lower())
+        degree, avg_conf = node_features[node]
+        scores[node] = (term_match * 2 + degree * 0.1 + avg_conf) / 3
+    return sorted(scores.items(), key=lambda x: x[1], reverse=True)[:top_k]
+
+def legacy_build(triples):
+    adjacency, nodes = {}, set()
+    for t in triples:
+        nodes.add(t.subject)
+        nodes.add(t.object)
+        adjacency.setdefault(t.subject, []).append((t.object, t.confidence))
+    return adjacency, {node: [len(adjacency.get(node, [])),
+                              np.mean([c for _, c in adjacency.get(node, [(None, 0)])])] for node in nodes}
+
+def main():
+    print(f"{'edges':>8} {'nodes':>8} {'build s':>8} {'query ms':>9} {'legacy build s':>15} {'legacy query ms':>16}")
+    for num_edges in [10_000, 100_000, 1_000_000]:
+        kg = SyntheticKG(num_edges)
+        gnn = GNNClassifier(kg)
+        start = time.perf_counter()
+        gnn.build_graph()
+        build_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for query in QUERIES:
+            gnn.classify_relevance(query, 10)
+        query_ms = (time.perf_counter() - start) / len(QUERIES) * 1000
+
+        legacy_build_s = legacy_query_ms = float('nan')
+        if num_edges <= 100_000:
+            triples = kg.get_all_triples()
+            start = time.perf_counter()
+            adjacency, features = legacy_build(triples)
+            legacy_build_s = time.perf_counter() - start
+            start = time.perf_counter()
+            for query in QUERIES:
+                legacy_classify(adjacency, features, query, 10)
+            legacy_query_ms = (time.perf_counter() - start) / len(QUERIES) * 1000
+
+        print(f"{num_edges:>8} {len(gnn._graph.node_names):>8} {build_s:>8.2f} {query_ms:>9.2f} "
+              f"{legacy_build_s:>15.2f} {legacy_query_ms:>16.2f}")
+
+if __name__ == "__main__":
+    main()
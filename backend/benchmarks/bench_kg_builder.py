@@ -0,0 +1,62 @@
+"""Papers per minute of KnowledgeGraphBuilder against a local stand-in Ollama server with fixed latency
+
+Papers are extracted chunk by chunk; the cached run re-extracts them with a
+fresh journal but the same chunk cache, so no generation is requested.
+Resume and retry behaviour is covered by tests/test_kg_builder.py.
+"""
+import sys
+import os
+import contextlib
+import io
+import json
+import tempfile
+from itertools import islice
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kg.kg_builder import KnowledgeGraphBuilder
+from kg.kg_storage import KGStorage
+from corpus.chunking import iter_papers
+from tests.fake_ollama import FakeOllama
+
+CORPUS_DIR = Path(__file__).parent.parent.parent / 'sorted'
+NUM_PAPERS = 48
+LATENCY = 0.05  # seconds per generation
+
+def extraction(prompt):
+    """A fixed extraction whose evidence quotes the start of the chunk"""
+    chunk = prompt.split("\n")[1][:40]
+    return json.dumps({
+        "entities": [{"id": "microgravity", "type": "condition", "name": "microgravity", "properties": {}}],
+        "relations": [{"subject": "microgravity", "predicate": "affects", "object": f"sample {i}",
+                       "confidence": 0.8, "evidence": chunk} for i in range(5)]
+    })
+
+def main():
+    papers = list(islice(iter_papers(CORPUS_DIR), NUM_PAPERS))
+    print(f"{NUM_PAPERS} papers, {LATENCY * 1000:.0f}ms per generation")
+    print(f"{'workers':>8} {'papers/min':>11} {'generations':>12} {'triples':>8} {'cached papers/min':>18}")
+
+    with FakeOllama(extraction, latency=LATENCY) as server:
+        for workers in [1, 4, 8, 16]:
+            with tempfile.TemporaryDirectory() as tmp:
+                storage = KGStorage(os.path.join(tmp, 'kg.db'))
+                builder = KnowledgeGraphBuilder(base_url=server.url, cache_dir=os.path.join(tmp, 'cache'))
+                server.reset()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    builder.build_from_publications(papers, workers=workers, storage=storage,
+                                                    journal_path=os.path.join(tmp, 'journal.jsonl'),
+                                                    store_batch_size=50)
+                stats = builder.last_stats
+                generations = server.requests
+                stored = len(storage.get_evidence_triples_ranked(0.0))
+
+                # A fresh journal re-extracts every paper from the chunk cache
+                with contextlib.redirect_stdout(io.StringIO()):
+                    builder.build_from_publications(papers, workers=workers,
+                                                    journal_path=os.path.join(tmp, 'journal2.jsonl'))
+                print(f"{workers:>8} {stats.papers_per_minute:>11.0f} {generations:>12} {stored:>8} "
+                      f"{builder.last_stats.papers_per_minute:>18.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Evidence triple ingest time: one execute per row vs KGStorage.bulk_load, with and without deferred indexes"""
+import sys
+import os
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kg.kg_storage import KGStorage, UPSERT_TRIPLE_SQL
+from kg.kg_schema import EvidenceTriple
+
+TERMS = ["microgravity", "radiation", "bone", "dna", "muscle", "spaceflight", "gene", "immune", "plant", "stress"]
+
+def generate_triples(num_triples):
+    """Synthetic triples, produced lazily so the KG is never held in memory"""
+    for i in range(num_triples):
+        subject, obj = TERMS[i % len(TERMS)], TERMS[(i * 7 + 3) % len(TERMS)]
+        yield EvidenceTriple(
+            subject=f"{subject}_{i % 5000}", predicate="affects", object=f"{obj}_{i}",
+            evidence=f"Exposure to {subject} altered {obj} levels in sample {i} compared with ground controls.",
+            confidence=(i % 100) / 100, source_id=f"PMC{i % 20000}"
+        )
+
+def legacy_store(storage, triples):
+    """The previous write path: one execute per triple"""
+    with storage._connection() as conn:
+        cursor = conn.cursor()
+        for t in triples:
+            cursor.execute(UPSERT_TRIPLE_SQL, (t.subject, t.predicate, t.object, t.evidence, t.confidence, t.source_id))
+
+def time_load(load, num_triples):
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = KGStorage(os.path.join(tmp, 'kg.db'))
+        start = time.perf_counter()
+        load(storage, generate_triples(num_triples))
+        seconds = time.perf_counter() - start
+        # The full-text index must answer for the loaded rows either way
+        assert storage.search_triples(f"sample {num_triples - 1} ", include_evidence=True)
+        storage.close()
+    return seconds
+
+def main(sizes=(100000, 1000000)):
+    print(f"{'triples':>9} {'execute/row s':>14} {'bulk_load s':>12} {'deferred s':>11} {'deferred triples/s':>19}")
+    for num_triples in sizes:
+        legacy = time_load(legacy_store, num_triples)
+        bulk = time_load(lambda storage, triples: storage.bulk_load(triples), num_triples)
+        deferred = time_load(lambda storage, triples: storage.bulk_load(triples, defer_indexes=True), num_triples)
+        print(f"{num_triples:>9} {legacy:>14.1f} {bulk:>12.1f} {deferred:>11.1f} {num_triples / deferred:>19.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""BiologyKGSchema with repeated facts: kept facts, rows to store and ranked-read latency vs re-sorting a list"""
+import sys
+import os
+import time
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kg.kg_schema import BiologyKGSchema, EvidenceTriple
+
+def mentions(num_mentions, num_facts, num_sources, seed=0):
+    """Extracted triples where popular facts recur across chunks and papers (Zipf-distributed)"""
+    rng = np.random.default_rng(seed)
+    facts = np.minimum(rng.zipf(1.3, num_mentions), num_facts) - 1
+    for i, (fact, source, confidence) in enumerate(zip(facts, rng.integers(0, num_sources, num_mentions),
+                                                        rng.integers(0, 100, num_mentions) / 100)):
+        yield EvidenceTriple(subject=f"entity_{fact % 997}", predicate="affects", object=f"entity_{fact}",
+                             evidence=f"Sentence {i}.", confidence=float(confidence), source_id=f"PMC{source}")
+
+def legacy_ranked(triples, min_confidence):
+    """The previous get_ranked_triples: filter and sort the whole list"""
+    return sorted([t for t in triples if t.confidence >= min_confidence], key=lambda x: x.confidence, reverse=True)
+
+def mean_ms(fn, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main(num_facts=50000, num_sources=500):
+    print(f"{'mentions':>9} {'facts':>7} {'rows':>7} {'add us':>7} {'list sort ms':>13} {'top-100 ms':>11} {'>=0.9 ms':>9}")
+    for num_mentions in [10000, 100000, 1000000]:
+        triples = list(mentions(num_mentions, num_facts, num_sources))
+        kg = BiologyKGSchema()
+        start = time.perf_counter()
+        for triple in triples:
+            kg.add_evidence_triple(triple)
+        add_us = (time.perf_counter() - start) / num_mentions * 1e6
+
+        legacy = mean_ms(lambda: legacy_ranked(triples, 0.5), repeat=3)
+        top = mean_ms(lambda: kg.ranked_triples(0.5, limit=100))
+        high = mean_ms(lambda: kg.ranked_triples(0.9))
+        print(f"{num_mentions:>9} {len(kg.evidence_triples):>7} {kg.num_source_triples:>7} {add_us:>7.2f} "
+              f"{legacy:>13.1f} {top:>11.3f} {high:>9.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Queries per second of KGStorage lookups with and without connection pooling"""
+import sys
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kg.kg_storage import KGStorage
+from kg.kg_schema import BiologyKGSchema, EvidenceTriple
+
+TERMS = ["microgravity", "radiation", "bone", "dna", "muscle", "spaceflight", "gene", "immune", "plant", "stress"]
+
+def legacy_query_by_thesaurus_term(db_path, term):
+    """The previous connect-per-call lookup"""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT subject, predicate, object, evidence, confidence, source_id
+        FROM evidence_triples
+        WHERE subject LIKE ? OR predicate LIKE ? OR object LIKE ?
+        ORDER BY confidence DESC
+    """, (f"%{term}%", f"%{term}%", f"%{term}%"))
+    results = [EvidenceTriple(
+        subject=row[0], predicate=row[1], object=row[2],
+        evidence=row[3], confidence=row[4], source_id=row[5]
+    ) for row in cursor.fetchall()]
+    conn.close()
+    return results
+
+def legacy_get_generation(db_path):
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute("SELECT value FROM kg_meta WHERE key = 'generation'")
+    generation = cursor.fetchone()[0]
+    conn.close()
+    return generation
+
+def qps(lookup, num_queries, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lookup, (TERMS[i % len(TERMS)] for i in range(num_queries))))
+    return num_queries / (time.perf_counter() - start)
+
+def main(num_triples=200, num_queries=5000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'kg.db')
+        storage = KGStorage(db_path)
+        kg = BiologyKGSchema()
+        for i in range(num_triples):
+            kg.add_evidence_triple(EvidenceTriple(
+                subject=f"{TERMS[i % len(TERMS)]}_{i}", predicate="affects", object=f"{TERMS[(i * 7) % len(TERMS)]}_{i}",
+                evidence=f"Evidence sentence {i}.", confidence=(i % 100) / 100, source_id=f"PMC{i}"
+            ))
+        storage.store_kg(kg)
+
+        print(f"{num_triples} triples, {num_queries} queries per run")
+        print(f"{'query':>14} {'threads':>7} {'connect/call qps':>17} {'pooled qps':>11}")
+        cases = [
+            ('term lookup', lambda term: legacy_query_by_thesaurus_term(db_path, term), storage.query_by_thesaurus_term),
+            ('generation', lambda term: legacy_get_generation(db_path), lambda term: storage.get_generation()),
+        ]
+        for name, legacy_lookup, pooled_lookup in cases:
+            for threads in [1, 4, 8]:
+                legacy = qps(legacy_lookup, num_queries, threads)
+                pooled = qps(pooled_lookup, num_queries, threads)
+                print(f"{name:>14} {threads:>7} {legacy:>17.0f} {pooled:>11.0f}")
+        storage.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Benchmark MMRReranker on 200 candidates: per-pair cosine loop vs one similarity matrix"""
+import sys
+import os
+import time
+from pathlib import Path
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search.cross_encoder_reranker import CrossEncoderReranker, MMRReranker
+from corpus.chunking import iter_passages
+
+CORPUS_DIR = Path(__file__).parent.parent.parent / 'sorted'
+QUERIES = ['microgravity bone loss', 'plant root gravitropism in spaceflight',
+           'radiation induced DNA damage in mice', 'muscle atrophy hindlimb unloading']
+
+def legacy_mmr(query, candidates, documents, top_k, lambda_param=0.7):
+    """The previous implementation, kept for comparison"""
+    vectorizer = TfidfVectorizer(max_features=500, stop_words='english')
+    all_docs = [documents[item_id] if isinstance(item_id, (int, np.integer)) and item_id < len(documents) else str(item_id)
+                for item_id, _ in candidates]
+    doc_vectors = vectorizer.fit_transform(all_docs + [query])
+    query_vector = doc_vectors[-1]
+    doc_vectors = doc_vectors[:-1]
+    relevance_scores = cosine_similarity(query_vector, doc_vectors).flatten()
+    selected = []
+    remaining = list(range(len(candidates)))
+    while len(selected) < top_k and remaining:
+        mmr_scores = []
+        for i in remaining:
+            if selected:
+                max_sim = np.max(cosine_similarity(doc_vectors[i], doc_vectors[selected]).flatten())
+            else:
+                max_sim = 0
+            mmr_scores.append((i, lambda_param * relevance_scores[i] - (1 - lambda_param) * max_sim))
+        best_idx = max(mmr_scores, key=lambda x: x[1])[0]
+        selected.append(best_idx)
+        remaining.remove(best_idx)
+    return [candidates[i] for i in selected]
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+def main(num_candidates=200, top_k=20):
+    documents = [p.text for p in iter_passages(CORPUS_DIR)]
+    reranker = CrossEncoderReranker()
+    reranker.fit(documents)
+    per_query = MMRReranker()
+    shared = MMRReranker(vectors=reranker)
+    rng = np.random.default_rng(0)
+
+    totals = np.zeros(4)
+    for query in QUERIES:
+        ids = rng.choice(len(documents), size=num_candidates, replace=False)
+        candidates = [(int(i), 1.0 / (rank + 60)) for rank, i in enumerate(ids)]
+        legacy_ms, legacy = timed(lambda: legacy_mmr(query, candidates, documents, top_k), 1)
+        matrix_ms, matrix = timed(lambda: per_query.rerank_with_mmr(query, candidates, documents, top_k), 5)
+        shared_ms, _ = timed(lambda: shared.rerank_with_mmr(query, candidates, documents, top_k), 20)
+        rerank_ms, _ = timed(lambda: reranker.rerank(query, candidates, documents), 20)
+        assert matrix == legacy, "similarity-matrix MMR diverged from the legacy selection"
+        totals += [legacy_ms, matrix_ms, shared_ms, rerank_ms]
+
+    legacy_ms, matrix_ms, shared_ms, rerank_ms = totals / len(QUERIES)
+    print(f"{num_candidates} candidates, top {top_k}, {len(documents)} passages")
+    print(f"legacy MMR (refit + pairwise loop): {legacy_ms:8.2f} ms")
+    print(f"matrix MMR (refit per query):       {matrix_ms:8.2f} ms")
+    print(f"matrix MMR (shared vectors):        {shared_ms:8.2f} ms")
+    print(f"cross-encoder rerank (non-MMR path): {rerank_ms:7.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Files per minute of organize_using_gemma.py against a local stand-in Ollama server with fixed latency
+
+Every FAIL_EVERY-th request is answered with a 503, so the retries are timed
+too. Retry and resume behaviour is covered by tests/test_organize_using_gemma.py.
+"""
+import sys
+import os
+import asyncio
+import contextlib
+import io
+import shutil
+import tempfile
+import time
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from organize_using_gemma import GemmaClient, process_files_with_gemma
+from tests.fake_ollama import FakeOllama
+
+CORPUS_DIR = Path(__file__).parent.parent.parent / 'sorted'
+NUM_FILES = 64
+LATENCY = 0.1  # seconds per generation
+FAIL_EVERY = 10
+
+def main():
+    print(f"{NUM_FILES} files, {LATENCY * 1000:.0f}ms per generation, every {FAIL_EVERY}th request fails")
+    print(f"{'concurrency':>12} {'files/min':>10} {'requests':>9} {'connections':>12}")
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            FakeOllama(lambda prompt: "Title: A spaceflight study\nAuthors: A Author, B Author",
+                       latency=LATENCY, fail_every=FAIL_EVERY) as server:
+        input_dir = Path(tmp) / 'unsorted'
+        input_dir.mkdir()
+        for path in sorted(CORPUS_DIR.glob('PMC*.txt'))[:NUM_FILES]:
+            shutil.copy(path, input_dir)
+
+        for concurrency in [1, 4, 8, 16]:
+            server.reset()
+            client = GemmaClient(server.url, concurrency=concurrency, backoff=0.01)
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                processed = asyncio.run(process_files_with_gemma(input_dir, Path(tmp) / f'out{concurrency}',
+                                                                 Path(tmp) / f'sorted{concurrency}', client))
+            seconds = time.perf_counter() - start
+            client.close()
+            print(f"{concurrency:>12} {processed / seconds * 60:>10.0f} {server.requests:>9} "
+                  f"{len(server.connections):>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Search latency and hit rate with the result cache on a Zipf-distributed query stream"""
+import sys
+import os
+import contextlib
+import io
+import tempfile
+import time
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search.search_engine import SpaceBiologySearchEngine
+from search.result_cache import ResultCache, SQLiteCacheBackend
+from kg.kg_storage import KGStorage
+from bench_result_formatting import make_kg, SUBJECTS, OBJECTS
+
+NUM_QUERIES = 400
+
+def query_stream(num_distinct, length, seed=0):
+    """Zipf-distributed queries, with case and spacing variants that normalize to the same key"""
+    rng = np.random.default_rng(seed)
+    distinct = [f"{SUBJECTS[i % len(SUBJECTS)]} {OBJECTS[(i // len(SUBJECTS)) % len(OBJECTS)]} {i}"
+                for i in range(num_distinct)]
+    ranks = np.minimum(rng.zipf(1.3, length), num_distinct) - 1
+    return [distinct[r].upper() if i % 3 == 0 else distinct[r] for i, r in enumerate(ranks)]
+
+def run(engine, queries):
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for query in queries:
+            start = time.perf_counter()
+            engine.search(query, 10)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = KGStorage(os.path.join(tmp, 'kg.db'))
+        storage.store_kg(make_kg(5000))
+        documents = [t.evidence for t in storage.get_evidence_triples_ranked(0.0)]
+        queries = query_stream(200, NUM_QUERIES)
+
+        print(f"{'cache':>14} {'mean ms':>8} {'p50 ms':>8} {'p99 ms':>8} {'hits':>6} {'shared':>7} {'misses':>7}")
+        uncached = SpaceBiologySearchEngine(documents, storage)
+        latencies = run(uncached, queries)
+        print(f"{'none':>14} {latencies.mean():>8.2f} {np.median(latencies):>8.2f} "
+              f"{np.percentile(latencies, 99):>8.2f} {'-':>6} {'-':>7} {'-':>7}")
+
+        # Two engines sharing one SQLite file stand in for two gunicorn workers
+        db_path = os.path.join(tmp, 'result_cache.db')
+        for name in ['worker 1', 'worker 2']:
+            cache = ResultCache(maxsize=1024, ttl=300, backend=SQLiteCacheBackend(db_path))
+            uncached.result_cache = cache
+            latencies = run(uncached, queries)
+            stats = cache.stats()
+            print(f"{name:>14} {latencies.mean():>8.2f} {np.median(latencies):>8.2f} "
+                  f"{np.percentile(latencies, 99):>8.2f} {stats['hits']:>6} {stats['shared_hits']:>7} "
+                  f"{stats['misses']:>7}")
+
+if __name__ == "__main__":
+    main()
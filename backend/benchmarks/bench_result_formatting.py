@@ -0,0 +1,50 @@
+"""Latency of formatting KG term results as the KG grows to 100k triples"""
+import sys
+import os
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search.search_engine import SpaceBiologySearchEngine
+from kg.kg_storage import KGStorage
+from kg.kg_schema import BiologyKGSchema, EvidenceTriple
+
+SUBJECTS = ["microgravity", "radiation", "spaceflight", "hypergravity", "isolation"]
+OBJECTS = ["bone_loss", "dna_damage", "muscle_atrophy", "gene_expression", "immune_response"]
+
+def make_kg(num_triples):
+    kg = BiologyKGSchema()
+    for i in range(num_triples):
+        subject = f"{SUBJECTS[i % len(SUBJECTS)]}_{i}"
+        obj = f"{OBJECTS[i % len(OBJECTS)]}_{i}"
+        kg.add_evidence_triple(EvidenceTriple(
+            subject=subject, predicate="affects", object=obj,
+            evidence=f"Observation {i}: {subject} affects {obj} in flight samples.",
+            confidence=0.5 + (i % 50) / 100, source_id=f"PMC{i}"
+        ))
+    return kg
+
+def main():
+    print(f"{'triples':>8} {'build s':>8} {'format us':>10}")
+    for num_triples in [1000, 10000, 100000]:
+        with tempfile.TemporaryDirectory() as tmp:
+            storage = KGStorage(os.path.join(tmp, 'kg.db'))
+            storage.store_kg(make_kg(num_triples))
+            documents = [t.evidence for t in storage.get_evidence_triples_ranked(0.0)]
+
+            start = time.perf_counter()
+            engine = SpaceBiologySearchEngine(documents, storage)
+            build_s = time.perf_counter() - start
+
+            terms = [f"{OBJECTS[i % len(OBJECTS)]}_{i}" for i in range(0, num_triples, num_triples // 100)]
+            terms += ["microgravity", "unknown_term"]
+            repeat = 10
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for term in terms:
+                    engine._format_result(term, 1.0)
+            format_us = (time.perf_counter() - start) / (repeat * len(terms)) * 1e6
+            print(f"{num_triples:>8} {build_s:>8.2f} {format_us:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Micro-benchmark for ReciprocalRankFusion at candidate depths of 10 to 10k"""
+import sys
+import os
+import time
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search.reciprocal_rank_fusion import ReciprocalRankFusion
+
+def legacy_fuse_rankings(rankings, k=60):
+    """The previous O(items x methods x depth) implementation, kept for comparison"""
+    weights = {method: 1.0 for method in rankings.keys()}
+    all_items = set()
+    for ranking in rankings.values():
+        all_items.update([item[0] for item in ranking])
+    rrf_scores = {}
+    for item in all_items:
+        score = 0
+        for method, ranking in rankings.items():
+            rank = None
+            for i, (ranked_item, _) in enumerate(ranking):
+                if ranked_item == item:
+                    rank = i + 1
+                    break
+            if rank is not None:
+                score += weights[method] / (k + rank)
+        rrf_scores[item] = score
+    return sorted(rrf_scores.items(), key=lambda x: x[1], reverse=True)
+
+def make_rankings(depth, num_docs, rng):
+    return {
+        method: [(int(doc), 1.0 / (rank + 1))
+                 for rank, doc in enumerate(rng.choice(num_docs, size=depth, replace=False))]
+        for method in ['sparse', 'dense', 'gnn']
+    }
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+def main():
+    rng = np.random.default_rng(0)
+    rrf = ReciprocalRankFusion()
+    print(f"{'depth':>6} {'legacy ms':>10} {'dict ms':>9} {'top-20 ms':>10} {'numpy ms':>9}")
+    for depth in [10, 100, 1000, 10000]:
+        rankings = make_rankings(depth, depth * 3, rng)
+        repeat = max(1, 2000 // depth)
+
+        legacy_ms, legacy = timed(lambda: legacy_fuse_rankings(rankings), 1) if depth <= 1000 else (float('nan'), None)
+        dict_ms, fused = timed(lambda: rrf.fuse_rankings(rankings), repeat)
+        top_ms, top = timed(lambda: rrf.fuse_rankings(rankings, top_n=20), repeat)
+        numpy_ms, vectorized = timed(lambda: rrf.fuse_index_rankings(rankings), repeat)
+
+        if legacy is not None:
+            assert fused == legacy, "dict fusion diverged from the legacy output"
+        assert top == fused[:20]
+        assert [s for _, s in vectorized] == [s for _, s in fused]
+        print(f"{depth:>6} {legacy_ms:>10.2f} {dict_ms:>9.2f} {top_ms:>10.2f} {numpy_ms:>9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Queries per second over the corpus passages: one search() per query vs search_batch()"""
+import sys
+import os
+import contextlib
+import io
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search.search_engine import SpaceBiologySearchEngine
+from search.retrieval_methods import BM25Retrieval
+from corpus.chunking import iter_passages
+from kg.kg_storage import KGStorage
+from bench_result_formatting import make_kg
+
+CORPUS_DIR = Path(__file__).parent.parent.parent / 'sorted'
+NUM_QUERIES = 256
+
+def sample_queries(documents, num_queries, seed=0):
+    """Short queries made of a few consecutive words from random passages"""
+    rng = np.random.default_rng(seed)
+    queries = []
+    for i in rng.choice(len(documents), num_queries, replace=False):
+        words = documents[i].split()
+        start = rng.integers(0, max(1, len(words) - 4))
+        queries.append(" ".join(words[start:start + rng.integers(2, 5)]))
+    return queries
+
+def qps(fn, num_queries):
+    start = time.perf_counter()
+    fn()
+    return num_queries / (time.perf_counter() - start)
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = KGStorage(os.path.join(tmp, 'kg.db'))
+        storage.store_kg(make_kg(2000))
+        documents = [p.text for p in iter_passages(CORPUS_DIR)]
+        documents += [t.evidence for t in storage.get_evidence_triples_ranked(0.0)]
+        bm25 = BM25Retrieval.from_documents(documents, os.path.join(tmp, 'bm25'))
+        with contextlib.redirect_stdout(io.StringIO()):
+            engine = SpaceBiologySearchEngine(documents, storage)
+        queries = sample_queries(documents, NUM_QUERIES)
+        engine.search_batch(queries[:8])  # warm up lazy builds
+        print(f"{len(documents)} documents, {NUM_QUERIES} queries")
+
+        retrieval = engine.retrieval
+        print(f"{'':>14} {'single q/s':>11} {'batch q/s':>10}")
+        for name, backend in [('tfidf', retrieval.sparse), ('bm25', bm25), ('dense', retrieval.dense)]:
+            single = qps(lambda: [backend.search(q, 20) for q in queries], len(queries))
+            batch = qps(lambda: backend.search_batch(queries, 20), len(queries))
+            print(f"{name:>14} {single:>11.0f} {batch:>10.0f}")
+        single = qps(lambda: [retrieval.gnn_guided_sparse_search(q, 20) for q in queries], len(queries))
+        batch = qps(lambda: retrieval.gnn_guided_sparse_search_batch(queries, 20), len(queries))
+        print(f"{'gnn + tfidf':>14} {single:>11.0f} {batch:>10.0f}")
+        single = qps(lambda: [engine.search(q, 10) for q in queries], len(queries))
+        batch = qps(lambda: engine.search_batch(queries, 10), len(queries))
+        print(f"{'search':>14} {single:>11.0f} {batch:>10.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""expand_query latency with the indexed GO resolver vs the old linear scan
+
+Run from a directory containing go-basic.obo (or pass its path).
+"""
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from thesaurus import BiologyThesaurus
+
+QUERIES = [
+    "microgravity bone loss",
+    "radiation dna damage repair",
+    "arabidopsis root gravitropism",
+    "muscle atrophy in mice",
+    "immune response spaceflight t cells",
+    "oxidative stress mitochondria",
+    "calcium signaling osteoclast",
+    "plant cell wall growth",
+]
+
+def linear_expand_query(thesaurus, names, terms):
+    """The previous behaviour: scan every GO name per term"""
+    expanded = set()
+    for term in terms:
+        term_lower = term.lower()
+        canonical = next((n for n in names if term_lower in n.lower()), None)
+        canonical = canonical.replace(" ", "_").lower() if canonical else term_lower.strip().replace(" ", "_")
+        expanded.add(canonical)
+        name = canonical.replace("_", " ")
+        for i, n in enumerate(names):
+            if n.lower() == name:
+                expanded.update(thesaurus.go_index.term_alt_ids(i))
+                break
+    return expanded
+
+def main(obo_path='go-basic.obo'):
+    thesaurus = BiologyThesaurus(obo_path=obo_path, index_dir=obo_path.replace('.obo', '.idx'))
+    start = time.perf_counter()
+    if thesaurus.go_index is None:
+        print(f"No GO ontology available at {obo_path}")
+        return
+    print(f"Opened GO index with {len(thesaurus.go_index)} terms in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    names = [thesaurus.go_index.name(i) for i in range(len(thesaurus.go_index))]
+    queries = [q.split() for q in QUERIES]
+
+    start = time.perf_counter()
+    linear = [linear_expand_query(thesaurus, names, terms) for terms in queries]
+    linear_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    start = time.perf_counter()
+    cold = [thesaurus.expand_query(terms) for terms in queries]
+    cold_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    start = time.perf_counter()
+    for terms in queries:
+        thesaurus.expand_query(terms)
+    warm_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    assert cold == linear, "indexed resolver diverged from the linear scan"
+    print(f"{'linear scan':>14} {linear_ms:8.3f} ms/query")
+    print(f"{'indexed':>14} {cold_ms:8.3f} ms/query")
+    print(f"{'indexed + LRU':>14} {warm_ms:8.3f} ms/query")
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
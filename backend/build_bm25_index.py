@@ -0,0 +1,23 @@
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from search.bm25_index import BM25Index
+from build_passages import DEFAULT_CORPUS_DIR, DEFAULT_STORE_DIR, open_or_build_passages
+
+DEFAULT_INDEX_DIR = 'bm25_index'
+
+def build_bm25_index(corpus_dir=DEFAULT_CORPUS_DIR, index_dir=DEFAULT_INDEX_DIR, store_dir=DEFAULT_STORE_DIR):
+    """Index the corpus passages (chunked into store_dir first if needed); document ids are passage ids"""
+    passages = open_or_build_passages(corpus_dir, store_dir)
+    print(f"Indexing {len(passages)} passages from {store_dir}...")
+
+    start = time.time()
+    index = BM25Index.build(iter(passages), index_dir)
+    print(f"Indexed {index.num_docs} documents, {index.meta['num_terms']} terms "
+          f"in {time.time() - start:.1f}s -> {index_dir}")
+    return index
+
+if __name__ == "__main__":
+    build_bm25_index(*sys.argv[1:4])
@@ -0,0 +1,25 @@
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from search.dense_index import DenseIndex, HashingEncoder, SentenceEmbeddingEncoder
+from build_passages import DEFAULT_CORPUS_DIR, DEFAULT_STORE_DIR, open_or_build_passages
+
+DEFAULT_INDEX_DIR = 'dense_index'
+
+def build_dense_index(corpus_dir=DEFAULT_CORPUS_DIR, index_dir=DEFAULT_INDEX_DIR, model_path=None,
+                      store_dir=DEFAULT_STORE_DIR):
+    """Embed the corpus passages with a local sentence-embedding model (or the hashing encoder) and build the IVF index"""
+    encoder = SentenceEmbeddingEncoder(model_path) if model_path else HashingEncoder()
+    passages = open_or_build_passages(corpus_dir, store_dir)
+    print(f"Embedding {len(passages)} passages from {store_dir} with {encoder.spec}...")
+
+    start = time.time()
+    index = DenseIndex.build(iter(passages), encoder, index_dir)
+    print(f"Indexed {index.num_docs} documents into {index.nlist} IVF lists "
+          f"in {time.time() - start:.1f}s -> {index_dir}")
+    return index
+
+if __name__ == "__main__":
+    build_dense_index(*sys.argv[1:5])
@@ -0,0 +1,28 @@
+import sys
+import os
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from kg.kg_builder import KnowledgeGraphBuilder
+from kg.kg_storage import KGStorage
+from corpus.chunking import iter_papers
+DEFAULT_CORPUS_DIR = Path(__file__).parent.parent / 'sorted'
+
+def build_kg(corpus_dir=DEFAULT_CORPUS_DIR, db_path='biology_kg.db', workers=4, journal_path='kg_journal.jsonl',
+             base_url=None, model_name='gemma2:2b', cache_dir='extraction_cache'):
+    """
+    Extract the KG from every paper in corpus_dir into db_path
+
+    Resumable: papers recorded in journal_path are skipped, so an interrupted
+    run continues where it stopped, and chunk responses cached in cache_dir
+    are reused (delete the journal to re-extract after a prompt change).
+    base_url points at another Ollama server.
+    """
+    print(f"Extracting KG from {corpus_dir} with {workers} workers...")
+    builder = KnowledgeGraphBuilder(model_name, base_url=base_url, cache_dir=cache_dir)
+    builder.build_from_publications(iter_papers(corpus_dir), workers=int(workers), storage=KGStorage(db_path),
+                                    journal_path=journal_path)
+    return builder.last_stats
+
+if __name__ == "__main__":
+    build_kg(*sys.argv[1:8])
@@ -0,0 +1,28 @@
+import sys
+import os
+import time
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from corpus.chunking import iter_passages
+from corpus.passage_store import PassageStore
+DEFAULT_CORPUS_DIR = Path(__file__).parent.parent / 'sorted'
+DEFAULT_STORE_DIR = 'passages'
+
+def build_passages(corpus_dir=DEFAULT_CORPUS_DIR, store_dir=DEFAULT_STORE_DIR, max_chars=1500, overlap=200):
+    """Chunk every paper in corpus_dir into overlapping section-bounded passages"""
+    print(f"Chunking papers from {corpus_dir}...")
+    start = time.time()
+    store = PassageStore.build(iter_passages(corpus_dir, int(max_chars), int(overlap)), store_dir)
+    print(f"Stored {len(store)} passages from {len(store.paper_ids)} papers "
+          f"in {time.time() - start:.1f}s -> {store_dir}")
+    return store
+
+def open_or_build_passages(corpus_dir=DEFAULT_CORPUS_DIR, store_dir=DEFAULT_STORE_DIR) -> PassageStore:
+    try:
+        return PassageStore(store_dir)
+    except (OSError, ValueError):
+        return build_passages(corpus_dir, store_dir)
+
+if __name__ == "__main__":
+    build_passages(*sys.argv[1:5])
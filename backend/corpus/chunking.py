@@ -0,0 +1,79 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Tuple
+import re
+
+# Section headings as they appear in the sorted/ papers, optionally numbered ("2. Methods")
+SECTION_HEADING = re.compile(
+    r"^(?:\d+(?:\.\d+)*\.?\s+)?"
+    r"(abstract|summary|introduction|background|methods|materials and methods|"
+    r"results|results and discussion|discussion|conclusions?|limitations|"
+    r"acknowledge?ments?|funding|conflicts? of interest|references|data availability)$",
+    re.IGNORECASE
+)
+
+@dataclass
+class Passage:
+    """A span of one paper; start/end are character offsets into the paper text"""
+    paper_id: str
+    section: str
+    start: int
+    end: int
+    text: str
+
+def iter_papers(corpus_dir) -> Iterator[Tuple[str, str]]:
+    """Yield (paper_id, text) one paper at a time, in file name order"""
+    for path in sorted(Path(corpus_dir).glob('PMC*.txt')):
+        yield path.stem, path.read_text(encoding='utf-8')
+
+def split_sections(text: str) -> List[Tuple[str, int, int]]:
+    """
+    Split a paper into (section, start, end) spans
+
+    Follows the layout organize_using_gemma.py writes: a "Title:" line and an
+    "Authors:" line form the front matter, then the body starts at Abstract or
+    Summary and is divided at recognised section headings.
+    """
+    sections = []
+    current, start = 'front_matter', 0
+    offset = 0
+    for line in text.splitlines(keepends=True):
+        match = SECTION_HEADING.match(line.strip())
+        if match:
+            if text[start:offset].strip():
+                sections.append((current, start, offset))
+            current, start = match.group(1).lower(), offset
+        offset += len(line)
+    if text[start:].strip():
+        sections.append((current, start, len(text)))
+    return sections
+
+def _window_end(text: str, start: int, limit: int) -> int:
+    """End of a window starting at start, moved back to a sentence or word break"""
+    if limit >= len(text):
+        return len(text)
+    for boundary in ('. ', '\n', ' '):
+        cut = text.rfind(boundary, start + (limit - start) // 2, limit)
+        if cut != -1:
+            return cut + len(boundary)
+    return limit
+
+def chunk_paper(paper_id: str, text: str, max_chars: int = 1500, overlap: int = 200) -> Iterator[Passage]:
+    """Yield overlapping passages of at most max_chars that never cross a section boundary"""
+    for section, sec_start, sec_end in split_sections(text):
+        section_text = text[:sec_end]
+        start = sec_start
+        while start < sec_end:
+            end = _window_end(section_text, start, start + max_chars)
+            passage = text[start:end]
+            if passage.strip():
+                yield Passage(paper_id, section, start, end, passage)
+            if end >= sec_end:
+                break
+            # Step back by the overlap, but always make progress
+            start = max(_window_end(section_text, start, end - overlap), start + 1) if overlap else end
+
+def iter_passages(corpus_dir, max_chars: int = 1500, overlap: int = 200) -> Iterator[Passage]:
+    """Stream passages for the whole corpus; only one paper is in memory at a time"""
+    for paper_id, text in iter_papers(corpus_dir):
+        yield from chunk_paper(paper_id, text, max_chars, overlap)
@@ -0,0 +1,147 @@
+from typing import Iterable, Iterator, Optional
+from array import array
+import json
+import mmap
+import os
+import sys
+import numpy as np
+from .chunking import Passage
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from npy_index import IndexWriter
+
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+TEXT_FILE = "text.bin"  # UTF-8 passage texts, back to back
+
+class PassageStore:
+    """
+    Columnar, memory-mapped passage store
+
+    Passage texts live in one UTF-8 blob on disk and are decoded on access;
+    per-passage columns (blob offsets, paper, section, character offsets in
+    the paper) are NumPy arrays. Behaves as a read-only sequence of strings,
+    so it can stand in for the documents list of the search engine.
+    """
+
+    def __init__(self, store_dir: str):
+        with open(os.path.join(store_dir, META_FILE)) as f:
+            self.meta = json.load(f)
+        if self.meta.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported passage store format in {store_dir}")
+
+        def load(name):
+            return np.load(os.path.join(store_dir, name + '.npy'), mmap_mode='r')
+
+        self.store_dir = store_dir
+        self.paper_ids = self.meta['paper_ids']
+        self._paper_positions = {paper_id: p for p, paper_id in enumerate(self.paper_ids)}
+        self.sections = self.meta['sections']
+        self.text_offsets = load('text_offsets')
+        self.paper_index = load('paper_index')
+        self.section_index = load('section_index')
+        self.char_start = load('char_start')
+        self.char_end = load('char_end')
+        self.paper_ptr = load('paper_ptr')
+        with open(os.path.join(store_dir, TEXT_FILE), 'rb') as f:
+            # mmap cannot map an empty file
+            self._text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b''
+
+    @classmethod
+    def build(cls, passages: Iterable[Passage], store_dir: str) -> 'PassageStore':
+        """Write passages to store_dir as they stream in; texts are never held in memory"""
+        paper_ids, sections = {}, {}
+        text_offsets = array('q', [0])
+        paper_index, section_index = array('i'), array('h')
+        char_start, char_end = array('q'), array('q')
+
+        with IndexWriter(store_dir) as writer:
+            with open(writer.path(TEXT_FILE), 'wb') as text_file:
+                for passage in passages:
+                    encoded = passage.text.encode('utf-8')
+                    text_file.write(encoded)
+                    text_offsets.append(text_offsets[-1] + len(encoded))
+                    paper_index.append(paper_ids.setdefault(passage.paper_id, len(paper_ids)))
+                    section_index.append(sections.setdefault(passage.section, len(sections)))
+                    char_start.append(passage.start)
+                    char_end.append(passage.end)
+
+            paper_index = np.frombuffer(paper_index, dtype=np.int32)
+            if len(paper_index) and np.any(np.diff(paper_index) < 0):
+                raise ValueError("Passages must be grouped by paper")
+            # passages of paper p are paper_ptr[p]:paper_ptr[p + 1]
+            paper_ptr = np.zeros(len(paper_ids) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(paper_index, minlength=len(paper_ids)), out=paper_ptr[1:])
+
+            for name, values in (('text_offsets', np.frombuffer(text_offsets, dtype=np.int64)),
+                                 ('paper_index', paper_index),
+                                 ('section_index', np.frombuffer(section_index, dtype=np.int16)),
+                                 ('char_start', np.frombuffer(char_start, dtype=np.int64)),
+                                 ('char_end', np.frombuffer(char_end, dtype=np.int64)),
+                                 ('paper_ptr', paper_ptr)):
+                writer.save(name + '.npy', values)
+
+            writer.commit({
+                'format_version': FORMAT_VERSION,
+                'num_passages': len(paper_index),
+                'paper_ids': list(paper_ids),
+                'sections': list(sections),
+            })
+        return cls(store_dir)
+
+    def __len__(self) -> int:
+        return len(self.paper_index)
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._text[self.text_offsets[i]:self.text_offsets[i + 1]].decode('utf-8')
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def paper_id(self, i: int) -> str:
+        return self.paper_ids[self.paper_index[i]]
+
+    def section(self, i: int) -> str:
+        return self.sections[self.section_index[i]]
+
+    def passages_of(self, paper_id: str) -> range:
+        """Passage ids belonging to paper_id (empty if unknown)"""
+        p = self._paper_positions.get(paper_id)
+        if p is None:
+            return range(0)
+        return range(int(self.paper_ptr[p]), int(self.paper_ptr[p + 1]))
+
+    def find_passage(self, text: str, paper_id: str = None) -> Optional[int]:
+        """
+        Id of the first passage containing text
+
+        Searches paper_id's passages first when given (e.g. a KG triple's
+        source_id), then the whole corpus, since the text may be quoted from
+        another paper. Both search the raw blob, so no passage strings are
+        built for non-matching passages.
+        """
+        needle = text.encode('utf-8')
+        if paper_id is not None:
+            candidates = self.passages_of(paper_id)
+            if len(candidates):
+                hit = self._find_in_blob(needle, int(self.text_offsets[candidates.start]),
+                                         int(self.text_offsets[candidates.stop]))
+                if hit is not None:
+                    return hit
+        return self._find_in_blob(needle, 0, len(self._text))
+
+    def _find_in_blob(self, needle: bytes, start: int, end: int) -> Optional[int]:
+        """Id of the first passage holding needle within blob[start:end]"""
+        while True:
+            pos = self._text.find(needle, start, end)
+            if pos == -1:
+                return None
+            i = int(np.searchsorted(self.text_offsets, pos, side='right')) - 1
+            # A hit straddling two passages is not contained in either
+            if pos + len(needle) <= self.text_offsets[i + 1]:
+                return i
+            start = pos + 1
@@ -0,0 +1,272 @@
+"""Compact pre-indexed Gene Ontology cache built from go-basic.obo.
+
+The index is a directory of .npy arrays (no pickles) that is memory-mapped on
+load, so starting a process only opens files instead of parsing the OBO.
+Build it once with:
+
+    python3 go_index.py go-basic.obo go-basic.idx
+"""
+from typing import Dict, Iterable, Iterator, List, Optional
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import numpy as np
+from npy_index import IndexWriter
+
+FORMAT_VERSION = 2
+META_FILE = "meta.json"
+GO_ID_DTYPE = "S10"  # "GO:0008150"
+VERIFY_BATCH = 64  # first batch of candidate terms checked per substring lookup
+
+def hash_strings(strings: Iterable[str]) -> np.ndarray:
+    """Stable 64-bit hashes used as lookup keys instead of storing a dict"""
+    return np.array([int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'little')
+                     for s in strings], dtype=np.uint64)
+
+def tokenize(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+def trigrams(text: str) -> List[str]:
+    return [text[i:i + 3] for i in range(len(text) - 2)]
+
+def parse_obo(obo_path: str) -> Iterator[Dict]:
+    """Yield live (non-obsolete) [Term] stanzas in file order, like goatools' GODag"""
+    term = None
+    with open(obo_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if line.startswith('['):
+                if term is not None and not term['obsolete']:
+                    yield term
+                term = {'id': None, 'name': '', 'synonyms': [], 'alt_ids': [], 'obsolete': False} \
+                    if line == '[Term]' else None
+            elif term is not None and ': ' in line:
+                tag, value = line.split(': ', 1)
+                if tag == 'id':
+                    term['id'] = value
+                elif tag == 'name':
+                    term['name'] = value
+                elif tag == 'alt_id':
+                    term['alt_ids'].append(value)
+                elif tag == 'synonym':
+                    match = re.match(r'"((?:[^"\\]|\\.)*)"', value)
+                    if match:
+                        term['synonyms'].append(match.group(1).replace('\\"', '"'))
+                elif tag == 'is_obsolete':
+                    term['obsolete'] = value.strip() == 'true'
+    if term is not None and not term['obsolete']:
+        yield term
+
+def _save(writer: IndexWriter, name: str, array: np.ndarray):
+    writer.save(name + '.npy', array)
+
+def _save_strings(writer: IndexWriter, name: str, strings: List[str]):
+    """Store strings as one UTF-8 blob plus offsets"""
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    _save(writer, name + '_blob', np.frombuffer(b''.join(encoded), dtype=np.uint8))
+    _save(writer, name + '_offsets', offsets)
+
+def _save_lookup(writer: IndexWriter, name: str, keys: List[str], values: List[int]):
+    """Store a key -> values multimap as sorted key hashes with CSR-style postings"""
+    hashes = hash_strings(keys)
+    order = np.argsort(hashes, kind='stable')
+    hashes, values = hashes[order], np.asarray(values, dtype=np.int32)[order]
+    unique, starts = np.unique(hashes, return_index=True)
+    _save(writer, name + '_hashes', unique)
+    _save(writer, name + '_ptr', np.append(starts, len(hashes)).astype(np.int64))
+    _save(writer, name + '_terms', values)
+
+def build_go_index(obo_path: str, index_dir: str) -> 'GOIndex':
+    """Parse obo_path once and write the index arrays to index_dir"""
+    ids, names, synonyms, alt_ids = [], [], [], []
+    syn_ptr, alt_ptr = [0], [0]
+    name_keys, name_terms, token_keys, token_terms, syn_keys, syn_terms = [], [], [], [], [], []
+    trigram_keys, trigram_terms = [], []
+    # Substrings too short for a trigram map straight to the first name containing them
+    short_first = {}
+
+    for i, term in enumerate(parse_obo(obo_path)):
+        ids.append(term['id'])
+        names.append(term['name'])
+        synonyms.extend(term['synonyms'])
+        alt_ids.extend(term['alt_ids'])
+        syn_ptr.append(len(synonyms))
+        alt_ptr.append(len(alt_ids))
+
+        name_keys.append(term['name'].lower())
+        name_terms.append(i)
+        for token in dict.fromkeys(tokenize(term['name'])):
+            token_keys.append(token)
+            token_terms.append(i)
+        for synonym in dict.fromkeys(s.lower() for s in term['synonyms']):
+            syn_keys.append(synonym)
+            syn_terms.append(i)
+        lowered = term['name'].lower()
+        for gram in dict.fromkeys(trigrams(lowered)):
+            trigram_keys.append(gram)
+            trigram_terms.append(i)
+        for length in (1, 2):
+            for start in range(len(lowered) - length + 1):
+                short_first.setdefault(lowered[start:start + length], i)
+
+    stat = os.stat(obo_path)
+    with IndexWriter(index_dir) as writer:
+        _save(writer, 'ids', np.array(ids, dtype=GO_ID_DTYPE))
+        _save_strings(writer, 'names', names)
+        _save_strings(writer, 'synonyms', synonyms)
+        _save(writer, 'synonyms_ptr', np.array(syn_ptr, dtype=np.int64))
+        _save(writer, 'alt_ids', np.array(alt_ids, dtype=GO_ID_DTYPE))
+        _save(writer, 'alt_ids_ptr', np.array(alt_ptr, dtype=np.int64))
+        _save_lookup(writer, 'name', name_keys, name_terms)
+        _save_lookup(writer, 'token', token_keys, token_terms)
+        _save_lookup(writer, 'synonym', syn_keys, syn_terms)
+        _save_lookup(writer, 'trigram', trigram_keys, trigram_terms)
+        _save_lookup(writer, 'short', list(short_first.keys()), list(short_first.values()))
+        writer.commit({
+            'format_version': FORMAT_VERSION,
+            'num_terms': len(ids),
+            'source_size': stat.st_size,
+            'source_mtime': stat.st_mtime,
+        })
+    return GOIndex(index_dir)
+
+class _StringTable:
+    """Lazy view of strings stored as a UTF-8 blob with offsets"""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode('utf-8')
+
+class GOIndex:
+    """Read-only, memory-mapped view of an index written by build_go_index"""
+
+    def __init__(self, index_dir: str):
+        with open(os.path.join(index_dir, META_FILE)) as f:
+            self.meta = json.load(f)
+        if self.meta.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported GO index format in {index_dir}")
+
+        def load(name):
+            # Plain ndarray view of the mapping; np.memmap slicing is much slower
+            return np.asarray(np.load(os.path.join(index_dir, name + '.npy'), mmap_mode='r'))
+
+        self.index_dir = index_dir
+        self.ids = load('ids')
+        self.names = _StringTable(load('names_blob'), load('names_offsets'))
+        self.synonyms = _StringTable(load('synonyms_blob'), load('synonyms_offsets'))
+        self.synonyms_ptr = load('synonyms_ptr')
+        self.alt_ids = load('alt_ids')
+        self.alt_ids_ptr = load('alt_ids_ptr')
+        self._lookups = {name: (load(name + '_hashes'), load(name + '_ptr'), load(name + '_terms'))
+                         for name in ('name', 'token', 'synonym', 'trigram', 'short')}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def is_current(self, obo_path: str) -> bool:
+        """True if the index was built from obo_path as it is on disk now"""
+        if not os.path.exists(obo_path):
+            return True
+        stat = os.stat(obo_path)
+        return stat.st_size == self.meta['source_size'] and stat.st_mtime == self.meta['source_mtime']
+
+    def _lookup(self, table: str, key: str) -> np.ndarray:
+        return self._lookup_many(table, [key])[0]
+
+    def _lookup_many(self, table: str, keys: List[str]) -> List[np.ndarray]:
+        hashes, ptr, terms = self._lookups[table]
+        if len(hashes) == 0:
+            return [terms[:0] for _ in keys]
+        wanted = hash_strings(keys)
+        positions = np.minimum(np.searchsorted(hashes, wanted), len(hashes) - 1)
+        found = hashes[positions] == wanted
+        return [terms[ptr[pos]:ptr[pos + 1]] if hit else terms[:0]
+                for pos, hit in zip(positions.tolist(), found.tolist())]
+
+    def terms_by_name(self, name: str) -> np.ndarray:
+        """Term positions whose lowercased name equals name, in file order"""
+        return self._lookup('name', name.lower())
+
+    def terms_by_token(self, token: str) -> np.ndarray:
+        """Term positions whose name contains the word token, in file order"""
+        return self._lookup('token', token.lower())
+
+    def terms_by_synonym(self, synonym: str) -> np.ndarray:
+        """Term positions listing synonym, in file order"""
+        return self._lookup('synonym', synonym.lower())
+
+    def first_term_containing(self, substring: str) -> Optional[int]:
+        """
+        Position of the first term (in file order) whose lowercased name contains substring
+        
+        Same answer as scanning every name in order, but only the terms that
+        hold all of the substring's trigrams are checked.
+        """
+        substring = substring.lower()
+        if len(self) == 0:
+            return None
+        if not substring:
+            return 0
+        if len(substring) < 3:
+            terms = self._lookup('short', substring)
+            return int(terms[0]) if len(terms) else None
+
+        postings = sorted(self._lookup_many('trigram', list(set(trigrams(substring)))), key=len)
+        rarest, others = postings[0], postings[1:]
+        # Walk the rarest trigram's postings in file order, in growing batches, keeping
+        # terms that hold every other trigram; the first verified match wins
+        start, batch = 0, VERIFY_BATCH
+        while start < len(rarest):
+            candidates = rarest[start:start + batch]
+            for other in others:
+                positions = np.minimum(np.searchsorted(other, candidates), len(other) - 1)
+                candidates = candidates[other[positions] == candidates]
+                if len(candidates) == 0:
+                    break
+            for term in candidates.tolist():
+                if substring in self.names[term].lower():
+                    return term
+            start, batch = start + batch, batch * 2
+        return None
+
+    def go_id(self, term: int) -> str:
+        return self.ids[term].decode('ascii')
+
+    def name(self, term: int) -> str:
+        return self.names[term]
+
+    def term_synonyms(self, term: int) -> List[str]:
+        return [self.synonyms[i] for i in range(self.synonyms_ptr[term], self.synonyms_ptr[term + 1])]
+
+    def term_alt_ids(self, term: int) -> List[str]:
+        return [a.decode('ascii') for a in self.alt_ids[self.alt_ids_ptr[term]:self.alt_ids_ptr[term + 1]]]
+
+def load_or_build(obo_path: str, index_dir: str) -> Optional[GOIndex]:
+    """Open index_dir, rebuilding it first if missing or older than obo_path"""
+    try:
+        index = GOIndex(index_dir)
+        if index.is_current(obo_path):
+            return index
+    except (OSError, ValueError):
+        pass
+    if not os.path.exists(obo_path):
+        return None
+    return build_go_index(obo_path, index_dir)
+
+if __name__ == "__main__":
+    obo_path = sys.argv[1] if len(sys.argv) > 1 else 'go-basic.obo'
+    index_dir = sys.argv[2] if len(sys.argv) > 2 else 'go-basic.idx'
+    start = time.time()
+    index = build_go_index(obo_path, index_dir)
+    print(f"Indexed {len(index)} GO terms from {obo_path} in {time.time() - start:.1f}s -> {index_dir}")
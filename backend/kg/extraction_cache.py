@@ -0,0 +1,49 @@
+import hashlib
+import json
+import os
+from typing import Optional
+
+class ExtractionCache:
+    """
+    On-disk cache of LLM extraction responses, one JSON file per chunk
+
+    Keys hash the model name, the prompt version and the chunk text, so
+    changing the model or the prompt only invalidates the chunks it affects.
+    Files are written to a temporary name and renamed, so concurrent workers
+    and interrupted runs never leave a partial entry behind.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model_name: str, prompt_version: str, text: str) -> str:
+        digest = hashlib.sha256()
+        for part in (model_name, prompt_version, text):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + '.json')
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                response = json.load(f)['response']
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return response
+
+    def put(self, key: str, response: str, **info):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{id(response)}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(dict(info, response=response), f)
+        os.replace(tmp_path, path)
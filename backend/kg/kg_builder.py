@@ -1,88 +1,310 @@
+import hashlib
 import json
-from typing import List, Tuple
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Iterable, List, NamedTuple, Optional, Set, Tuple
 from langchain_ollama import OllamaLLM
 from langchain.prompts import PromptTemplate
 from .kg_schema import BiologyKGSchema, Entity, Relation, EntityType, EvidenceTriple
+from .extraction_cache import ExtractionCache
 import sys
-import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from thesaurus import BiologyThesaurus
+from corpus.chunking import chunk_paper
+
+EXTRACTION_TEMPLATE = """Extract biology entities and relationships from NASA space experiment text:
+{text}
+
+Return JSON with evidence-first approach:
+{{"entities": [{{"id": "e1", "type": "experiment", "name": "...", "properties": {{}}}}, ...],
+  "relations": [{{"subject": "e1", "predicate": "studies", "object": "e2", "confidence": 0.9, "evidence": "exact quote from text"}}]}}"""
+EXTRACTION_PROMPT = PromptTemplate(input_variables=["text"], template=EXTRACTION_TEMPLATE)
+# Part of every cache key, so editing the prompt re-extracts only under the new prompt
+PROMPT_VERSION = hashlib.sha256(EXTRACTION_TEMPLATE.encode('utf-8')).hexdigest()[:16]
+
+# Rough size of a Gemma token in English text, for budgeting prompts without a tokenizer
+CHARS_PER_TOKEN = 4
+# Sections with no experimental findings to extract
+BACK_MATTER_SECTIONS = {'references', 'acknowledgments', 'acknowledgements', 'acknowledgment', 'acknowledgement',
+                        'funding', 'conflicts of interest', 'conflict of interest', 'data availability'}
+
+def canonical_name(name: str) -> str:
+    """Key entities are merged by: case and whitespace are ignored"""
+    return " ".join(name.lower().split())
+
+class Extraction(NamedTuple):
+    """Entities, relations and evidence triples extracted from one text"""
+    entities: List[Entity]
+    relations: List[Relation]
+    triples: List[EvidenceTriple]
+    parsed: bool  # False when the LLM response was not valid JSON
+
+@dataclass
+class BuildStats:
+    extracted: int = 0
+    skipped: int = 0  # already in the journal
+    failed: int = 0
+    incomplete: int = 0  # extracted, but some chunk's response could not be parsed
+    triples: int = 0
+    seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def papers_per_minute(self) -> float:
+        return self.extracted / self.seconds * 60 if self.seconds > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (f"{self.extracted} papers extracted ({self.papers_per_minute:.1f} papers/min), "
+                f"{self.skipped} skipped, {self.failed} failed, {self.incomplete} incomplete, "
+                f"{self.triples} triples in {self.seconds:.1f}s")
+
+class ExtractionJournal:
+    """
+    Append-only JSONL record of publications whose extraction has been stored
+
+    A publication is recorded only after its triples are committed to
+    KGStorage, so a restarted build skips exactly the stored publications.
+    Entries with parsed=False (an LLM response could not be parsed) do not
+    count as completed, so those publications are extracted again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def completed(self) -> Set[str]:
+        done = set()
+        if not os.path.exists(self.path):
+            return done
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    source_id = entry['source_id']
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    continue  # line cut short by an interrupted run
+                if entry.get('parsed', True):
+                    done.add(source_id)
+        return done
+
+    def record(self, entries: List[dict]):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
 
 class KnowledgeGraphBuilder:
-    def __init__(self, model_name="gemma2:2b"):
-        self.llm = OllamaLLM(model=model_name)
+    def __init__(self, model_name="gemma2:2b", base_url: str = None, llm=None, cache_dir: str = None,
+                 max_chunk_tokens: int = 1000):
+        """
+        Args:
+            model_name: Ollama model used for extraction
+            base_url: Ollama server URL (e.g. a local stand-in server); defaults to localhost:11434
+            llm: Optional callable prompt -> completion replacing the Ollama model
+            cache_dir: Optional directory caching the response for each chunk
+            max_chunk_tokens: Approximate token budget of the text in one prompt
+        """
+        if llm is None:
+            llm = OllamaLLM(model=model_name, base_url=base_url) if base_url else OllamaLLM(model=model_name)
+        self.llm = llm
+        self.model_name = model_name
+        self.max_chunk_tokens = max_chunk_tokens
+        self.cache = ExtractionCache(cache_dir) if cache_dir else None
         self.kg = BiologyKGSchema()
-        self.thesaurus = BiologyThesaurus()
+        self.thesaurus = BiologyThesaurus.shared()
+        self.last_stats = None
         
 
     
     def extract_entities_relations(self, text: str, source_id: str = None):
-        prompt = PromptTemplate(
-            input_variables=["text"],
-            template="""Extract biology entities and relationships from NASA space experiment text:
-{text}
-
-Return JSON with evidence-first approach:
-{{"entities": [{{"id": "e1", "type": "experiment", "name": "...", "properties": {{}}}}, ...],
-  "relations": [{{"subject": "e1", "predicate": "studies", "object": "e2", "confidence": 0.9, "evidence": "exact quote from text"}}]}}"""
-        )
+        self.add_extraction(self.extract(text, source_id))
+    
+    def add_extraction(self, extraction: Extraction):
+        for entity in extraction.entities:
+            self.kg.add_entity(entity)
+        for triple, relation in zip(extraction.triples, extraction.relations):
+            self.kg.add_evidence_triple(triple)
+            self.kg.add_relation(relation)
+    
+    def chunk_text(self, text: str) -> List[str]:
+        """Section-bounded chunks of about max_chunk_tokens tokens, leaving out the back matter"""
+        max_chars = self.max_chunk_tokens * CHARS_PER_TOKEN
+        return [passage.text for passage in chunk_paper('', text, max_chars, overlap=0)
+                if passage.section not in BACK_MATTER_SECTIONS]
+    
+    def extract(self, text: str, source_id: str = None) -> Extraction:
+        """
+        Extract from each chunk of text and merge the results
+        
+        Entities are merged across chunks by canonical name, which also becomes
+        their id, and relations refer to them by it. A chunk whose response
+        cannot be parsed is left out and the result has parsed=False; the
+        journal then keeps the paper pending, and a rerun asks only about that
+        chunk again, the others being cached. Does not modify self.kg, so it
+        can run in worker threads.
+        """
+        entities, relations, parsed = {}, [], True
+        for chunk in self.chunk_text(text):
+            result = self._extract_chunk(chunk)
+            if result is None:
+                parsed = False
+                continue
+            for entity in result.entities:
+                merged = entities.get(entity.id)
+                if merged is None:
+                    entities[entity.id] = entity
+                else:
+                    for name, value in entity.properties.items():
+                        merged.properties.setdefault(name, value)
+            relations.extend(result.relations)
+        
+        # Create evidence-first triples with confidence scores
+        triples = [EvidenceTriple(
+            subject=r.subject,
+            predicate=r.predicate,
+            object=r.object,
+            evidence=r.evidence,
+            confidence=r.confidence,
+            source_id=source_id or "unknown"
+        ) for r in relations]
+        return Extraction(list(entities.values()), relations, triples, parsed)
+    
+    def _extract_chunk(self, text: str) -> Optional[Extraction]:
+        """
+        Entities and relations of one chunk, or None if the response is unusable
+        
+        Responses are cached by (model, prompt version, chunk text); unusable
+        ones are not, so a rerun asks again.
+        """
+        key = ExtractionCache.key(self.model_name, PROMPT_VERSION, text) if self.cache else None
+        response = self.cache.get(key) if self.cache else None
+        cached = response is not None
+        if response is None:
+            # LangChain models are invoked; a plain callable llm is called
+            complete = self.llm.invoke if hasattr(self.llm, 'invoke') else self.llm
+            response = complete(EXTRACTION_PROMPT.format(text=text))
         
-        response = self.llm(prompt.format(text=text))
         try:
             data = json.loads(response)
             
-            # Map entities to thesaurus and add
+            # Map entities to thesaurus; chunk-local ids ("e1") resolve to canonical names
+            entity_ids, entities = {}, []
             for e in data.get("entities", []):
                 mapped_name = self.thesaurus.map_term(e["name"])
-                entity = Entity(
-                    id=e["id"],
+                entity_id = canonical_name(mapped_name)
+                entity_ids[e["id"]] = entity_id
+                entities.append(Entity(
+                    id=entity_id,
                     type=EntityType(e["type"]),
                     name=mapped_name,
-                    properties=e.get("properties", {})
-                )
-                self.kg.add_entity(entity)
+                    properties=dict(e.get("properties", {}))
+                ))
             
-            # Create evidence-first triples with confidence scores
+            relations = []
             for r in data.get("relations", []):
                 # Map predicate to thesaurus
-                mapped_predicate = self.thesaurus.map_term(r["predicate"])
-                
-                # Create evidence triple
-                evidence_triple = EvidenceTriple(
-                    subject=r["subject"],
-                    predicate=mapped_predicate,
-                    object=r["object"],
-                    evidence=r["evidence"],
-                    confidence=r["confidence"],
-                    source_id=source_id or "unknown"
-                )
-                
-                relation = Relation(
-                    subject=r["subject"],
-                    predicate=mapped_predicate,
-                    object=r["object"],
-                    confidence=r["confidence"],
+                relations.append(Relation(
+                    subject=entity_ids.get(r["subject"], r["subject"]),
+                    predicate=self.thesaurus.map_term(r["predicate"]),
+                    object=entity_ids.get(r["object"], r["object"]),
+                    confidence=float(r["confidence"]),
                     evidence=r["evidence"]
-                )
-                
-                self.kg.add_evidence_triple(evidence_triple)
-                self.kg.add_relation(relation)
-                
-        except json.JSONDecodeError:
+                ))
+        except (json.JSONDecodeError, AttributeError, KeyError, TypeError, ValueError):
             print(f"Failed to parse LLM response: {response}")
+            return None
+        
+        if self.cache and not cached:
+            self.cache.put(key, response, model=self.model_name, prompt_version=PROMPT_VERSION)
+        return Extraction(entities, relations, [], True)
     
 
     
-    def build_from_publications(self, publications: List[Tuple[str, str]]):
-        """Build KG from publications with source tracking"""
-        for pub_id, pub_text in publications:
-            self.extract_entities_relations(pub_text, pub_id)
+    def build_from_publications(self, publications: Iterable[Tuple[str, str]], workers: int = 1,
+                                storage=None, journal_path: str = None, store_batch_size: int = 500,
+                                progress_every: int = 10):
+        """
+        Build KG from publications with source tracking
+        
+        Up to `workers` LLM calls run concurrently, with a bounded number of
+        publications read ahead, so publications may be a lazy iterator
+        (e.g. corpus.chunking.iter_papers). Results are merged into self.kg as
+        they arrive and, with a storage, written in batches of about
+        store_batch_size triples. With a journal, publications stored by a
+        previous run are skipped; a publication that failed, or had a
+        response that could not be parsed, is retried.
+        
+        Args:
+            publications: (pub_id, text) pairs
+            workers: Concurrent extraction requests
+            storage: Optional KGStorage receiving the triples in batches
+            journal_path: Optional JSONL checkpoint of stored publications
+            store_batch_size: Triples per storage transaction
+            progress_every: Print throughput after this many publications
+        """
+        journal = ExtractionJournal(journal_path) if journal_path else None
+        done = journal.completed() if journal else set()
+        stats = BuildStats()
+        start = time.perf_counter()
+        batch, batch_entries = BiologyKGSchema(), []
+        
+        def flush():
+            nonlocal batch, batch_entries
+            if storage is not None and batch_entries:
+                storage.store_kg(batch)
+            if journal is not None and batch_entries:
+                journal.record(batch_entries)
+            batch, batch_entries = BiologyKGSchema(), []
+        
+        def collect(futures):
+            for future in futures:
+                pub_id = in_flight.pop(future)
+                try:
+                    extraction = future.result()
+                except Exception as e:
+                    stats.failed += 1
+                    stats.errors.append(f"{pub_id}: {e}")
+                    print(f"Extraction failed for {pub_id}: {e}")
+                    continue
+                self.add_extraction(extraction)
+                for entity in extraction.entities:
+                    batch.add_entity(entity)
+                for triple, relation in zip(extraction.triples, extraction.relations):
+                    batch.add_evidence_triple(triple)
+                    batch.add_relation(relation)
+                batch_entries.append({'source_id': pub_id, 'triples': len(extraction.triples),
+                                      'parsed': extraction.parsed})
+                stats.extracted += 1
+                stats.incomplete += not extraction.parsed
+                stats.triples += len(extraction.triples)
+                if batch.num_source_triples >= store_batch_size:
+                    flush()
+                if progress_every and stats.extracted % progress_every == 0:
+                    stats.seconds = time.perf_counter() - start
+                    print(f"Extracted {stats.extracted} papers ({stats.papers_per_minute:.1f} papers/min), "
+                          f"{stats.triples} triples")
+        
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='kg-extract') as pool:
+            for pub_id, pub_text in publications:
+                if pub_id in done:
+                    stats.skipped += 1
+                    continue
+                # Read ahead a little so workers never wait, without loading every paper
+                while len(in_flight) >= 2 * workers:
+                    collect(wait(in_flight, return_when=FIRST_COMPLETED).done)
+                in_flight[pool.submit(self.extract, pub_text, pub_id)] = pub_id
+            while in_flight:
+                collect(wait(in_flight, return_when=FIRST_COMPLETED).done)
+        flush()
+        
+        stats.seconds = time.perf_counter() - start
+        self.last_stats = stats
+        print(f"Built KG: {stats}")
         return self.kg
     
     def get_ranked_triples(self, min_confidence: float = 0.5) -> List[EvidenceTriple]:
-        """Get evidence triples ranked by confidence for reranking"""
-        return sorted(
-            [t for t in self.kg.evidence_triples if t.confidence >= min_confidence],
-            key=lambda x: x.confidence,
-            reverse=True
-        )
\ No newline at end of file
+        """Get evidence triples ranked by confidence for reranking, one per fact"""
+        return self.kg.ranked_triples(min_confidence)
\ No newline at end of file
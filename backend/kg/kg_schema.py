@@ -1,5 +1,6 @@
+from bisect import bisect_left, bisect_right, insort
 from dataclasses import dataclass
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
 from enum import Enum
 
 class EntityType(Enum):
@@ -37,19 +38,84 @@ class EvidenceTriple:
     source_id: str
 
 class BiologyKGSchema:
+    """
+    In-memory KG that keeps one fact per (subject, predicate, object)
+
+    Repeated relations and evidence triples are merged as they are added:
+    each fact keeps its highest confidence and the evidence it came with,
+    and the best evidence from every source is kept per source. Facts are
+    also held in confidence order, so ranked reads cost O(k).
+    """
+
     def __init__(self):
         self.entities = {}
-        self.relations = []
-        self.evidence_triples = []
+        self._relations = {}  # (subject, predicate, object) -> Relation with the highest confidence
+        self._triples = {}    # (subject, predicate, object) -> EvidenceTriple with the highest confidence
+        self._sources = {}    # (subject, predicate, object) -> {source_id: best EvidenceTriple}
+        self._first_seen = {} # (subject, predicate, object) -> insertion number, breaks ranking ties
+        self._ranked = []     # (-confidence, first seen, key), ascending
+        self._num_source_triples = 0
+        
+    @property
+    def relations(self) -> List[Relation]:
+        return list(self._relations.values())
+    
+    @property
+    def evidence_triples(self) -> List[EvidenceTriple]:
+        """One triple per fact, with its highest confidence, in the order facts were first seen"""
+        return list(self._triples.values())
+    
+    @property
+    def num_source_triples(self) -> int:
+        """Distinct (subject, predicate, object, source_id) rows, as KGStorage stores them"""
+        return self._num_source_triples
         
     def add_entity(self, entity: Entity):
         self.entities[entity.id] = entity
         
     def add_relation(self, relation: Relation):
-        self.relations.append(relation)
+        key = (relation.subject, relation.predicate, relation.object)
+        merged = self._relations.get(key)
+        if merged is None or relation.confidence > merged.confidence:
+            self._relations[key] = relation
         
     def add_evidence_triple(self, triple: EvidenceTriple):
-        self.evidence_triples.append(triple)
+        key = (triple.subject, triple.predicate, triple.object)
+        sources = self._sources.setdefault(key, {})
+        best = sources.get(triple.source_id)
+        if best is None:
+            self._num_source_triples += 1
+        if best is None or triple.confidence > best.confidence:
+            sources[triple.source_id] = triple
+        
+        merged = self._triples.get(key)
+        if merged is None:
+            self._first_seen[key] = len(self._first_seen)
+            insort(self._ranked, (-triple.confidence, self._first_seen[key], key))
+            self._triples[key] = triple
+        elif triple.confidence > merged.confidence:
+            # Move the fact up the ranking, keeping its first-seen position among ties
+            seen = self._first_seen[key]
+            del self._ranked[bisect_left(self._ranked, (-merged.confidence, seen))]
+            insort(self._ranked, (-triple.confidence, seen, key))
+            self._triples[key] = triple
+    
+    def get_sources(self, subject: str, predicate: str, object: str) -> List[EvidenceTriple]:
+        """Best evidence from each source for a fact, highest confidence first"""
+        sources = self._sources.get((subject, predicate, object), {})
+        return sorted(sources.values(), key=lambda t: t.confidence, reverse=True)
+    
+    def source_triples(self) -> Iterator[EvidenceTriple]:
+        """Best evidence triple per (subject, predicate, object, source_id)"""
+        for sources in self._sources.values():
+            yield from sources.values()
+    
+    def ranked_triples(self, min_confidence: float = 0.0, limit: int = None) -> List[EvidenceTriple]:
+        """Facts with at least min_confidence, highest confidence first (ties in first-seen order)"""
+        end = bisect_right(self._ranked, (-min_confidence, float('inf')))
+        if limit is not None:
+            end = min(end, limit)
+        return [self._triples[key] for _, _, key in self._ranked[:end]]
         
     def get_schema(self):
         return {
@@ -1,164 +1,472 @@
 import sqlite3
 import json
-from typing import List
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Iterable, List, Dict, Tuple
 from .kg_schema import BiologyKGSchema, Entity, Relation, EntityType, EvidenceTriple
 
+# Applied to every pooled connection; override per storage with pragmas={...}
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # negative values are KiB
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,
+}
+
+# Upsert rather than INSERT OR REPLACE: REPLACE deletes the old row without
+# firing delete triggers, which would leave stale rows in evidence_fts
+UPSERT_TRIPLE_SQL = """
+    INSERT INTO evidence_triples (subject, predicate, object, evidence, confidence, source_id)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(subject, predicate, object, source_id) DO UPDATE SET
+        evidence = excluded.evidence, confidence = excluded.confidence
+"""
+
+GENERATION_EVENTS = ("INSERT", "UPDATE", "DELETE")
+# Row-level triggers that bulk_load(defer_indexes=True) replaces with one rebuild
+DEFERRED_TRIGGERS = [f"evidence_triples_generation_{event.lower()}" for event in GENERATION_EVENTS] + [
+    'evidence_fts_insert', 'evidence_fts_delete', 'evidence_fts_update']
+
 class KGStorage:
-    def __init__(self, db_path="biology_kg.db"):
+    def __init__(self, db_path="biology_kg.db", pool_size: int = 8, pragmas: Dict = None):
+        """
+        Args:
+            db_path: SQLite database file
+            pool_size: Maximum number of long-lived connections shared across threads
+            pragmas: Overrides for DEFAULT_PRAGMAS
+        """
         self.db_path = db_path
+        self.pragmas = {**DEFAULT_PRAGMAS, **(pragmas or {})}
+        # An in-memory database exists per connection, so it can only have one
+        self.pool_size = 1 if db_path == ":memory:" else max(1, pool_size)
+        self._pool = queue.LifoQueue()
+        self._pool_lock = threading.Lock()
+        self._num_connections = 0
         self._init_db()
     
+    def _connect(self) -> sqlite3.Connection:
+        # Statements are prepared once per connection and reused from its cache
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=256)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+    
+    @contextmanager
+    def _connection(self):
+        """Borrow a pooled connection; commits on success and rolls back on error"""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._pool_lock:
+                if self._num_connections < self.pool_size:
+                    self._num_connections += 1
+                    conn = self._connect()
+            if conn is None:
+                conn = self._pool.get()
+        
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._pool.put(conn)
+    
+    def close(self):
+        """Close all idle pooled connections"""
+        with self._pool_lock:
+            while True:
+                try:
+                    conn = self._pool.get_nowait()
+                except queue.Empty:
+                    break
+                conn.close()
+                self._num_connections -= 1
+    
     def _init_db(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._connection() as conn:
+            cursor = conn.cursor()
         
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS entities (
+                    id TEXT PRIMARY KEY,
+                    type TEXT,
+                    name TEXT,
+                    properties TEXT
+                )
+            """)
+        
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS relations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    subject TEXT,
+                    predicate TEXT,
+                    object TEXT,
+                    confidence REAL,
+                    evidence TEXT
+                )
+            """)
+        
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS evidence_triples (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    subject TEXT,
+                    predicate TEXT,
+                    object TEXT,
+                    evidence TEXT,
+                    confidence REAL,
+                    source_id TEXT,
+                    UNIQUE(subject, predicate, object, source_id)
+                )
+            """)
+        
+            self._create_confidence_index(cursor)
+        
+            # Generation counter bumped on every evidence_triples change, so caches
+            # built from the KG (in this or another process) can detect staleness
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS kg_meta (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER
+                )
+            """)
+            cursor.execute("INSERT OR IGNORE INTO kg_meta (key, value) VALUES ('generation', 0)")
+            self._create_generation_triggers(cursor)
+        
+            self.has_fts = self._init_fts(cursor)
+    
+    @staticmethod
+    def _create_confidence_index(cursor):
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS entities (
-                id TEXT PRIMARY KEY,
-                type TEXT,
-                name TEXT,
-                properties TEXT
-            )
+            CREATE INDEX IF NOT EXISTS idx_confidence 
+            ON evidence_triples(confidence DESC)
         """)
+    
+    @staticmethod
+    def _create_generation_triggers(cursor):
+        for event in GENERATION_EVENTS:
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS evidence_triples_generation_{event.lower()}
+                AFTER {event} ON evidence_triples
+                BEGIN
+                    UPDATE kg_meta SET value = value + 1 WHERE key = 'generation';
+                END
+            """)
+    
+    def _init_fts(self, cursor) -> bool:
+        """Create the trigram full-text index over evidence_triples, kept in sync by triggers"""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'evidence_fts'")
+        exists = cursor.fetchone() is not None
+        if not exists:
+            try:
+                cursor.execute("""
+                    CREATE VIRTUAL TABLE evidence_fts USING fts5(
+                        subject, predicate, object, evidence,
+                        content='evidence_triples', content_rowid='id',
+                        tokenize='trigram'
+                    )
+                """)
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5 or older than 3.34 (no trigram tokenizer)
+                return False
+            # Index rows written before the full-text table existed
+            cursor.execute("INSERT INTO evidence_fts(evidence_fts) VALUES ('rebuild')")
         
+        self._create_fts_triggers(cursor)
+        return True
+    
+    @staticmethod
+    def _create_fts_triggers(cursor):
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS relations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                subject TEXT,
-                predicate TEXT,
-                object TEXT,
-                confidence REAL,
-                evidence TEXT
-            )
+            CREATE TRIGGER IF NOT EXISTS evidence_fts_insert AFTER INSERT ON evidence_triples
+            BEGIN
+                INSERT INTO evidence_fts (rowid, subject, predicate, object, evidence)
+                VALUES (new.id, new.subject, new.predicate, new.object, new.evidence);
+            END
         """)
-        
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS evidence_triples (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                subject TEXT,
-                predicate TEXT,
-                object TEXT,
-                evidence TEXT,
-                confidence REAL,
-                source_id TEXT,
-                UNIQUE(subject, predicate, object, source_id)
-            )
+            CREATE TRIGGER IF NOT EXISTS evidence_fts_delete AFTER DELETE ON evidence_triples
+            BEGIN
+                INSERT INTO evidence_fts (evidence_fts, rowid, subject, predicate, object, evidence)
+                VALUES ('delete', old.id, old.subject, old.predicate, old.object, old.evidence);
+            END
         """)
-        
         cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_confidence 
-            ON evidence_triples(confidence DESC)
+            CREATE TRIGGER IF NOT EXISTS evidence_fts_update AFTER UPDATE ON evidence_triples
+            BEGIN
+                INSERT INTO evidence_fts (evidence_fts, rowid, subject, predicate, object, evidence)
+                VALUES ('delete', old.id, old.subject, old.predicate, old.object, old.evidence);
+                INSERT INTO evidence_fts (rowid, subject, predicate, object, evidence)
+                VALUES (new.id, new.subject, new.predicate, new.object, new.evidence);
+            END
         """)
-        
-        conn.commit()
-        conn.close()
     
     def store_kg(self, kg: BiologyKGSchema):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        # Every source's evidence is kept; duplicates within a source were merged in kg
+        self.bulk_load(kg.source_triples(), kg.entities.values(), kg.relations)
+    
+    def bulk_load(self, triples: Iterable[EvidenceTriple] = (), entities: Iterable[Entity] = (),
+                  relations: Iterable[Relation] = (), defer_indexes: bool = False) -> int:
+        """
+        Write entities, relations and evidence triples in one transaction
         
-        # Store entities
-        for entity in kg.entities.values():
-            cursor.execute("""
+        The iterables are consumed lazily by executemany, so generators can
+        load a KG larger than memory. With defer_indexes, the confidence index
+        and the per-row triggers (full-text sync, generation counter) are
+        dropped for the load and rebuilt once at the end, which is much faster
+        for very large loads but re-indexes the triples already stored too.
+        Returns the number of triples written.
+        
+        Args:
+            triples: Evidence triples, upserted by (subject, predicate, object, source_id)
+            entities: Entities, replaced by id
+            relations: Relations, appended
+            defer_indexes: Rebuild secondary indexes after the load instead of per row
+        """
+        count = 0
+        
+        def triple_rows():
+            nonlocal count
+            for t in triples:
+                count += 1
+                yield (t.subject, t.predicate, t.object, t.evidence, t.confidence, t.source_id)
+        
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            # Explicit, so the dropped indexes come back if the load fails
+            cursor.execute("BEGIN")
+            if defer_indexes:
+                cursor.execute("DROP INDEX IF EXISTS idx_confidence")
+                for trigger in DEFERRED_TRIGGERS:
+                    cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            
+            cursor.executemany("""
                 INSERT OR REPLACE INTO entities (id, type, name, properties)
                 VALUES (?, ?, ?, ?)
-            """, (entity.id, entity.type.value, entity.name, json.dumps(entity.properties)))
-        
-        # Store relations
-        for relation in kg.relations:
-            cursor.execute("""
+            """, ((e.id, e.type.value, e.name, json.dumps(e.properties)) for e in entities))
+            cursor.executemany("""
                 INSERT INTO relations (subject, predicate, object, confidence, evidence)
                 VALUES (?, ?, ?, ?, ?)
-            """, (relation.subject, relation.predicate, relation.object, 
-                  relation.confidence, relation.evidence))
-        
-        # Store evidence triples
-        for triple in kg.evidence_triples:
-            cursor.execute("""
-                INSERT OR REPLACE INTO evidence_triples 
-                (subject, predicate, object, evidence, confidence, source_id)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (triple.subject, triple.predicate, triple.object,
-                  triple.evidence, triple.confidence, triple.source_id))
+            """, ((r.subject, r.predicate, r.object, r.confidence, r.evidence) for r in relations))
+            cursor.executemany(UPSERT_TRIPLE_SQL, triple_rows())
+            
+            if defer_indexes:
+                self._create_confidence_index(cursor)
+                self._create_generation_triggers(cursor)
+                if self.has_fts:
+                    cursor.execute("INSERT INTO evidence_fts(evidence_fts) VALUES ('rebuild')")
+                    self._create_fts_triggers(cursor)
+                if count:
+                    cursor.execute("UPDATE kg_meta SET value = value + 1 WHERE key = 'generation'")
+        return count
+    
+    def store_triples(self, triples: List[EvidenceTriple]) -> int:
+        """Upsert evidence triples and return the generation as of this write"""
+        return self.upsert_triples(triples)[0]
+    
+    def upsert_triples(self, triples: List[EvidenceTriple]) -> Tuple[int, List[EvidenceTriple]]:
+        """
+        Upsert evidence triples
         
-        conn.commit()
-        conn.close()
+        Returns (the generation as of this write, the triples whose
+        (subject, predicate, object, source_id) was not stored before).
+        Within triples, the last one with a given key is the one written.
+        """
+        latest = {(t.subject, t.predicate, t.object, t.source_id): t for t in triples}
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            # Take the write lock first, so no other writer stores a key between the check and the upsert
+            cursor.execute("BEGIN IMMEDIATE")
+            new_triples = []
+            for key, t in latest.items():
+                cursor.execute("""
+                    SELECT 1 FROM evidence_triples
+                    WHERE subject = ? AND predicate = ? AND object = ? AND source_id = ?
+                """, key)
+                if cursor.fetchone() is None:
+                    new_triples.append(t)
+            cursor.executemany(UPSERT_TRIPLE_SQL, [(t.subject, t.predicate, t.object, t.evidence,
+                                                    t.confidence, t.source_id) for t in latest.values()])
+            cursor.execute("SELECT value FROM kg_meta WHERE key = 'generation'")
+            generation = cursor.fetchone()[0]
+        return generation, new_triples
     
     def query_relations(self, entity_id: str):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._connection() as conn:
+            cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT * FROM relations 
-            WHERE subject = ? OR object = ?
-            ORDER BY confidence DESC
-        """, (entity_id, entity_id))
+            cursor.execute("""
+                SELECT * FROM relations 
+                WHERE subject = ? OR object = ?
+                ORDER BY confidence DESC
+            """, (entity_id, entity_id))
         
-        results = cursor.fetchall()
-        conn.close()
+            results = cursor.fetchall()
         return results
     
     def get_evidence_triples_ranked(self, min_confidence: float = 0.5) -> List[EvidenceTriple]:
         """Get evidence triples ranked by confidence for reranking"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._connection() as conn:
+            cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT subject, predicate, object, evidence, confidence, source_id
-            FROM evidence_triples 
-            WHERE confidence >= ?
-            ORDER BY confidence DESC
-        """, (min_confidence,))
-        
-        results = []
-        for row in cursor.fetchall():
-            results.append(EvidenceTriple(
-                subject=row[0], predicate=row[1], object=row[2],
-                evidence=row[3], confidence=row[4], source_id=row[5]
-            ))
+            cursor.execute("""
+                SELECT subject, predicate, object, evidence, confidence, source_id
+                FROM evidence_triples 
+                WHERE confidence >= ?
+                ORDER BY confidence DESC
+            """, (min_confidence,))
         
-        conn.close()
+            results = []
+            for row in cursor.fetchall():
+                results.append(EvidenceTriple(
+                    subject=row[0], predicate=row[1], object=row[2],
+                    evidence=row[3], confidence=row[4], source_id=row[5]
+                ))
         return results
     
     def query_by_thesaurus_term(self, term: str) -> List[EvidenceTriple]:
         """Query evidence triples by thesaurus-mapped term"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        return self.search_triples(term)
+    
+    def search_triples(self, term: str, min_confidence: float = 0.0, limit: int = None,
+                       include_evidence: bool = False) -> List[EvidenceTriple]:
+        """
+        Find triples whose subject, predicate or object contains term
         
-        cursor.execute("""
-            SELECT subject, predicate, object, evidence, confidence, source_id
-            FROM evidence_triples 
-            WHERE subject LIKE ? OR predicate LIKE ? OR object LIKE ?
-            ORDER BY confidence DESC
-        """, (f"%{term}%", f"%{term}%", f"%{term}%"))
+        Uses the trigram full-text index when available; terms shorter than
+        three characters cannot use it and fall back to a LIKE scan.
+        
+        Args:
+            term: Case-insensitive substring to match
+            min_confidence: Minimum triple confidence
+            limit: Maximum number of triples, highest confidence first
+            include_evidence: Also match the evidence text
+        """
+        columns = ['subject', 'predicate', 'object'] + (['evidence'] if include_evidence else [])
+        limit = -1 if limit is None else limit
+        
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            
+            if self.has_fts and len(term) >= 3:
+                match = "{%s}: %s" % (" ".join(columns), self._fts_phrase(term))
+                cursor.execute("""
+                    SELECT t.subject, t.predicate, t.object, t.evidence, t.confidence, t.source_id
+                    FROM evidence_fts
+                    JOIN evidence_triples t ON t.id = evidence_fts.rowid
+                    WHERE evidence_fts MATCH ? AND t.confidence >= ?
+                    ORDER BY t.confidence DESC
+                    LIMIT ?
+                """, (match, min_confidence, limit))
+            else:
+                like = " OR ".join(f"{column} LIKE ?" for column in columns)
+                cursor.execute(f"""
+                    SELECT subject, predicate, object, evidence, confidence, source_id
+                    FROM evidence_triples 
+                    WHERE ({like}) AND confidence >= ?
+                    ORDER BY confidence DESC
+                    LIMIT ?
+                """, (*[f"%{term}%"] * len(columns), min_confidence, limit))
+            
+            results = []
+            for row in cursor.fetchall():
+                results.append(EvidenceTriple(
+                    subject=row[0], predicate=row[1], object=row[2],
+                    evidence=row[3], confidence=row[4], source_id=row[5]
+                ))
+        return results
+    
+    def query_by_terms(self, terms: List[str], min_confidence: float = 0.0,
+                       limit: int = None) -> List[Tuple[EvidenceTriple, List[str]]]:
+        """
+        Look up several terms in one statement
+        
+        Returns one row per (subject, predicate, object), carrying its highest
+        confidence, paired with the terms that matched it, highest confidence first.
+        
+        Args:
+            terms: Case-insensitive substrings matched against subject, predicate and object
+            min_confidence: Minimum triple confidence
+            limit: Maximum number of triples
+        """
+        return self.query_by_terms_many([terms], min_confidence, limit)[0]
+    
+    def query_by_terms_many(self, term_lists: List[List[str]], min_confidence: float = 0.0,
+                            limit: int = None) -> List[List[Tuple[EvidenceTriple, List[str]]]]:
+        """query_by_terms for several term lists, run back to back on one pooled connection"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            return [self._query_by_terms(cursor, terms, min_confidence, limit) for terms in term_lists]
+    
+    def _query_by_terms(self, cursor, terms: List[str], min_confidence: float,
+                        limit: int) -> List[Tuple[EvidenceTriple, List[str]]]:
+        terms = list(dict.fromkeys(t for t in terms if t))
+        if not terms:
+            return []
+        
+        fts_terms = [t for t in terms if len(t) >= 3] if self.has_fts else []
+        like_terms = [t for t in terms if t not in fts_terms]
+        
+        conditions, params = [], []
+        if fts_terms:
+            conditions.append("id IN (SELECT rowid FROM evidence_fts WHERE evidence_fts MATCH ?)")
+            params.append("{subject predicate object}: (%s)" % " OR ".join(self._fts_phrase(t) for t in fts_terms))
+        for term in like_terms:
+            conditions.append("subject LIKE ? OR predicate LIKE ? OR object LIKE ?")
+            params.extend([f"%{term}%"] * 3)
+        
+        # SQLite takes the bare columns from the row holding MAX(confidence)
+        cursor.execute(f"""
+            SELECT subject, predicate, object, evidence, MAX(confidence), source_id
+            FROM evidence_triples
+            WHERE ({" OR ".join(conditions)}) AND confidence >= ?
+            GROUP BY subject, predicate, object
+            ORDER BY MAX(confidence) DESC
+            LIMIT ?
+        """, (*params, min_confidence, -1 if limit is None else limit))
         
         results = []
+        lowered = [t.lower() for t in terms]
         for row in cursor.fetchall():
-            results.append(EvidenceTriple(
+            triple = EvidenceTriple(
                 subject=row[0], predicate=row[1], object=row[2],
                 evidence=row[3], confidence=row[4], source_id=row[5]
-            ))
-        
-        conn.close()
+            )
+            fields = f"{row[0]}\n{row[1]}\n{row[2]}".lower()
+            results.append((triple, [t for t, low in zip(terms, lowered) if low in fields]))
         return results
     
+    @staticmethod
+    def _fts_phrase(term: str) -> str:
+        """Quote term as a single FTS5 phrase (substring match under trigram)"""
+        return '"' + term.replace('"', '""') + '"'
+    
     def get_all_triples(self) -> List[EvidenceTriple]:
         """Get all evidence triples from the database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._connection() as conn:
+            cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT subject, predicate, object, evidence, confidence, source_id
-            FROM evidence_triples 
-            ORDER BY confidence DESC
-        """)
+            cursor.execute("""
+                SELECT subject, predicate, object, evidence, confidence, source_id
+                FROM evidence_triples 
+                ORDER BY confidence DESC
+            """)
         
-        results = []
-        for row in cursor.fetchall():
-            results.append(EvidenceTriple(
-                subject=row[0], predicate=row[1], object=row[2],
-                evidence=row[3], confidence=row[4], source_id=row[5]
-            ))
+            results = []
+            for row in cursor.fetchall():
+                results.append(EvidenceTriple(
+                    subject=row[0], predicate=row[1], object=row[2],
+                    evidence=row[3], confidence=row[4], source_id=row[5]
+                ))
+        return results
+    
+    def get_generation(self) -> int:
+        """Counter that changes whenever evidence triples are written or deleted"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
         
-        conn.close()
-        return results
\ No newline at end of file
+            cursor.execute("SELECT value FROM kg_meta WHERE key = 'generation'")
+            generation = cursor.fetchone()[0]
+        return generation
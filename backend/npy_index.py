@@ -0,0 +1,70 @@
+"""Writing index directories of .npy arrays described by a meta.json
+
+BM25Index, DenseIndex, GOIndex and PassageStore all open meta.json first and
+memory-map the files it describes, so a directory whose meta.json is present
+but whose arrays are stale or missing opens without error and answers wrongly.
+Every build therefore goes to a staging directory next to the target, with
+meta.json written last, and is renamed over the target only once complete:
+an interrupted build leaves the previous index in place and a half-written
+staging directory never has a meta.json, so it cannot be opened by mistake.
+"""
+from typing import Dict
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+
+META_FILE = "meta.json"
+
+class IndexWriter:
+    """
+    Stages the files of one index directory and swaps them in on commit
+
+    Use as a context manager; leaving the block without commit() (e.g. on an
+    exception) discards the staging directory and keeps the existing index.
+    """
+
+    def __init__(self, index_dir: str):
+        self.index_dir = os.path.abspath(index_dir)
+        parent = os.path.dirname(self.index_dir)
+        os.makedirs(parent, exist_ok=True)
+        # Same parent directory, so the final rename never crosses filesystems
+        self.staging_dir = tempfile.mkdtemp(prefix=f".{os.path.basename(self.index_dir)}-", dir=parent)
+
+    def path(self, name: str) -> str:
+        """Path of a file in the staging directory, for files written by the caller"""
+        return os.path.join(self.staging_dir, name)
+
+    def save(self, name: str, array: np.ndarray):
+        """Save array as <name>.npy ('.npy' is added unless name has it)"""
+        np.save(self.path(name), array)
+
+    def commit(self, meta: Dict):
+        """Write meta.json and replace index_dir with the staged files"""
+        with open(self.path(META_FILE), 'w') as f:
+            json.dump(meta, f)
+        previous = None
+        if os.path.exists(self.index_dir):
+            previous = self.staging_dir + '.old'
+            os.rename(self.index_dir, previous)
+        os.rename(self.staging_dir, self.index_dir)
+        self.staging_dir = None
+        if previous:
+            # Readers that already mapped the old files keep them until they close
+            shutil.rmtree(previous, ignore_errors=True)
+
+    def __enter__(self) -> 'IndexWriter':
+        return self
+
+    def __exit__(self, *exc):
+        if self.staging_dir is not None:
+            shutil.rmtree(self.staging_dir, ignore_errors=True)
+            self.staging_dir = None
+
+def write_npy_index(index_dir: str, arrays: Dict[str, np.ndarray], meta: Dict):
+    """Write arrays (file name -> array) and then meta.json to index_dir, replacing it whole"""
+    with IndexWriter(index_dir) as writer:
+        for name, array in arrays.items():
+            writer.save(name, array)
+        writer.commit(meta)
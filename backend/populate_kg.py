@@ -48,21 +48,7 @@ def populate_sample_data():
         )
     ]
     
-    # Store triples directly
-    import sqlite3
-    conn = sqlite3.connect(kg_storage.db_path)
-    cursor = conn.cursor()
-    
-    for triple in sample_triples:
-        cursor.execute("""
-            INSERT OR REPLACE INTO evidence_triples 
-            (subject, predicate, object, evidence, confidence, source_id)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (triple.subject, triple.predicate, triple.object,
-              triple.evidence, triple.confidence, triple.source_id))
-    
-    conn.commit()
-    conn.close()
+    kg_storage.bulk_load(sample_triples)
     print(f"Populated {len(sample_triples)} evidence triples")
 
 if __name__ == "__main__":
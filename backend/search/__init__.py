@@ -2,13 +2,14 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from search.retrieval_methods import RetrievalMethods, SparseRetrieval, KGThesaurusRetrieval, DenseEmbeddingRetrieval, GNNClassifier
+from search.retrieval_methods import RetrievalMethods, SparseRetrieval, BM25Retrieval, KGThesaurusRetrieval, DenseEmbeddingRetrieval, GNNClassifier
 from search.reciprocal_rank_fusion import ReciprocalRankFusion
 from search.cross_encoder_reranker import CrossEncoderReranker, FeatureBasedScorer, MMRReranker, EvidenceReranker
 
 __all__ = [
     'RetrievalMethods',
     'SparseRetrieval', 
+    'BM25Retrieval',
     'KGThesaurusRetrieval',
     'DenseEmbeddingRetrieval',
     'GNNClassifier',
@@ -0,0 +1,231 @@
+from typing import Iterable, List, Tuple
+from collections import Counter
+import hashlib
+import json
+import os
+import sys
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from npy_index import write_npy_index
+
+FORMAT_VERSION = 1
+
+# File layout of an index directory. Term-level arrays are ordered by term hash
+# so a query term is located with a binary search over term_hashes.npy.
+META_FILE = "meta.json"
+TERM_HASHES_FILE = "term_hashes.npy"    # uint64, sorted
+IDF_FILE = "idf.npy"                    # float32, one per term
+POSTINGS_PTR_FILE = "postings_ptr.npy"  # int64, num_terms + 1
+POSTINGS_DOCS_FILE = "postings_docs.npy"  # int32, document ids
+POSTINGS_TF_FILE = "postings_tf.npy"    # float32, term frequencies
+DOC_LENGTHS_FILE = "doc_lengths.npy"    # float32, tokens per document
+
+def build_analyzer():
+    """Tokenizer shared by indexing and querying (no vocabulary cap)"""
+    return CountVectorizer(stop_words='english').build_analyzer()
+
+def hash_terms(terms: Iterable[str]) -> np.ndarray:
+    """Stable 64-bit hashes of terms, used instead of storing the vocabulary"""
+    return np.array([int.from_bytes(hashlib.blake2b(t.encode('utf-8'), digest_size=8).digest(), 'little')
+                     for t in terms], dtype=np.uint64)
+
+class BM25Index:
+    """Okapi BM25 statistics stored as memory-mapped NumPy arrays"""
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, META_FILE)) as f:
+            self.meta = json.load(f)
+        if self.meta.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported BM25 index format in {index_dir}")
+
+        self.k1 = self.meta['k1']
+        self.b = self.meta['b']
+        self.num_docs = self.meta['num_docs']
+        self.avg_doc_length = self.meta['avg_doc_length']
+
+        def load(name):
+            return np.load(os.path.join(index_dir, name), mmap_mode='r')
+
+        self.term_hashes = load(TERM_HASHES_FILE)
+        self.idf = load(IDF_FILE)
+        self.postings_ptr = load(POSTINGS_PTR_FILE)
+        self.postings_docs = load(POSTINGS_DOCS_FILE)
+        self.postings_tf = load(POSTINGS_TF_FILE)
+        self.doc_lengths = load(DOC_LENGTHS_FILE)
+        self.analyzer = build_analyzer()
+
+    @classmethod
+    def build(cls, documents: Iterable[str], index_dir: str, k1: float = 1.5, b: float = 0.75,
+              doc_names: List[str] = None) -> 'BM25Index':
+        """
+        Index documents and write the arrays to index_dir
+
+        Args:
+            documents: Document texts; consumed once, so a generator is fine
+            index_dir: Output directory, created if missing
+            k1: Term frequency saturation
+            b: Document length normalization
+            doc_names: Optional external ids (e.g. PMC ids) stored in meta.json
+        """
+        analyzer = build_analyzer()
+        vocabulary = {}
+        doc_ids, term_ids, tfs, doc_lengths = [], [], [], []
+
+        for doc_id, text in enumerate(documents):
+            counts = Counter(analyzer(text))
+            doc_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                doc_ids.append(doc_id)
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                tfs.append(tf)
+
+        num_docs = len(doc_lengths)
+        doc_ids = np.array(doc_ids, dtype=np.int32)
+        term_ids = np.array(term_ids, dtype=np.int64)
+        tfs = np.array(tfs, dtype=np.float32)
+
+        # Reorder terms by hash, then group postings by term
+        term_hashes = hash_terms(vocabulary.keys())
+        hash_order = np.argsort(term_hashes, kind='stable')
+        term_rank = np.empty_like(hash_order)
+        term_rank[hash_order] = np.arange(len(hash_order))
+        posting_terms = term_rank[term_ids]
+        posting_order = np.argsort(posting_terms, kind='stable')
+
+        doc_freq = np.bincount(posting_terms, minlength=len(vocabulary))
+        postings_ptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(doc_freq, out=postings_ptr[1:])
+        idf = np.log(1.0 + (num_docs - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+
+        meta = {
+            'format_version': FORMAT_VERSION,
+            'k1': k1,
+            'b': b,
+            'num_docs': num_docs,
+            'num_terms': len(vocabulary),
+            'avg_doc_length': float(np.mean(doc_lengths)) if doc_lengths else 0.0,
+        }
+        if doc_names is not None:
+            meta['doc_names'] = list(doc_names)
+        write_npy_index(index_dir, {
+            TERM_HASHES_FILE: term_hashes[hash_order],
+            IDF_FILE: idf,
+            POSTINGS_PTR_FILE: postings_ptr,
+            POSTINGS_DOCS_FILE: doc_ids[posting_order],
+            POSTINGS_TF_FILE: tfs[posting_order],
+            DOC_LENGTHS_FILE: np.array(doc_lengths, dtype=np.float32),
+        }, meta)
+
+        return cls(index_dir)
+
+    def _find_terms(self, terms: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (positions, found) for terms; positions are only valid where found"""
+        hashes = hash_terms(terms)
+        positions = np.searchsorted(self.term_hashes, hashes)
+        positions = np.minimum(positions, len(self.term_hashes) - 1)
+        return positions, self.term_hashes[positions] == hashes
+
+    def lookup_terms(self, terms: List[str]) -> np.ndarray:
+        """Return term positions for terms in the index (unknown terms dropped)"""
+        if not terms or len(self.term_hashes) == 0:
+            return np.empty(0, dtype=np.int64)
+        positions, found = self._find_terms(terms)
+        return positions[found]
+
+    def query_terms(self, query: str) -> np.ndarray:
+        """Positions of the distinct query terms present in the index"""
+        return self.lookup_terms(list(dict.fromkeys(self.analyzer(query))))
+
+    def term_frequencies(self, documents: List[str]) -> Tuple[sparse.csc_matrix, np.ndarray]:
+        """
+        Term frequencies (documents x index terms) and lengths of documents not in the index
+
+        The vocabulary and IDF stay frozen: terms the index has never seen
+        count towards a document's length but are not scored.
+        """
+        rows, cols, tfs, lengths = [], [], [], []
+        for row, text in enumerate(documents):
+            counts = Counter(self.analyzer(text))
+            lengths.append(sum(counts.values()))
+            if not counts or len(self.term_hashes) == 0:
+                continue
+            positions, found = self._find_terms(list(counts))
+            cols.extend(positions[found].tolist())
+            tfs.extend(tf for tf, hit in zip(counts.values(), found) if hit)
+            rows.extend([row] * int(found.sum()))
+        matrix = sparse.csc_matrix((np.array(tfs, dtype=np.float32), (rows, cols)),
+                                   shape=(len(lengths), len(self.term_hashes)))
+        return matrix, np.array(lengths, dtype=np.float32)
+
+    def score(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (doc_ids, bm25_scores) for documents matching any query term"""
+        return self.score_terms(self.query_terms(query))
+
+    def score_terms(self, terms: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (doc_ids, bm25_scores) for documents containing any of the term positions"""
+        return self._score(terms, self.postings_ptr, self.postings_docs, self.postings_tf, self.doc_lengths)
+
+    def score_rows(self, terms: np.ndarray, tf: sparse.csc_matrix,
+                   doc_lengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Score rows of a term_frequencies() matrix with this index's IDF and average length"""
+        return self._score(terms, tf.indptr, tf.indices, tf.data, doc_lengths)
+
+    def score_terms_batch(self, term_lists: List[np.ndarray]) -> sparse.csr_matrix:
+        """BM25 scores (queries x documents) for several queries' term positions"""
+        return self._score_matrix(term_lists, self.postings_ptr, self.postings_docs, self.postings_tf,
+                                  self.doc_lengths, self.num_docs)
+
+    def score_rows_batch(self, term_lists: List[np.ndarray], tf: sparse.csc_matrix,
+                         doc_lengths: np.ndarray) -> sparse.csr_matrix:
+        """score_rows for several queries: scores (queries x rows of tf)"""
+        return self._score_matrix(term_lists, tf.indptr, tf.indices, tf.data, doc_lengths, tf.shape[0])
+
+    def _score_matrix(self, term_lists, postings_ptr, postings_docs, postings_tf, doc_lengths,
+                      num_rows: int) -> sparse.csr_matrix:
+        """
+        Score each distinct term's postings once, as rows of a (terms x documents)
+        impact matrix, then sum them per query with one sparse product
+        """
+        if not term_lists:
+            return sparse.csr_matrix((0, num_rows))
+        present = [np.asarray(terms, dtype=np.int64) for terms in term_lists]
+        all_terms = np.concatenate(present)
+        union = np.unique(all_terms)
+
+        indptr, doc_ids, contributions = [0], [np.empty(0, dtype=np.int32)], [np.empty(0)]
+        for t in union:
+            start, end = postings_ptr[t], postings_ptr[t + 1]
+            docs = postings_docs[start:end]
+            tf = postings_tf[start:end].astype(np.float64)
+            norm = self.k1 * (1 - self.b + self.b * doc_lengths[docs] / self.avg_doc_length)
+            doc_ids.append(docs)
+            contributions.append(self.idf[t] * tf * (self.k1 + 1) / (tf + norm))
+            indptr.append(indptr[-1] + len(docs))
+        impacts = sparse.csr_matrix((np.concatenate(contributions), np.concatenate(doc_ids), np.array(indptr)),
+                                    shape=(len(union), num_rows))
+
+        # Query x term incidence; query_terms() positions are already distinct
+        query_ptr = np.concatenate([[0], np.cumsum([len(terms) for terms in present])])
+        incidence = sparse.csr_matrix((np.ones(len(all_terms)), np.searchsorted(union, all_terms), query_ptr),
+                                      shape=(len(present), len(union)))
+        return incidence @ impacts
+
+    def _score(self, terms, postings_ptr, postings_docs, postings_tf, doc_lengths) -> Tuple[np.ndarray, np.ndarray]:
+        if len(terms) == 0:
+            return np.empty(0, dtype=np.int32), np.empty(0)
+
+        doc_ids, contributions = [], []
+        for t in terms:
+            start, end = postings_ptr[t], postings_ptr[t + 1]
+            docs = postings_docs[start:end]
+            tf = postings_tf[start:end].astype(np.float64)
+            norm = self.k1 * (1 - self.b + self.b * doc_lengths[docs] / self.avg_doc_length)
+            doc_ids.append(docs)
+            contributions.append(self.idf[t] * tf * (self.k1 + 1) / (tf + norm))
+
+        candidates, inverse = np.unique(np.concatenate(doc_ids), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(contributions), minlength=len(candidates))
+        return candidates, scores
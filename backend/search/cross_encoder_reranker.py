@@ -1,6 +1,7 @@
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, NamedTuple
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer, CountVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import sys
 import os
@@ -9,15 +10,49 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from kg.kg_schema import EvidenceTriple
 from kg.kg_storage import KGStorage
 
+class _FittedDocuments(NamedTuple):
+    vectorizer: TfidfVectorizer
+    doc_vectors: sparse.csr_matrix  # L2-normalised TF-IDF row per fitted document
+    term_vocabulary: Dict[str, int]  # lowercased whitespace tokens, as str.lower().split()
+    doc_terms: sparse.csr_matrix  # binary document x token matrix
+
 class CrossEncoderReranker:
     def __init__(self):
-        self.vectorizer = TfidfVectorizer(max_features=1000, stop_words='english')
-        self.is_fitted = False
+        self._fitted = None
+        self._last_query = None  # (fitted, query, vector): rerank and MMR share one transform
+    
+    @property
+    def is_fitted(self) -> bool:
+        return self._fitted is not None
+    
+    @property
+    def vectorizer(self) -> TfidfVectorizer:
+        return self._fitted.vectorizer if self._fitted else None
+    
+    @property
+    def doc_vectors(self) -> sparse.csr_matrix:
+        return self._fitted.doc_vectors if self._fitted else None
     
     def fit(self, documents: List[str]):
-        """Fit the cross-encoder on documents"""
-        self.vectorizer.fit(documents)
-        self.is_fitted = True
+        """Fit the cross-encoder on documents and precompute their vectors; a refit is swapped in once complete"""
+        vectorizer = TfidfVectorizer(max_features=1000, stop_words='english')
+        doc_vectors = vectorizer.fit_transform(documents)
+        # Token sets for the term-overlap feature, one binary row per document
+        terms = CountVectorizer(tokenizer=str.split, token_pattern=None, binary=True, dtype=np.float32)
+        doc_terms = terms.fit_transform(documents)
+        self._fitted = _FittedDocuments(vectorizer, doc_vectors.tocsr(), terms.vocabulary_, doc_terms.tocsr())
+    
+    def query_vector(self, query: str) -> sparse.csr_matrix:
+        """TF-IDF vector of query, memoized for the most recent query"""
+        return self._query_vector(self._fitted, query)
+    
+    def _query_vector(self, fitted: _FittedDocuments, query: str) -> sparse.csr_matrix:
+        last = self._last_query
+        if last is not None and last[0] is fitted and last[1] == query:
+            return last[2]
+        vector = fitted.vectorizer.transform([query])
+        self._last_query = (fitted, query, vector)
+        return vector
     
     def score_query_document(self, query: str, document: str) -> float:
         """Score query-document pair using cross-encoder approach"""
@@ -25,7 +60,6 @@ class CrossEncoderReranker:
             raise ValueError("CrossEncoder must be fitted first")
         
         # Simple cross-encoder simulation using TF-IDF similarity
-        combined_text = f"{query} [SEP] {document}"
         query_vec = self.vectorizer.transform([query])
         doc_vec = self.vectorizer.transform([document])
         
@@ -39,6 +73,52 @@ class CrossEncoderReranker:
         
         return (similarity + overlap) / 2
     
+    def score_candidates(self, query: str, item_ids: List, documents: List[str] = None) -> np.ndarray:
+        """
+        score_query_document for every candidate at once
+        
+        Integer ids below the number of fitted documents use the vectors
+        precomputed by fit (documents must be the fitted collection, possibly
+        extended); any other candidate is transformed on the fly.
+        """
+        fitted = self._fitted
+        if fitted is None:
+            raise ValueError("CrossEncoder must be fitted first")
+        
+        # The query is transformed once; TF-IDF rows are L2-normalised, so
+        # cosine similarity is a plain dot product
+        query_vec = self._query_vector(fitted, query)
+        query_terms = set(query.lower().split())
+        query_indicator = np.zeros(len(fitted.term_vocabulary), dtype=np.float32)
+        query_indicator[[fitted.term_vocabulary[t] for t in query_terms if t in fitted.term_vocabulary]] = 1
+        
+        num_fitted = fitted.doc_vectors.shape[0]
+        similarity = np.zeros(len(item_ids))
+        overlap = np.zeros(len(item_ids))
+        rows, positions, texts, text_positions = [], [], [], []
+        for position, item_id in enumerate(item_ids):
+            if documents and isinstance(item_id, (int, np.integer)):
+                if item_id < num_fitted:
+                    rows.append(int(item_id))
+                    positions.append(position)
+                    continue
+                texts.append(documents[item_id])
+            elif isinstance(item_id, str):
+                texts.append(item_id)  # Assume item_id is the text itself
+            else:
+                texts.append(str(item_id))
+            text_positions.append(position)
+        
+        if rows:
+            similarity[positions] = (fitted.doc_vectors[rows] @ query_vec.T).toarray().ravel()
+            overlap[positions] = fitted.doc_terms[rows] @ query_indicator
+        if texts:
+            similarity[text_positions] = (fitted.vectorizer.transform(texts) @ query_vec.T).toarray().ravel()
+            overlap[text_positions] = [len(query_terms.intersection(text.lower().split())) for text in texts]
+        
+        overlap /= max(len(query_terms), 1)
+        return (similarity + overlap) / 2
+    
     def rerank(self, query: str, candidates: List[Tuple], documents: List[str] = None) -> List[Tuple]:
         """
         Rerank candidates using cross-encoder scores
@@ -48,23 +128,14 @@ class CrossEncoderReranker:
             candidates: List of (item_id, initial_score) tuples
             documents: Optional list of documents for item_ids that are indices
         """
-        reranked = []
+        if not candidates:
+            return []
         
-        for item_id, initial_score in candidates:
-            # Get document text
-            if documents and isinstance(item_id, int):
-                doc_text = documents[item_id]
-            elif isinstance(item_id, str):
-                doc_text = item_id  # Assume item_id is the text itself
-            else:
-                doc_text = str(item_id)
-            
-            # Calculate cross-encoder score
-            cross_score = self.score_query_document(query, doc_text)
-            
-            # Combine with initial score
-            final_score = 0.7 * cross_score + 0.3 * initial_score
-            reranked.append((item_id, final_score))
+        cross_scores = self.score_candidates(query, [item_id for item_id, _ in candidates], documents)
+        
+        # Combine with initial score
+        reranked = [(item_id, 0.7 * cross_score + 0.3 * initial_score)
+                    for (item_id, initial_score), cross_score in zip(candidates, cross_scores.tolist())]
         
         # Sort by final score
         return sorted(reranked, key=lambda x: x[1], reverse=True)
@@ -115,30 +186,29 @@ class EvidenceReranker:
     
     def rerank_by_confidence(self, query_terms: List[str], min_confidence: float = 0.5) -> List[EvidenceTriple]:
         """Rerank evidence triples by confidence scores for query terms"""
-        all_results = []
-        
-        for term in query_terms:
-            results = self.storage.query_by_thesaurus_term(term)
-            all_results.extend(results)
-        
-        unique_results = {}
-        for triple in all_results:
-            key = (triple.subject, triple.predicate, triple.object)
-            if key not in unique_results or triple.confidence > unique_results[key].confidence:
-                unique_results[key] = triple
-        
-        filtered = [t for t in unique_results.values() if t.confidence >= min_confidence]
-        return sorted(filtered, key=lambda x: x.confidence, reverse=True)
+        results = self.storage.query_by_terms(query_terms, min_confidence)
+        return [triple for triple, _ in results]
     
     def get_top_evidence(self, query_terms: List[str], top_k: int = 10) -> List[EvidenceTriple]:
         """Get top-k evidence triples for reranking"""
-        reranked = self.rerank_by_confidence(query_terms)
-        return reranked[:top_k]
+        results = self.storage.query_by_terms(query_terms, min_confidence=0.5, limit=top_k)
+        return [triple for triple, _ in results]
+    
+    def get_top_evidence_batch(self, query_term_lists: List[List[str]], top_k: int = 10) -> List[List[EvidenceTriple]]:
+        """get_top_evidence for several queries on one storage connection"""
+        results = self.storage.query_by_terms_many(query_term_lists, min_confidence=0.5, limit=top_k)
+        return [[triple for triple, _ in matches] for matches in results]
 
 class MMRReranker:
-    def __init__(self, lambda_param: float = 0.7):
+    def __init__(self, lambda_param: float = 0.7, vectors: CrossEncoderReranker = None):
+        """
+        Args:
+            lambda_param: Balance between relevance and diversity
+            vectors: Fitted CrossEncoderReranker whose TF-IDF document vectors are
+                reused; without it a vectorizer is fitted on the candidates per query
+        """
         self.lambda_param = lambda_param  # Balance between relevance and diversity
-        self.vectorizer = TfidfVectorizer(max_features=500, stop_words='english')
+        self.vectors = vectors
     
     def rerank_with_mmr(self, query: str, candidates: List[Tuple], documents: List[str], top_k: int = 10) -> List[Tuple]:
         """
@@ -153,41 +223,55 @@ class MMRReranker:
         if not candidates:
             return []
         
-        # Fit vectorizer on all documents
-        all_docs = [documents[item_id] if isinstance(item_id, int) and item_id < len(documents) else str(item_id) 
-                   for item_id, _ in candidates]
-        doc_vectors = self.vectorizer.fit_transform(all_docs + [query])
-        query_vector = doc_vectors[-1]
-        doc_vectors = doc_vectors[:-1]
+        doc_vectors, query_vector = self._candidate_vectors(query, [item_id for item_id, _ in candidates], documents)
         
-        # Calculate relevance scores
-        relevance_scores = cosine_similarity(query_vector, doc_vectors).flatten()
+        # Relevance and the candidate x candidate similarity matrix, computed once.
+        # TF-IDF rows are L2-normalised, so cosine similarities are dot products;
+        # for a few hundred candidates dense BLAS products beat sparse ones
+        doc_vectors = doc_vectors.toarray()
+        relevance_scores = doc_vectors @ query_vector.toarray().ravel()
+        similarities = doc_vectors @ doc_vectors.T
         
+        # max_sim[i] is candidate i's highest similarity to any selected document,
+        # updated with the row of each new pick
+        max_sim = np.zeros(len(candidates))
+        available = np.ones(len(candidates), dtype=bool)
         selected = []
-        remaining = list(range(len(candidates)))
-        
-        while len(selected) < top_k and remaining:
-            mmr_scores = []
-            
-            for i in remaining:
-                relevance = relevance_scores[i]
-                
-                # Calculate max similarity to already selected documents
-                if selected:
-                    selected_vectors = doc_vectors[selected]
-                    similarities = cosine_similarity([doc_vectors[i]], selected_vectors).flatten()
-                    max_sim = np.max(similarities)
-                else:
-                    max_sim = 0
-                
-                # MMR score
-                mmr_score = self.lambda_param * relevance - (1 - self.lambda_param) * max_sim
-                mmr_scores.append((i, mmr_score))
-            
-            # Select document with highest MMR score
-            best_idx = max(mmr_scores, key=lambda x: x[1])[0]
+        
+        while len(selected) < top_k and available.any():
+            mmr_scores = self.lambda_param * relevance_scores - (1 - self.lambda_param) * max_sim
+            mmr_scores[~available] = -np.inf
+            # argmax returns the lowest index among ties, like the original scan
+            best_idx = int(np.argmax(mmr_scores))
             selected.append(best_idx)
-            remaining.remove(best_idx)
+            available[best_idx] = False
+            np.maximum(max_sim, similarities[best_idx], out=max_sim)
         
         # Return reranked results
-        return [candidates[i] for i in selected]
\ No newline at end of file
+        return [candidates[i] for i in selected]
+    
+    def _candidate_vectors(self, query: str, item_ids: List, documents: List[str]):
+        """TF-IDF rows for the candidates and the query"""
+        def text(item_id):
+            if isinstance(item_id, (int, np.integer)) and item_id < len(documents):
+                return documents[item_id]
+            return str(item_id)
+        
+        fitted = self.vectors._fitted if self.vectors is not None else None
+        if fitted is None:
+            # Fit vectorizer on the candidate documents
+            vectorizer = TfidfVectorizer(max_features=500, stop_words='english')
+            doc_vectors = vectorizer.fit_transform([text(item_id) for item_id in item_ids] + [query])
+            return doc_vectors[:-1], doc_vectors[-1]
+        
+        # Reuse the precomputed rows; only candidates outside the fitted documents are transformed
+        num_fitted = fitted.doc_vectors.shape[0]
+        is_fitted = [isinstance(item_id, (int, np.integer)) and item_id < num_fitted for item_id in item_ids]
+        fitted_pos = [i for i, hit in enumerate(is_fitted) if hit]
+        other_pos = [i for i, hit in enumerate(is_fitted) if not hit]
+        doc_vectors = fitted.doc_vectors[[int(item_ids[i]) for i in fitted_pos]]
+        if other_pos:
+            others = fitted.vectorizer.transform([text(item_ids[i]) for i in other_pos])
+            order = np.argsort(fitted_pos + other_pos, kind='stable')
+            doc_vectors = sparse.vstack([doc_vectors, others], format='csr')[order]
+        return doc_vectors, self.vectors._query_vector(fitted, query)
@@ -0,0 +1,247 @@
+from typing import Iterable, List, Tuple, Dict
+from collections import Counter
+from functools import lru_cache
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import numpy as np
+
+try:
+    from sentence_transformers import SentenceTransformer
+    HAS_SENTENCE_TRANSFORMERS = True
+except ImportError:
+    HAS_SENTENCE_TRANSFORMERS = False
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from npy_index import write_npy_index
+
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+VECTORS_FILE = "vectors.npy"      # float16/float32, rows grouped by IVF list
+IDS_FILE = "ids.npy"              # int32, document id of each row
+CENTROIDS_FILE = "centroids.npy"  # float32, nlist x dim
+LIST_PTR_FILE = "list_ptr.npy"    # int64, nlist + 1 row offsets
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+class HashingEncoder:
+    """Deterministic signed feature-hashing encoder (no model files; for tests and fallbacks)"""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    @property
+    def spec(self) -> Dict:
+        return {'type': 'hashing', 'dim': self.dim}
+
+    @staticmethod
+    @lru_cache(maxsize=1 << 16)
+    def _hash(token: str) -> int:
+        return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        embeddings = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token, count in Counter(TOKEN_PATTERN.findall(text.lower())).items():
+                h = self._hash(token)
+                sign = 1.0 if h >> 63 else -1.0
+                embeddings[row, h % self.dim] += sign * (1.0 + math.log(count))
+        return _normalize(embeddings)
+
+class SentenceEmbeddingEncoder:
+    """Local sentence-transformers model loaded from disk, run on CPU"""
+
+    def __init__(self, model_path: str, batch_size: int = 32):
+        if not HAS_SENTENCE_TRANSFORMERS:
+            raise ImportError("sentence-transformers is required for SentenceEmbeddingEncoder")
+        self.model_path = model_path
+        self.batch_size = batch_size
+        self.model = SentenceTransformer(model_path, device='cpu')
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    @property
+    def spec(self) -> Dict:
+        return {'type': 'sentence-transformers', 'model_path': self.model_path}
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        embeddings = self.model.encode(list(texts), batch_size=self.batch_size,
+                                       convert_to_numpy=True, normalize_embeddings=True)
+        return embeddings.astype(np.float32)
+
+def load_encoder(spec: Dict):
+    """Recreate the encoder an index was built with from its meta.json spec"""
+    if spec['type'] == 'hashing':
+        return HashingEncoder(spec['dim'])
+    if spec['type'] == 'sentence-transformers':
+        return SentenceEmbeddingEncoder(spec['model_path'])
+    raise ValueError(f"Unknown encoder type: {spec['type']}")
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def encode_in_batches(encoder, documents: Iterable[str], batch_size: int = 256) -> np.ndarray:
+    """Encode an iterable of documents without materializing all texts at once"""
+    batches, batch = [], []
+    for doc in documents:
+        batch.append(doc)
+        if len(batch) == batch_size:
+            batches.append(encoder.encode(batch))
+            batch = []
+    if batch:
+        batches.append(encoder.encode(batch))
+    if not batches:
+        return np.zeros((0, encoder.dim), dtype=np.float32)
+    return np.vstack(batches)
+
+def spherical_kmeans(vectors: np.ndarray, nlist: int, n_iter: int = 10, sample_size: int = 256,
+                     seed: int = 0) -> np.ndarray:
+    """Cluster unit vectors by cosine similarity; trains on at most sample_size points per list"""
+    rng = np.random.default_rng(seed)
+    sample = vectors[rng.choice(len(vectors), size=min(len(vectors), nlist * sample_size), replace=False)]
+    sample = np.asarray(sample, dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+    for _ in range(n_iter):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        empty = np.bincount(assignment, minlength=nlist) == 0
+        # Re-seed empty lists from random points
+        sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids
+
+class DenseIndex:
+    """
+    Embedding matrix with an IVF (inverted file) approximate nearest-neighbour index
+
+    Rows are stored grouped by their closest centroid, so probing a list reads
+    one contiguous slice. Queries score the nprobe closest lists only.
+    """
+
+    def __init__(self, vectors: np.ndarray, ids: np.ndarray, centroids: np.ndarray,
+                 list_ptr: np.ndarray, encoder, meta: Dict = None):
+        self.vectors = vectors
+        self.ids = ids
+        self.centroids = centroids
+        self.list_ptr = list_ptr
+        self.encoder = encoder
+        self.meta = meta or {}
+
+    @property
+    def num_docs(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def from_embeddings(cls, embeddings: np.ndarray, encoder, nlist: int = None,
+                        dtype: str = 'float16', seed: int = 0) -> 'DenseIndex':
+        """Cluster embeddings into nlist IVF lists (default ~sqrt(n))"""
+        num_docs = len(embeddings)
+        if nlist is None:
+            nlist = max(1, int(math.sqrt(num_docs)))
+        nlist = max(1, min(nlist, num_docs))
+
+        if num_docs:
+            centroids = spherical_kmeans(embeddings, nlist, seed=seed)
+            assignment = np.concatenate([np.argmax(embeddings[i:i + 8192] @ centroids.T, axis=1)
+                                         for i in range(0, num_docs, 8192)])
+        else:
+            centroids = np.zeros((0, encoder.dim), dtype=np.float32)
+            assignment = np.zeros(0, dtype=np.int64)
+        order = np.argsort(assignment, kind='stable')
+        list_ptr = np.zeros(len(centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignment, minlength=len(centroids)), out=list_ptr[1:])
+
+        meta = {'dtype': dtype, 'encoder': encoder.spec}
+        return cls(embeddings[order].astype(dtype), order.astype(np.int32),
+                   centroids.astype(np.float32), list_ptr, encoder, meta)
+
+    @classmethod
+    def build(cls, documents: Iterable[str], encoder, index_dir: str = None, nlist: int = None,
+              dtype: str = 'float16') -> 'DenseIndex':
+        """Encode documents and cluster them; saved to index_dir when given"""
+        index = cls.from_embeddings(encode_in_batches(encoder, documents), encoder, nlist, dtype)
+        if index_dir:
+            index.save(index_dir)
+            return cls.open(index_dir)
+        return index
+
+    def save(self, index_dir: str):
+        meta = dict(self.meta, format_version=FORMAT_VERSION, num_docs=self.num_docs, nlist=self.nlist)
+        write_npy_index(index_dir, {
+            VECTORS_FILE: self.vectors,
+            IDS_FILE: self.ids,
+            CENTROIDS_FILE: self.centroids,
+            LIST_PTR_FILE: self.list_ptr,
+        }, meta)
+
+    @classmethod
+    def open(cls, index_dir: str, encoder=None) -> 'DenseIndex':
+        """Memory-map a saved index; the encoder is recreated from meta.json unless given"""
+        with open(os.path.join(index_dir, META_FILE)) as f:
+            meta = json.load(f)
+        if meta.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported dense index format in {index_dir}")
+
+        def load(name):
+            return np.load(os.path.join(index_dir, name), mmap_mode='r')
+
+        return cls(load(VECTORS_FILE), load(IDS_FILE), np.load(os.path.join(index_dir, CENTROIDS_FILE)),
+                   load(LIST_PTR_FILE), encoder or load_encoder(meta['encoder']), meta)
+
+    def search(self, query_embedding: np.ndarray, nprobe: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (doc_ids, cosine scores) for the rows in the probed lists
+
+        Args:
+            query_embedding: Unit-norm query vector
+            nprobe: Lists to scan; None or >= nlist scans everything (exact search)
+        """
+        if self.num_docs == 0:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        if nprobe is None or nprobe >= self.nlist:
+            return self.ids, self._score_rows(0, self.num_docs, query_embedding)
+
+        centroid_scores = self.centroids @ query_embedding
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        ids, scores = [], []
+        for lst in probe:
+            start, end = self.list_ptr[lst], self.list_ptr[lst + 1]
+            ids.append(self.ids[start:end])
+            scores.append(self._score_rows(start, end, query_embedding))
+        return np.concatenate(ids), np.concatenate(scores)
+
+    def search_batch(self, query_embeddings: np.ndarray, nprobe: int = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        search() for several queries at once
+
+        Each scanned list is read once and scored against every query that
+        probes it with one matrix product.
+        """
+        num_queries = len(query_embeddings)
+        if self.num_docs == 0:
+            return [self.search(query_embeddings[i], nprobe) for i in range(num_queries)]
+        if nprobe is None or nprobe >= self.nlist:
+            scores = self._score_rows(0, self.num_docs, query_embeddings.T)
+            return [(self.ids, scores[:, i]) for i in range(num_queries)]
+
+        probes = np.argpartition(-(query_embeddings @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        ids, scores = [[] for _ in range(num_queries)], [[] for _ in range(num_queries)]
+        for lst in np.unique(probes):
+            queries = np.flatnonzero((probes == lst).any(axis=1))
+            start, end = self.list_ptr[lst], self.list_ptr[lst + 1]
+            list_scores = self._score_rows(start, end, query_embeddings[queries].T)
+            for column, i in enumerate(queries):
+                ids[i].append(self.ids[start:end])
+                scores[i].append(list_scores[:, column])
+        return [(np.concatenate(ids[i]), np.concatenate(scores[i])) for i in range(num_queries)]
+
+    def _score_rows(self, start: int, end: int, query_embedding: np.ndarray) -> np.ndarray:
+        return np.asarray(self.vectors[start:end], dtype=np.float32) @ query_embedding
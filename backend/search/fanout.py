@@ -0,0 +1,72 @@
+from typing import Callable, Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import asyncio
+import os
+import threading
+import time
+
+_shared_executor = None
+_shared_lock = threading.Lock()
+
+def shared_executor() -> ThreadPoolExecutor:
+    """Process-wide pool for fanning out retrievers, created on first use"""
+    global _shared_executor
+    with _shared_lock:
+        if _shared_executor is None:
+            _shared_executor = ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) + 4),
+                                                  thread_name_prefix='retrieval')
+        return _shared_executor
+
+def run_tasks(tasks: Dict[str, Callable[[], object]], executor: ThreadPoolExecutor = None,
+              timeouts: Dict[str, float] = None, default_timeout: float = None) -> Tuple[Dict[str, object], List[str]]:
+    """
+    Run independent tasks concurrently on a thread pool
+
+    A task still running past its timeout (seconds from submission) is
+    dropped from the results and left to finish in the background; errors
+    raised by a task propagate.
+
+    Returns:
+        (results by task name in submission order, names of the tasks that timed out)
+    """
+    executor = executor or shared_executor()
+    timeouts = timeouts or {}
+    start = time.perf_counter()
+    futures = {name: executor.submit(task) for name, task in tasks.items()}
+    deadlines = {}
+    for name in futures:
+        timeout = timeouts.get(name, default_timeout)
+        deadlines[name] = float('inf') if timeout is None else start + timeout
+
+    outcomes, timed_out = {}, []
+    for name in sorted(futures, key=deadlines.get):
+        remaining = None if deadlines[name] == float('inf') else max(0.0, deadlines[name] - time.perf_counter())
+        try:
+            outcomes[name] = futures[name].result(timeout=remaining)
+        except FutureTimeoutError:
+            futures[name].cancel()
+            timed_out.append(name)
+    return {name: outcomes[name] for name in futures if name in outcomes}, timed_out
+
+async def run_tasks_async(tasks: Dict[str, Callable[[], object]], executor: ThreadPoolExecutor = None,
+                          timeouts: Dict[str, float] = None,
+                          default_timeout: float = None) -> Tuple[Dict[str, object], List[str]]:
+    """run_tasks for asyncio callers: awaits the pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    executor = executor or shared_executor()
+    timeouts = timeouts or {}
+
+    async def run(name: str, task: Callable[[], object]):
+        return await asyncio.wait_for(loop.run_in_executor(executor, task), timeouts.get(name, default_timeout))
+
+    names = list(tasks)
+    outcomes = await asyncio.gather(*(run(name, tasks[name]) for name in names), return_exceptions=True)
+    results, timed_out = {}, []
+    for name, outcome in zip(names, outcomes):
+        if isinstance(outcome, asyncio.TimeoutError):
+            timed_out.append(name)
+        elif isinstance(outcome, BaseException):
+            raise outcome
+        else:
+            results[name] = outcome
+    return results, timed_out
@@ -0,0 +1,95 @@
+from typing import Dict, Iterator, List, Tuple
+from contextlib import contextmanager
+import bisect
+import threading
+import time
+
+# Upper bounds in seconds, from sub-millisecond stages up to slow rerankers
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+class Histogram:
+    """Thread-safe latency histogram with fixed bucket bounds, as Prometheus expects"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        """(cumulative bucket counts including +Inf, sum, count)"""
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        cumulative, running = [], 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, total, running
+
+class StageTrace:
+    """Stage timings of one search; every timing is also recorded in the shared metrics"""
+
+    def __init__(self, metrics: 'StageMetrics'):
+        self.metrics = metrics
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = elapsed
+            self.metrics.observe(name, elapsed)
+
+    def timings_ms(self) -> Dict[str, float]:
+        return {name: round(seconds * 1000, 3) for name, seconds in self.timings.items()}
+
+class StageMetrics:
+    """Per-stage latency histograms, exported in the Prometheus text format"""
+
+    def __init__(self, name: str = 'search_stage_seconds', description: str = 'Search pipeline stage latency',
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def trace(self) -> StageTrace:
+        return StageTrace(self)
+
+    def observe(self, stage: str, seconds: float):
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(stage, Histogram(self.buckets))
+        histogram.observe(seconds)
+
+    def render_prometheus(self) -> str:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for stage, histogram in sorted(self._histograms.items()):
+            cumulative, total, count = histogram.snapshot()
+            bounds = [_format_value(bound) for bound in histogram.buckets] + ['+Inf']
+            for bound, bucket_count in zip(bounds, cumulative):
+                lines.append(f'{self.name}_bucket{{stage="{stage}",le="{bound}"}} {bucket_count}')
+            lines.append(f'{self.name}_sum{{stage="{stage}"}} {_format_value(total)}')
+            lines.append(f'{self.name}_count{{stage="{stage}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+def render_counters(name: str, description: str, values: Dict[str, float], label: str) -> str:
+    """Prometheus text for a counter family with one sample per label value"""
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} counter"]
+    for key, value in values.items():
+        lines.append(f'{name}{{{label}="{key}"}} {_format_value(value)}')
+    return "\n".join(lines) + "\n"
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -1,59 +1,100 @@
 from typing import List, Dict, Tuple
+import heapq
 import numpy as np
 
 class ReciprocalRankFusion:
     def __init__(self, k: int = 60):
         self.k = k
-    
-    def fuse_rankings(self, rankings: Dict[str, List[Tuple]], weights: Dict[str, float] = None) -> List[Tuple]:
+
+    def fuse_rankings(self, rankings: Dict[str, List[Tuple]], weights: Dict[str, float] = None,
+                      top_n: int = None) -> List[Tuple]:
         """
         Fuse multiple rankings using Reciprocal Rank Fusion
-        
+
         Args:
             rankings: Dict with method names as keys and ranked results as values
             weights: Optional weights for each ranking method
+            top_n: Optional cutoff; only the top_n fused items are returned
         """
         if weights is None:
             weights = {method: 1.0 for method in rankings.keys()}
-        
-        # Collect all unique items
+
+        # One pass per ranking; only an item's first occurrence counts towards its rank
+        rrf_scores = {}
+        for method, ranking in rankings.items():
+            weight = weights[method]
+            seen = set()
+            for rank, (item, _) in enumerate(ranking, start=1):
+                if item in seen:
+                    continue
+                seen.add(item)
+                rrf_scores[item] = rrf_scores.get(item, 0) + weight / (self.k + rank)
+
+        # Iterate items in the same set order as before so ties keep their order
         all_items = set()
         for ranking in rankings.values():
             all_items.update([item[0] for item in ranking])
-        
-        # Calculate RRF scores
-        rrf_scores = {}
-        for item in all_items:
-            score = 0
-            for method, ranking in rankings.items():
-                # Find rank of item in this ranking (1-indexed)
-                rank = None
-                for i, (ranked_item, _) in enumerate(ranking):
-                    if ranked_item == item:
-                        rank = i + 1
-                        break
-                
-                if rank is not None:
-                    score += weights[method] / (self.k + rank)
-            
-            rrf_scores[item] = score
-        
-        # Sort by RRF score and return
-        fused_ranking = sorted(rrf_scores.items(), key=lambda x: x[1], reverse=True)
-        return fused_ranking
-    
-    def fuse_retrieval_results(self, retrieval_results: Dict[str, List]) -> List[Tuple]:
+        scored = ((item, rrf_scores[item]) for item in all_items)
+
+        if top_n is not None:
+            return heapq.nlargest(top_n, scored, key=lambda x: x[1])
+        return sorted(scored, key=lambda x: x[1], reverse=True)
+
+    def fuse_index_rankings(self, rankings: Dict[str, List[Tuple]], weights: Dict[str, float] = None,
+                            top_n: int = None) -> List[Tuple[int, float]]:
+        """
+        Vectorized RRF for rankings whose items are integer document indices
+
+        Scores equal fuse_rankings; items with equal scores are ordered by
+        ascending document index.
+        """
+        if weights is None:
+            weights = {method: 1.0 for method in rankings.keys()}
+
+        item_arrays, score_arrays = [], []
+        for method, ranking in rankings.items():
+            if not ranking:
+                continue
+            items = np.fromiter((item for item, _ in ranking), dtype=np.int64, count=len(ranking))
+            # np.unique returns the first occurrence of each item, i.e. its best rank
+            items, first_pos = np.unique(items, return_index=True)
+            item_arrays.append(items)
+            score_arrays.append(weights[method] / (self.k + first_pos + 1.0))
+
+        if not item_arrays:
+            return []
+
+        fused_items, inverse = np.unique(np.concatenate(item_arrays), return_inverse=True)
+        # Sum per method in ranking order so the floats match fuse_rankings
+        fused_scores = np.zeros(len(fused_items))
+        offset = 0
+        for items, scores in zip(item_arrays, score_arrays):
+            fused_scores[inverse[offset:offset + len(items)]] += scores
+            offset += len(items)
+
+        candidates = np.arange(len(fused_scores))
+        if top_n is not None and 0 < top_n < len(fused_scores):
+            kth = np.partition(fused_scores, len(fused_scores) - top_n)[len(fused_scores) - top_n]
+            candidates = np.flatnonzero(fused_scores >= kth)
+
+        order = candidates[np.lexsort((fused_items[candidates], -fused_scores[candidates]))]
+        if top_n is not None:
+            order = order[:top_n]
+        return [(int(fused_items[i]), float(fused_scores[i])) for i in order]
+
+    def fuse_retrieval_results(self, retrieval_results: Dict[str, List], top_n: int = None) -> List[Tuple]:
         """
         Fuse results from different retrieval methods
-        
+
         Args:
             retrieval_results: Results from RetrievalMethods.retrieve_all()
+            top_n: Optional cutoff on the fused ranking
         """
         # All methods now return (doc_id, score) tuples for articles
         normalized_rankings = {}
-        
+
         for method in ['sparse', 'dense', 'gnn']:
             if method in retrieval_results and retrieval_results[method]:
                 normalized_rankings[method] = retrieval_results[method]
-        
-        return self.fuse_rankings(normalized_rankings)
\ No newline at end of file
+
+        return self.fuse_rankings(normalized_rankings, top_n=top_n)
@@ -0,0 +1,168 @@
+from typing import Dict, Hashable, Optional, Tuple
+from collections import OrderedDict
+import json
+import sqlite3
+import threading
+import time
+import numpy as np
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query, used in cache keys"""
+    return " ".join(query.lower().split())
+
+def json_default(value):
+    """json.dumps default for the NumPy scalars and arrays found in search results"""
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+class SQLiteCacheBackend:
+    """
+    Result cache in a local SQLite file, shared by every worker process on the host
+
+    Entries expire after their TTL; beyond maxsize the entries closest to
+    expiry (the oldest writes) are trimmed. Values are stored as JSON.
+    """
+
+    TRIM_EVERY = 64  # puts between trims
+
+    def __init__(self, db_path: str, maxsize: int = 10000):
+        self.db_path = db_path
+        self.maxsize = maxsize
+        self._local = threading.local()
+        self._puts = 0
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS result_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_result_cache_expiry ON result_cache(expires_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Tuple[float, object]]:
+        """(expires_at, value) for a live entry, or None"""
+        row = self._connection().execute(
+            "SELECT expires_at, value FROM result_cache WHERE key = ? AND expires_at > ?",
+            (key, time.time())).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def put(self, key: str, value, expires_at: float):
+        with self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO result_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                         (key, json.dumps(value, default=json_default), expires_at))
+            self._puts += 1
+            if self._puts % self.TRIM_EVERY == 0:
+                conn.execute("DELETE FROM result_cache WHERE expires_at <= ?", (time.time(),))
+                conn.execute("""
+                    DELETE FROM result_cache WHERE key IN (
+                        SELECT key FROM result_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?
+                    )
+                """, (self.maxsize,))
+
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM result_cache")
+
+class ResultCache:
+    """
+    Thread-safe LRU + TTL cache for search results
+
+    Lookups check the in-process LRU first, then the optional shared
+    backend (e.g. SQLiteCacheBackend), whose hits are copied into the LRU.
+    Keys should include an index generation, so entries for an outdated
+    index are never hit and simply age out.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0, backend: SQLiteCacheBackend = None):
+        """
+        Args:
+            maxsize: Entries kept in process; the least recently used is evicted first
+            ttl: Seconds an entry stays valid
+            backend: Optional cache shared between processes
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(query: str, generation: Hashable, **params) -> str:
+        """Cache key for a normalized query, its search parameters and the index generation"""
+        return json.dumps([normalize_query(query), generation, sorted(params.items())], default=json_default)
+
+    def get(self, key: str):
+        """Cached value for key, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+                self.expirations += 1
+
+        entry = self.backend.get(key) if self.backend is not None else None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.shared_hits += 1
+            self._store(key, entry)
+        return entry[1]
+
+    def put(self, key: str, value):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(key, (expires_at, value))
+        if self.backend is not None:
+            self.backend.put(key, value, expires_at)
+
+    def _store(self, key: str, entry: Tuple[float, object]):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
@@ -1,21 +1,236 @@
-from typing import List, Dict, Set, Tuple
+from typing import Callable, List, Dict, Set, Tuple, NamedTuple
+from collections import Counter
+from functools import partial
 import numpy as np
+from scipy import sparse as sp
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import sqlite3
 import json
+import re
+import tempfile
+import threading
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-class SparseRetrieval:
-    def __init__(self, documents: List[str]):
-        self.vectorizer = TfidfVectorizer(stop_words='english', max_features=5000)
-        self.doc_vectors = self.vectorizer.fit_transform(documents)
+from search.bm25_index import BM25Index
+from search.dense_index import DenseIndex, HashingEncoder, encode_in_batches
+from search.segments import SegmentedRetriever, iter_head
+from search.fanout import run_tasks, run_tasks_async
+
+def _top_k_descending(ids: np.ndarray, scores: np.ndarray, top_k: int) -> List[Tuple[int, float]]:
+    """Partial top-k selection ordered like np.argsort(scores)[::-1][:top_k].
+
+    Ties are broken towards the larger id, matching the reversed argsort.
+    """
+    if len(scores) > top_k:
+        kth = np.partition(scores, len(scores) - top_k)[len(scores) - top_k]
+        keep = np.flatnonzero(scores >= kth)
+        ids, scores = ids[keep], scores[keep]
+    order = np.lexsort((-ids, -scores))[:top_k]
+    return [(idx, score) for idx, score in zip(ids[order].astype(np.intp), scores[order]) if score > 0]
+
+def _top_k_descending_batch(ids: np.ndarray, scores: np.ndarray, top_k: int) -> List[List[Tuple[int, float]]]:
+    """_top_k_descending for each row of a (queries x ids) score matrix, partitioned in one call"""
+    if len(scores) == 0 or top_k <= 0:
+        return [[] for _ in range(len(scores))]
+    if scores.shape[1] > top_k:
+        top = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+        kth = np.take_along_axis(scores, top, axis=1).min(axis=1)
+    else:
+        kth = np.full(len(scores), -np.inf)
+    results = []
+    for row, threshold in zip(scores, kth):
+        # Every score tied with the k-th takes part, so ties break as in _top_k_descending
+        keep = np.flatnonzero(row >= threshold)
+        results.append(_top_k_descending(ids[keep], row[keep], top_k))
+    return results
+
+def _top_k_rows(scores: sp.csr_matrix, top_k: int) -> List[List[Tuple[int, float]]]:
+    """_top_k_descending over the stored entries of each row of a (queries x documents) matrix"""
+    indptr, indices, data = scores.indptr, scores.indices, scores.data
+    return [_top_k_descending(indices[indptr[i]:indptr[i + 1]], data[indptr[i]:indptr[i + 1]], top_k)
+            if top_k > 0 else [] for i in range(scores.shape[0])]
+
+def _search_batch(backend, queries: List[str], top_k: int) -> List[List[Tuple[int, float]]]:
+    """backend.search_batch when the backend has one, otherwise one search per query"""
+    if hasattr(backend, 'search_batch'):
+        return backend.search_batch(queries, top_k)
+    return [backend.search(query, top_k) for query in queries]
+
+class _SparseState(NamedTuple):
+    vectorizer: TfidfVectorizer
+    doc_vectors: sp.csr_matrix
+    postings: sp.csc_matrix
+    delta: sp.csr_matrix  # TF-IDF rows of appended documents, or None
+    delta_texts: tuple
+
+    @property
+    def num_docs(self) -> int:
+        return self.doc_vectors.shape[0] + len(self.delta_texts)
+
+class SparseRetrieval(SegmentedRetriever):
+    def __init__(self, documents: List[str], use_inverted_index: bool = True):
         self.documents = documents
+        self.use_inverted_index = use_inverted_index
+        self._init_segments(self._fit(documents))
+    
+    def _fit(self, documents) -> _SparseState:
+        vectorizer = TfidfVectorizer(stop_words='english', max_features=5000)
+        doc_vectors = vectorizer.fit_transform(documents)
+        # Term-major copy of doc_vectors: the posting list of term j is
+        # indices[indptr[j]:indptr[j + 1]] with its TF-IDF weights in data
+        postings = doc_vectors.tocsc() if self.use_inverted_index else None
+        return _SparseState(vectorizer, doc_vectors, postings, None, ())
+    
+    @property
+    def vectorizer(self) -> TfidfVectorizer:
+        return self._state.vectorizer
+    
+    @property
+    def doc_vectors(self) -> sp.csr_matrix:
+        return self._state.doc_vectors
+    
+    @property
+    def postings(self) -> sp.csc_matrix:
+        return self._state.postings
+    
+    def _append(self, state: _SparseState, texts: List[str]) -> _SparseState:
+        # Frozen vocabulary and IDF: new terms are ignored until the next compaction
+        rows = state.vectorizer.transform(texts)
+        delta = rows if state.delta is None else sp.vstack([state.delta, rows], format='csr')
+        return state._replace(delta=delta, delta_texts=state.delta_texts + tuple(texts))
+    
+    def _rebuild(self, state: _SparseState, documents: List[str]) -> _SparseState:
+        return self._fit(iter_head(documents, state.num_docs))
     
     def search(self, query: str, top_k: int = 10) -> List[Tuple[int, float]]:
-        query_vector = self.vectorizer.transform([query])
-        similarities = cosine_similarity(query_vector, self.doc_vectors).flatten()
+        state = self._state
+        query_vector = state.vectorizer.transform([query])
+        if self.use_inverted_index:
+            return self._search_postings(state, query_vector, top_k)
+        similarities = cosine_similarity(query_vector, state.doc_vectors).flatten()
+        if state.delta is not None:
+            similarities = np.concatenate([similarities, cosine_similarity(query_vector, state.delta).flatten()])
         top_indices = np.argsort(similarities)[::-1][:top_k]
         return [(idx, similarities[idx]) for idx in top_indices if similarities[idx] > 0]
+    
+    def search_batch(self, queries: List[str], top_k: int = 10) -> List[List[Tuple[int, float]]]:
+        """search() for several queries: one transform and one sparse product for the batch"""
+        state = self._state
+        query_vectors = state.vectorizer.transform(queries)
+        if self.use_inverted_index:
+            # Rows of postings.T are the posting lists, so only matching documents are touched
+            scores = query_vectors @ state.postings.T
+            if state.delta is not None:
+                scores = sp.hstack([scores, query_vectors @ state.delta.T], format='csr')
+            return _top_k_rows(scores.tocsr(), top_k)
+        similarities = cosine_similarity(query_vectors, state.doc_vectors)
+        if state.delta is not None:
+            similarities = np.hstack([similarities, cosine_similarity(query_vectors, state.delta)])
+        return _top_k_descending_batch(np.arange(similarities.shape[1]), similarities, top_k)
+    
+    def _search_postings(self, state: _SparseState, query_vector, top_k: int) -> List[Tuple[int, float]]:
+        """Score only documents that share a term with the query.
+        
+        TF-IDF rows are L2-normalised, so the cosine similarity is the dot
+        product accumulated over the query terms' posting lists.
+        """
+        terms = query_vector.indices
+        if top_k <= 0 or len(terms) == 0:
+            return []
+        
+        indptr, indices, data = state.postings.indptr, state.postings.indices, state.postings.data
+        doc_ids = [indices[indptr[t]:indptr[t + 1]] for t in terms]
+        weights = [data[indptr[t]:indptr[t + 1]] * w for t, w in zip(terms, query_vector.data)]
+        if state.delta is not None:
+            # The delta segment is small, so it is scored with one sparse product
+            delta_scores = (state.delta @ query_vector.T).tocoo()
+            doc_ids.append(delta_scores.row + state.doc_vectors.shape[0])
+            weights.append(delta_scores.data)
+        doc_ids, weights = np.concatenate(doc_ids), np.concatenate(weights)
+        if len(doc_ids) == 0:
+            return []
+        
+        candidates, inverse = np.unique(doc_ids, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights, minlength=len(candidates))
+        return _top_k_descending(candidates, scores, top_k)
+
+class _BM25State(NamedTuple):
+    index: BM25Index
+    delta: sp.csc_matrix  # term frequencies of appended documents, or None
+    delta_lengths: np.ndarray
+    delta_texts: tuple
+
+    @property
+    def num_docs(self) -> int:
+        return self.index.num_docs + len(self.delta_texts)
+
+class BM25Retrieval(SegmentedRetriever):
+    """Sparse backend scoring Okapi BM25 over an on-disk BM25Index.
+    
+    Unlike SparseRetrieval the vocabulary is not capped, so rare gene and
+    protein names stay searchable, and startup only memory-maps the arrays.
+    """
+    def __init__(self, index: BM25Index):
+        self._init_segments(_BM25State(index, None, np.empty(0, dtype=np.float32), ()))
+        self._compacted_dir = None  # TemporaryDirectory holding the compacted index, if any
+    
+    @property
+    def index(self) -> BM25Index:
+        return self._state.index
+    
+    @classmethod
+    def open(cls, index_dir: str) -> 'BM25Retrieval':
+        return cls(BM25Index(index_dir))
+    
+    @classmethod
+    def from_documents(cls, documents: List[str], index_dir: str, **kwargs) -> 'BM25Retrieval':
+        return cls(BM25Index.build(documents, index_dir, **kwargs))
+    
+    def _append(self, state: _BM25State, texts: List[str]) -> _BM25State:
+        tf, lengths = state.index.term_frequencies(texts)
+        delta = tf if state.delta is None else sp.vstack([state.delta, tf], format='csc')
+        return state._replace(delta=delta, delta_lengths=np.concatenate([state.delta_lengths, lengths]),
+                              delta_texts=state.delta_texts + tuple(texts))
+    
+    def _rebuild(self, state: _BM25State, documents: List[str]) -> _BM25State:
+        """
+        Rebuild the index in a private temporary directory
+        
+        The opened index_dir is the offline build output and must keep matching
+        the persisted documents, so it is never written. The directory of the
+        previous compaction is removed once replaced; readers of that index
+        keep their memory mappings.
+        """
+        index = state.index
+        compacted = tempfile.TemporaryDirectory(prefix='bm25-compacted-')
+        rebuilt = BM25Index.build(iter_head(documents, state.num_docs), compacted.name, k1=index.k1, b=index.b)
+        self._compacted_dir = compacted
+        return _BM25State(rebuilt, None, np.empty(0, dtype=np.float32), ())
+    
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[int, float]]:
+        if top_k <= 0:
+            return []
+        state = self._state
+        terms = state.index.query_terms(query)
+        doc_ids, scores = state.index.score_terms(terms)
+        if state.delta is not None:
+            rows, delta_scores = state.index.score_rows(terms, state.delta, state.delta_lengths)
+            doc_ids = np.concatenate([doc_ids, rows + state.index.num_docs])
+            scores = np.concatenate([scores, delta_scores])
+        return _top_k_descending(doc_ids, scores, top_k)
+    
+    def search_batch(self, queries: List[str], top_k: int = 10) -> List[List[Tuple[int, float]]]:
+        """search() for several queries; each distinct term's postings are scored once"""
+        state = self._state
+        term_lists = [state.index.query_terms(query) for query in queries]
+        scores = state.index.score_terms_batch(term_lists)
+        if state.delta is not None:
+            scores = sp.hstack([scores, state.index.score_rows_batch(term_lists, state.delta, state.delta_lengths)],
+                               format='csr')
+        return _top_k_rows(scores.tocsr(), top_k)
 
 class KGThesaurusRetrieval:
     def __init__(self, kg_storage, thesaurus):
@@ -27,84 +242,282 @@ class KGThesaurusRetrieval:
         query_terms = query.lower().split()
         expanded_terms = self.thesaurus.expand_query(query_terms)
         
-        results = []
-        for term in expanded_terms:
-            triples = self.kg_storage.query_by_thesaurus_term(term)
-            results.extend([{
-                'triple': (t.subject, t.predicate, t.object),
-                'confidence': t.confidence,
-                'evidence': t.evidence
-            } for t in triples])
-        
-        # Sort by confidence and return top-k
-        results.sort(key=lambda x: x['confidence'], reverse=True)
-        return results[:top_k]
-
-class DenseEmbeddingRetrieval:
-    def __init__(self, documents: List[str], embedding_dim: int = 384):
+        # One statement for all expanded terms, deduplicated and sorted by confidence
+        triples = self.kg_storage.query_by_terms(list(expanded_terms), limit=top_k)
+        return [{
+            'triple': (t.subject, t.predicate, t.object),
+            'confidence': t.confidence,
+            'evidence': t.evidence
+        } for t, _ in triples]
+
+class _DenseState(NamedTuple):
+    index: DenseIndex
+    delta: np.ndarray  # float32 embeddings of appended documents, searched exactly
+    delta_texts: tuple
+
+    @property
+    def num_docs(self) -> int:
+        return self.index.num_docs + len(self.delta_texts)
+
+class DenseEmbeddingRetrieval(SegmentedRetriever):
+    def __init__(self, documents: List[str], embedding_dim: int = 384, encoder=None,
+                 index: DenseIndex = None, nprobe: int = 8, ann_threshold: int = 10000):
+        """
+        Args:
+            documents: Documents to embed when no prebuilt index is given
+            embedding_dim: Dimension of the default HashingEncoder
+            encoder: Object with encode(texts) -> float32 unit vectors, e.g. SentenceEmbeddingEncoder
+            index: Prebuilt DenseIndex (see build_dense_index.py); documents are then not re-encoded
+            nprobe: IVF lists scanned per query
+            ann_threshold: Below this many documents an in-memory index is searched exactly
+        """
         self.documents = documents
         self.embedding_dim = embedding_dim
-        # Simplified embedding using TF-IDF as dense representation
-        self.vectorizer = TfidfVectorizer(max_features=embedding_dim)
-        self.embeddings = self.vectorizer.fit_transform(documents).toarray()
+        self.nprobe = nprobe
+        self.ann_threshold = ann_threshold
+        if index is None:
+            encoder = encoder or HashingEncoder(embedding_dim)
+            nlist = None if len(documents) >= ann_threshold else 1
+            index = DenseIndex.from_embeddings(encode_in_batches(encoder, documents), encoder,
+                                               nlist=nlist, dtype='float32')
+        self.encoder = index.encoder
+        self._init_segments(_DenseState(index, np.zeros((0, self.encoder.dim), dtype=np.float32), ()))
+    
+    @property
+    def index(self) -> DenseIndex:
+        return self._state.index
+    
+    @classmethod
+    def open(cls, index_dir: str, documents: List[str] = None, encoder=None, nprobe: int = 8) -> 'DenseEmbeddingRetrieval':
+        return cls(documents, index=DenseIndex.open(index_dir, encoder), nprobe=nprobe)
+    
+    def _append(self, state: _DenseState, texts: List[str]) -> _DenseState:
+        embeddings = self.encoder.encode(texts).astype(np.float32)
+        return state._replace(delta=np.vstack([state.delta, embeddings]),
+                              delta_texts=state.delta_texts + tuple(texts))
+    
+    def _rebuild(self, state: _DenseState, documents: List[str]) -> _DenseState:
+        """Re-cluster the stored embeddings with the delta; nothing is re-encoded"""
+        index = state.index
+        embeddings = np.empty((state.num_docs, self.encoder.dim), dtype=np.float32)
+        embeddings[np.asarray(index.ids)] = index.vectors
+        embeddings[index.num_docs:] = state.delta
+        nlist = None if state.num_docs >= self.ann_threshold else 1
+        rebuilt = DenseIndex.from_embeddings(embeddings, self.encoder, nlist=nlist,
+                                             dtype=index.meta.get('dtype', 'float32'))
+        return _DenseState(rebuilt, state.delta[:0], ())
     
     def search(self, query: str, top_k: int = 10) -> List[Tuple[int, float]]:
-        query_embedding = self.vectorizer.transform([query]).toarray()[0]
-        similarities = cosine_similarity([query_embedding], self.embeddings).flatten()
-        top_indices = np.argsort(similarities)[::-1][:top_k]
-        return [(idx, similarities[idx]) for idx in top_indices if similarities[idx] > 0]
+        if top_k <= 0:
+            return []
+        state = self._state
+        query_embedding = self.encoder.encode([query])[0]
+        doc_ids, similarities = state.index.search(query_embedding, self.nprobe)
+        if len(state.delta):
+            doc_ids = np.concatenate([doc_ids, np.arange(state.index.num_docs, state.num_docs)])
+            similarities = np.concatenate([similarities, state.delta @ query_embedding])
+        return _top_k_descending(doc_ids, similarities, top_k)
+    
+    def search_batch(self, queries: List[str], top_k: int = 10) -> List[List[Tuple[int, float]]]:
+        """search() for several queries: one encode call, and each probed list scored once"""
+        if top_k <= 0 or not queries:
+            return [[] for _ in queries]
+        state = self._state
+        query_embeddings = self.encoder.encode(list(queries)).astype(np.float32)
+        hits = state.index.search_batch(query_embeddings, self.nprobe)
+        delta_ids = np.arange(state.index.num_docs, state.num_docs)
+        delta_scores = state.delta @ query_embeddings.T
+        results = []
+        for i, (doc_ids, similarities) in enumerate(hits):
+            if len(state.delta):
+                doc_ids = np.concatenate([doc_ids, delta_ids])
+                similarities = np.concatenate([similarities, delta_scores[:, i]])
+            results.append(_top_k_descending(doc_ids, similarities, top_k))
+        return results
+
+class _KGGraph(NamedTuple):
+    node_names: List[str]
+    node_index: Dict[str, int]
+    subjects: np.ndarray  # int32 edge endpoints, one entry per triple
+    objects: np.ndarray
+    confidences: np.ndarray
+    adjacency: sp.csr_matrix  # subject x object, summed confidences
+    propagation: sp.csr_matrix  # transpose of the row-normalised undirected adjacency
+    token_nodes: Dict[str, np.ndarray]  # name token -> node ids
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
 
 class GNNClassifier:
-    def __init__(self, kg_storage):
+    """
+    Ranks KG nodes for a query by personalized-PageRank message passing
+
+    Query tokens seed the nodes whose names contain them (through a
+    token -> node inverted index); relevance then spreads over a sparse CSR
+    adjacency for a few rounds, restarting at the seeds with probability
+    alpha in each round.
+    """
+    def __init__(self, kg_storage, alpha: float = 0.5, iterations: int = 3):
         self.kg_storage = kg_storage
-        self.node_features = {}
-        self.adjacency = {}
+        self.alpha = alpha
+        self.iterations = iterations
+        self._graph = None
+    
+    @property
+    def is_built(self) -> bool:
+        return self._graph is not None
     
     def build_graph(self):
         """Build graph from KG triples"""
-        triples = self.kg_storage.get_all_triples()
-        nodes = set()
+        node_index, node_names = {}, []
+        subjects, objects, confidences = [], [], []
+        for triple in self.kg_storage.get_all_triples():
+            for node in (triple.subject, triple.object):
+                if node not in node_index:
+                    node_index[node] = len(node_names)
+                    node_names.append(node)
+            subjects.append(node_index[triple.subject])
+            objects.append(node_index[triple.object])
+            confidences.append(triple.confidence)
         
+        token_nodes = {}
+        for i, name in enumerate(node_names):
+            for token in set(TOKEN_PATTERN.findall(name.lower())):
+                token_nodes.setdefault(token, []).append(i)
+        token_nodes = {token: np.array(ids, dtype=np.int32) for token, ids in token_nodes.items()}
+        
+        self._graph = self._make_graph(node_names, node_index, np.array(subjects, dtype=np.int32),
+                                       np.array(objects, dtype=np.int32),
+                                       np.array(confidences, dtype=np.float64), token_nodes)
+    
+    def add_triples(self, triples: List):
+        """
+        Add new triples to a built graph without re-reading the KG
+        
+        Only pass triples that were not stored before: build_graph reads one
+        edge per stored triple, and a repeated triple would add a second one.
+        Copy-on-write: a new graph is assembled and swapped in, so a
+        concurrent classify_relevance keeps its view.
+        """
+        graph = self._graph
+        if graph is None or not triples:
+            return  # not built yet; build_graph will read the triples from storage
+        node_index, node_names = dict(graph.node_index), list(graph.node_names)
+        token_nodes = dict(graph.token_nodes)
+        subjects, objects, confidences = [], [], []
         for triple in triples:
-            nodes.add(triple.subject)
-            nodes.add(triple.object)
-            
-            # Build adjacency list
-            if triple.subject not in self.adjacency:
-                self.adjacency[triple.subject] = []
-            self.adjacency[triple.subject].append((triple.object, triple.confidence))
-        
-        # Simple node features based on degree and confidence
-        for node in nodes:
-            degree = len(self.adjacency.get(node, []))
-            avg_confidence = np.mean([conf for _, conf in self.adjacency.get(node, [(None, 0)])])
-            self.node_features[node] = [degree, avg_confidence]
+            for node in (triple.subject, triple.object):
+                if node not in node_index:
+                    node_index[node] = len(node_names)
+                    node_names.append(node)
+                    for token in set(TOKEN_PATTERN.findall(node.lower())):
+                        token_nodes[token] = np.append(token_nodes.get(token, np.empty(0, dtype=np.int32)),
+                                                       np.int32(node_index[node]))
+            subjects.append(node_index[triple.subject])
+            objects.append(node_index[triple.object])
+            confidences.append(triple.confidence)
+        
+        self._graph = self._make_graph(
+            node_names, node_index,
+            np.concatenate([graph.subjects, np.array(subjects, dtype=np.int32)]),
+            np.concatenate([graph.objects, np.array(objects, dtype=np.int32)]),
+            np.concatenate([graph.confidences, np.array(confidences, dtype=np.float64)]), token_nodes)
+    
+    @staticmethod
+    def _make_graph(node_names, node_index, subjects, objects, confidences, token_nodes) -> _KGGraph:
+        n = len(node_names)
+        adjacency = sp.csr_matrix((confidences, (subjects, objects)), shape=(n, n))
+        # Relations carry relevance both ways
+        undirected = (adjacency + adjacency.T).tocsr()
+        strength = np.asarray(undirected.sum(axis=1)).ravel()
+        inverse = np.divide(1.0, strength, out=np.zeros(n), where=strength > 0)
+        # propagation @ r sends each node's relevance to its neighbours, split by edge weight
+        propagation = (undirected @ sp.diags(inverse)).tocsr().astype(np.float32)
+        return _KGGraph(node_names, node_index, subjects, objects, confidences, adjacency,
+                        propagation, token_nodes)
+    
+    def seed_vector(self, query_terms: List[str]) -> np.ndarray:
+        """Per-node count of query tokens in the node's name"""
+        graph = self._graph
+        tokens = {token for term in query_terms for token in TOKEN_PATTERN.findall(term.lower())}
+        matches = [graph.token_nodes[token] for token in tokens if token in graph.token_nodes]
+        if not matches:
+            return np.zeros(len(graph.node_names))
+        return np.bincount(np.concatenate(matches), minlength=len(graph.node_names)).astype(np.float64)
     
     def classify_relevance(self, query_terms: List[str], top_k: int = 10) -> List[Tuple[str, float]]:
-        """Classify node relevance using simple GNN-like scoring"""
-        if not self.node_features:
+        """Rank nodes by relevance propagated from the nodes matching the query terms"""
+        if self._graph is None:
             self.build_graph()
+        graph = self._graph
+        n = len(graph.node_names)
+        if n == 0 or top_k <= 0:
+            return []
+        
+        seeds = self.seed_vector(query_terms)
+        total = seeds.sum()
+        # Without a match, fall back to plain PageRank (central, well-connected nodes)
+        personalization = (seeds / total if total > 0 else np.full(n, 1.0 / n)).astype(np.float32)
+        relevance = personalization.copy()
+        for _ in range(self.iterations):
+            relevance = self.alpha * personalization + (1 - self.alpha) * (graph.propagation @ relevance)
+        
+        return [(graph.node_names[i], float(score))
+                for i, score in _top_k_descending(np.arange(n), relevance, top_k)]
+    
+    def classify_relevance_batch(self, query_term_lists: List[List[str]],
+                                 top_k: int = 10) -> List[List[Tuple[str, float]]]:
+        """classify_relevance for several queries, propagated together as one (nodes x queries) matrix"""
+        if self._graph is None:
+            self.build_graph()
+        graph = self._graph
+        n = len(graph.node_names)
+        if n == 0 or top_k <= 0 or not query_term_lists:
+            return [[] for _ in query_term_lists]
         
-        scores = {}
-        for node in self.node_features:
-            # Simple relevance score based on term matching and graph features
-            term_match = sum(1 for term in query_terms if term.lower() in node.lower())
-            degree, avg_conf = self.node_features[node]
-            
-            # Combine features for relevance score
-            scores[node] = (term_match * 2 + degree * 0.1 + avg_conf) / 3
+        seeds = np.column_stack([self.seed_vector(terms) for terms in query_term_lists])
+        totals = seeds.sum(axis=0)
+        personalization = np.where(totals > 0, seeds / np.where(totals > 0, totals, 1.0), 1.0 / n).astype(np.float32)
+        relevance = personalization.copy()
+        for _ in range(self.iterations):
+            relevance = self.alpha * personalization + (1 - self.alpha) * (graph.propagation @ relevance)
         
-        # Sort and return top-k
-        sorted_nodes = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-        return sorted_nodes[:top_k]
+        return [[(graph.node_names[i], float(score)) for i, score in ranked]
+                for ranked in _top_k_descending_batch(np.arange(n), np.ascontiguousarray(relevance.T), top_k)]
 
 class RetrievalMethods:
-    def __init__(self, documents: List[str], kg_storage, thesaurus):
-        self.sparse = SparseRetrieval(documents)
+    def __init__(self, documents: List[str], kg_storage, thesaurus, sparse=None, dense=None,
+                 executor=None, timeouts: Dict[str, float] = None):
+        # sparse/dense may be any backend with search(query, top_k), e.g. BM25Retrieval
+        # or a DenseEmbeddingRetrieval opened from a prebuilt index
+        self.sparse = sparse if sparse is not None else SparseRetrieval(documents)
         self.kg_thesaurus = KGThesaurusRetrieval(kg_storage, thesaurus)
-        self.dense = DenseEmbeddingRetrieval(documents)
+        self.dense = dense if dense is not None else DenseEmbeddingRetrieval(documents)
         self.gnn = GNNClassifier(kg_storage)
         self.documents = documents
+        # With an executor (e.g. fanout.shared_executor()) the methods run concurrently,
+        # and a method past its timeout in seconds is dropped from the results
+        self.executor = executor
+        self.timeouts = timeouts or {}
+        self.timed_out = Counter()
+        self._timed_out_lock = threading.Lock()
+    
+    def add_documents(self, texts: List[str], documents: List[str]):
+        """Append texts to the sparse and dense indexes; documents is the extended collection"""
+        self.sparse.add_documents(texts)
+        self.dense.add_documents(texts)
+        self.documents = documents
+    
+    @property
+    def pending_documents(self) -> int:
+        """Documents added since the last compaction, in the retriever furthest behind"""
+        return max(self.sparse.pending_documents, self.dense.pending_documents)
+    
+    def compact(self, documents: List[str]):
+        """Refit the sparse and dense indexes over documents and swap them in"""
+        self.sparse.compact(documents)
+        self.dense.compact(documents)
+        if self.gnn.is_built:
+            self.gnn.build_graph()
     
     def gnn_guided_sparse_search(self, query: str, top_k: int = 10) -> List[Tuple[int, float]]:
         """Use GNN to find KG entities, then sparse search articles containing those entities"""
@@ -121,10 +534,67 @@ class RetrievalMethods:
         # Perform sparse search with expanded query
         return self.sparse.search(expanded_query, top_k)
     
+    def gnn_guided_sparse_search_batch(self, queries: List[str], top_k: int = 10) -> List[List[Tuple[int, float]]]:
+        """gnn_guided_sparse_search for several queries, with one propagation and one sparse batch"""
+        gnn_entities = self.gnn.classify_relevance_batch([query.split() for query in queries], top_k)
+        expanded = [i for i, entities in enumerate(gnn_entities) if entities]
+        results = [[] for _ in queries]
+        expanded_queries = [queries[i] + " " + " ".join(entity for entity, _ in gnn_entities[i][:5]) for i in expanded]
+        for i, hits in zip(expanded, _search_batch(self.sparse, expanded_queries, top_k) if expanded else []):
+            results[i] = hits
+        return results
+    
+    def retrieval_tasks(self, query: str, top_k: int = 10) -> Dict[str, Callable[[], List]]:
+        """The independent retrieval methods for a query, as callables by method name"""
+        return {
+            'sparse': partial(self.sparse.search, query, top_k),
+            'dense': partial(self.dense.search, query, top_k),
+            'gnn': partial(self.gnn_guided_sparse_search, query, top_k)
+        }
+    
     def retrieve_all(self, query: str, top_k: int = 10) -> Dict[str, List]:
-        """Run all retrieval methods and return results"""
+        """Run all retrieval methods and return results, concurrently when an executor is set"""
+        tasks = self.retrieval_tasks(query, top_k)
+        if self.executor is None:
+            return {method: task() for method, task in tasks.items()}
+        return self.run_concurrently(tasks)
+    
+    def retrieval_batch_tasks(self, queries: List[str], top_k: int = 10) -> Dict[str, Callable[[], List[List]]]:
+        """retrieval_tasks for a batch of queries; each returns one result list per query"""
         return {
-            'sparse': self.sparse.search(query, top_k),
-            'dense': self.dense.search(query, top_k),
-            'gnn': self.gnn_guided_sparse_search(query, top_k)
-        }
\ No newline at end of file
+            'sparse': partial(_search_batch, self.sparse, queries, top_k),
+            'dense': partial(_search_batch, self.dense, queries, top_k),
+            'gnn': partial(self.gnn_guided_sparse_search_batch, queries, top_k)
+        }
+    
+    def retrieve_all_batch(self, queries: List[str], top_k: int = 10) -> List[Dict[str, List]]:
+        """retrieve_all for several queries, vectorized and scored together per method"""
+        queries = list(queries)
+        results = self.run_batch(self.retrieval_batch_tasks(queries, top_k))
+        return [{method: hits[i] for method, hits in results.items()} for i in range(len(queries))]
+    
+    def run_batch(self, tasks: Dict[str, Callable[[], object]]) -> Dict[str, object]:
+        """Run whole-batch tasks, concurrently when an executor is set; per-query timeouts do not apply"""
+        if self.executor is None:
+            return {name: task() for name, task in tasks.items()}
+        return run_tasks(tasks, self.executor)[0]
+    
+    async def retrieve_all_async(self, query: str, top_k: int = 10) -> Dict[str, List]:
+        """retrieve_all for asyncio callers; always concurrent, on the shared pool without an executor"""
+        return await self.run_concurrently_async(self.retrieval_tasks(query, top_k))
+    
+    def run_concurrently(self, tasks: Dict[str, Callable[[], object]]) -> Dict[str, object]:
+        """Run tasks on the executor with the per-method timeouts, counting the ones dropped"""
+        results, timed_out = run_tasks(tasks, self.executor, self.timeouts)
+        self._count_timeouts(timed_out)
+        return results
+    
+    async def run_concurrently_async(self, tasks: Dict[str, Callable[[], object]]) -> Dict[str, object]:
+        results, timed_out = await run_tasks_async(tasks, self.executor, self.timeouts)
+        self._count_timeouts(timed_out)
+        return results
+    
+    def _count_timeouts(self, methods: List[str]):
+        if methods:
+            with self._timed_out_lock:
+                self.timed_out.update(methods)
\ No newline at end of file
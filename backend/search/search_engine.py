@@ -1,6 +1,11 @@
-from typing import List, Dict, Tuple
+from typing import Iterator, List, Dict, Tuple, Set
 import sys
 import os
+import re
+import asyncio
+import logging
+import threading
+from functools import partial
 import numpy as np
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -9,44 +14,343 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from search.retrieval_methods import RetrievalMethods
+from search.segments import extend_documents
+from search.result_cache import ResultCache
+from search.instrumentation import StageMetrics, StageTrace
+from search.fanout import shared_executor
 from search.reciprocal_rank_fusion import ReciprocalRankFusion
 from search.cross_encoder_reranker import CrossEncoderReranker, FeatureBasedScorer, MMRReranker, EvidenceReranker
 from kg.kg_storage import KGStorage
+from kg.kg_schema import EvidenceTriple
 from thesaurus import BiologyThesaurus
 
+logger = logging.getLogger(__name__)
+
 class SpaceBiologySearchEngine:
-    def __init__(self, documents: List[str], kg_storage: KGStorage):
+    def __init__(self, documents: List[str], kg_storage: KGStorage, sparse=None, dense=None,
+                 reranker=None, compact_threshold: int = 1000, result_cache: ResultCache = None,
+                 executor=None, retriever_timeouts: Dict[str, float] = None):
+        """
+        Args:
+            documents: Document texts (a list or e.g. a PassageStore); result ids index into it
+            kg_storage: Knowledge graph storage
+            sparse: Optional sparse backend replacing the in-memory TF-IDF index
+            dense: Optional dense backend replacing the in-memory embeddings
+            reranker: Optional reranker with fit/rerank, e.g. TransformerCrossEncoderReranker;
+                defaults to the TF-IDF CrossEncoderReranker
+            compact_threshold: Added documents that trigger a background compaction
+            result_cache: Optional cache of search results, keyed by query, parameters
+                and index generation
+            executor: Optional thread pool (e.g. fanout.shared_executor()); with one the
+                retrievers and the evidence lookup run concurrently
+            retriever_timeouts: Seconds per method ('sparse', 'dense', 'gnn', 'evidence')
+                after which a concurrent method is dropped from fusion
+        """
         self.documents = documents
         self.kg_storage = kg_storage
-        self.thesaurus = BiologyThesaurus()
+        self.thesaurus = BiologyThesaurus.shared()
         
         # Initialize retrieval methods
-        self.retrieval = RetrievalMethods(documents, kg_storage, self.thesaurus)
+        self.retrieval = RetrievalMethods(documents, kg_storage, self.thesaurus, sparse=sparse, dense=dense,
+                                          executor=executor, timeouts=retriever_timeouts)
         
         # Initialize fusion and reranking
         self.rrf = ReciprocalRankFusion()
-        self.cross_encoder = CrossEncoderReranker()
+        self.cross_encoder = reranker if reranker is not None else CrossEncoderReranker()
         self.feature_scorer = FeatureBasedScorer()
-        self.mmr = MMRReranker()
+        # MMR reuses the TF-IDF document vectors of the default reranker, fitted once
+        self.document_vectors = (self.cross_encoder if isinstance(self.cross_encoder, CrossEncoderReranker)
+                                 else CrossEncoderReranker())
+        self.mmr = MMRReranker(vectors=self.document_vectors)
         self.evidence_reranker = EvidenceReranker(kg_storage)
         
         # Fit cross-encoder
+        self._fit_rerankers(documents)
+        
+        # Lookup tables for formatting KG term results, rebuilt when the KG changes
+        self._kg_generation = None
+        self._build_kg_index()
+        
+        # Incremental updates: writers serialize on _update_lock, searches never take it
+        self.compact_threshold = compact_threshold
+        self._update_lock = threading.Lock()
+        self._pending_documents = 0
+        self._compaction = None
+        self._compaction_failed = False
+        
+        # Result cache entries are keyed on index_generation; _document_generation
+        # is bumped whenever documents are added or the indexes are refitted
+        self.result_cache = result_cache
+        self._document_generation = 0
+        
+        # Per-stage latency histograms, exported by /api/metrics
+        self.metrics = StageMetrics()
+    
+    def add_documents(self, texts: List[str]) -> List[int]:
+        """
+        Make texts searchable without refitting; returns their document ids
+        
+        New documents are scored with the current vocabulary/IDF statistics
+        until the next compaction, which starts in the background once
+        compact_threshold documents have been added.
+        """
+        texts = list(texts)
+        with self._update_lock:
+            return self._add_documents(texts)
+    
+    def _add_documents(self, texts: List[str]) -> List[int]:
+        """add_documents with _update_lock held by the caller"""
+        start = len(self.documents)
+        if not texts:
+            return []
+        # Publish the texts before the indexes so every returned id resolves
+        documents = extend_documents(self.documents, texts)
+        self.documents = documents
+        self.retrieval.add_documents(texts, documents)
+        self._document_generation += 1
+        self._pending_documents += len(texts)
+        if self._pending_documents >= self.compact_threshold:
+            self._start_compaction()
+        return list(range(start, start + len(texts)))
+    
+    def add_triples(self, triples: List[EvidenceTriple], add_evidence_documents: bool = False) -> List[int]:
+        """
+        Store triples and add the new ones to the KG term index and the GNN graph in place
+        
+        Re-adding a stored (subject, predicate, object, source_id) only updates
+        it, so repeated writes add no GNN edges or documents. With
+        add_evidence_documents (the KG evidence is the searched corpus), the
+        evidence of new triples is added as documents; their ids are returned.
+        """
+        triples = list(triples)
+        with self._update_lock:
+            generation, new_triples = self.kg_storage.upsert_triples(triples)
+            document_ids = []
+            if add_evidence_documents:
+                # Documents go first so the term index can resolve the evidence to them
+                document_ids = self._add_documents(self._unindexed_evidence(new_triples))
+            self._index_triples(triples, generation)
+            self.retrieval.gnn.add_triples(new_triples)
+        return document_ids
+    
+    def _unindexed_evidence(self, triples: List[EvidenceTriple]) -> List[str]:
+        """Evidence texts of triples that no document holds yet, each once"""
+        documents = self.documents
+        evidence_doc_ids = {}
+        if self._kg_generation is not None:
+            evidence_doc_ids = {evidence: doc_id for evidence, doc_id in self._kg_index[2].items()
+                                if doc_id is not None}
+        texts = []
+        for t in triples:
+            if self._evidence_doc_id(t, documents, None, evidence_doc_ids) is None:
+                texts.append(t.evidence)
+                # Later triples quoting the same evidence reuse this document
+                evidence_doc_ids[t.evidence.strip()] = -1
+        return texts
+    
+    def compact(self, wait: bool = True):
+        """
+        Refit vocabulary/IDF statistics and ANN lists over all documents
+        
+        The rebuilt indexes are swapped in when ready; searches keep using the
+        previous ones meanwhile. With wait, returns once no added document is
+        left uncompacted (or a compaction failed).
+        """
+        with self._update_lock:
+            compaction = self._start_compaction()
+        if not wait:
+            return
+        compaction.join()
+        # A compaction already running when this was called misses the documents
+        # added after it took its snapshot; run more until none are pending
+        while self.retrieval.pending_documents and not self._compaction_failed:
+            with self._update_lock:
+                compaction = self._start_compaction()
+            compaction.join()
+    
+    def _fit_rerankers(self, documents: List[str]):
         self.cross_encoder.fit(documents)
+        if self.document_vectors is not self.cross_encoder:
+            self.document_vectors.fit(documents)
+    
+    def _start_compaction(self) -> threading.Thread:
+        """Start a background compaction unless one is running (caller holds _update_lock)"""
+        if self._compaction is None or not self._compaction.is_alive():
+            self._pending_documents = 0
+            self._compaction = threading.Thread(target=self._compact, name='search-compaction', daemon=True)
+            self._compaction.start()
+        return self._compaction
+    
+    def _compact(self):
+        # Read under the lock so the sequence holds every document the retrievers
+        # have indexed; documents added later are replayed by retrieval.compact
+        with self._update_lock:
+            documents = self.documents
+        self._compaction_failed = False
+        try:
+            self.retrieval.compact(documents)
+            self._fit_rerankers(documents)
+            # Also picks up KG writes made by other processes
+            self._build_kg_index()
+        except Exception:
+            # Runs on a daemon thread, which would otherwise die silently
+            logger.exception("Compaction failed")
+            self._compaction_failed = True
+            return
+        with self._update_lock:
+            self._document_generation += 1
+    
+    @property
+    def index_generation(self) -> Tuple[int, int, int]:
+        """Changes whenever the KG, the documents or the fitted indexes change"""
+        return (self.kg_storage.get_generation(), len(self.documents), self._document_generation)
     
     def search(self, query: str, top_k: int = 10, use_mmr: bool = False) -> List[Dict]:
-        print(f"DEBUG: Search query: '{query}', top_k: {top_k}")
-        print(f"DEBUG: Query terms: {query.lower().split()}")
-        print(f"DEBUG: Documents count: {len(self.documents)}")
+        """Search, answering repeated queries from the result cache when one is configured"""
+        trace = self.metrics.trace()
+        with trace.stage('total'):
+            key, results = self._cached(query, top_k, use_mmr)
+            if results is None:
+                retrieval_results, evidence_results, complete = self._retrieve(query, top_k, trace)
+                results = self._rank(query, top_k, use_mmr, retrieval_results, evidence_results, trace)
+                # Rankings missing a timed-out method are served once, not for the cache TTL
+                if key is not None and complete:
+                    self.result_cache.put(key, results)
+        self._log_search(query, top_k, use_mmr, results, trace)
+        return results
+    
+    async def search_async(self, query: str, top_k: int = 10, use_mmr: bool = False) -> List[Dict]:
+        """
+        search for asyncio callers
+        
+        Retrievers and the evidence lookup run concurrently on the retrieval
+        executor (the shared pool if none is set), and ranking runs on it too,
+        so the event loop is never blocked by a search.
+        """
+        loop = asyncio.get_running_loop()
+        trace = self.metrics.trace()
+        with trace.stage('total'):
+            key, results = self._cached(query, top_k, use_mmr)
+            if results is None:
+                tasks = self._retrieval_tasks(query, top_k)
+                with trace.stage('retrieve'):
+                    retrieval_results = await self.retrieval.run_concurrently_async(tasks)
+                complete = len(retrieval_results) == len(tasks)
+                evidence_results = retrieval_results.pop('evidence', [])
+                results = await loop.run_in_executor(self.retrieval.executor or shared_executor(), self._rank, query,
+                                                     top_k, use_mmr, retrieval_results, evidence_results, trace)
+                if key is not None and complete:
+                    self.result_cache.put(key, results)
+        self._log_search(query, top_k, use_mmr, results, trace)
+        return results
+    
+    def search_batch(self, queries: List[str], top_k: int = 10, use_mmr: bool = False) -> List[List[Dict]]:
+        """search() for many queries; results are in query order"""
+        results = [None] * len(queries)
+        for i, query_results in self.iter_search_batch(queries, top_k, use_mmr):
+            results[i] = query_results
+        return results
+    
+    def iter_search_batch(self, queries: List[str], top_k: int = 10, use_mmr: bool = False,
+                          batch_size: int = 64) -> Iterator[Tuple[int, List[Dict]]]:
+        """
+        Search many queries, yielding (position, results) as each query finishes
+        
+        Queries are retrieved batch_size at a time: each retriever vectorizes
+        the batch in one call and scores it with one matrix product, and the
+        KG evidence of the batch is looked up on one connection. Fusion and
+        reranking then run per query, so results stream out in query order.
+        """
+        queries = list(queries)
+        for start in range(0, len(queries), batch_size):
+            chunk = queries[start:start + batch_size]
+            cached = [self._cached(query, top_k, use_mmr) for query in chunk]
+            misses = [i for i, (_, results) in enumerate(cached) if results is None]
+            retrieved, complete, kg_index = {}, True, None
+            if misses:
+                trace = self.metrics.trace()
+                with trace.stage('retrieve_batch'):
+                    batch_results, complete = self._retrieve_batch([chunk[i] for i in misses], top_k)
+                retrieved = dict(zip(misses, batch_results))
+                # One KG generation check for the whole batch
+                self._ensure_kg_index()
+                kg_index = self._kg_index
+            
+            for i, query in enumerate(chunk):
+                key, results = cached[i]
+                if results is None:
+                    retrieval_results, evidence_results = retrieved[i]
+                    trace = self.metrics.trace()
+                    results = self._rank(query, top_k, use_mmr, retrieval_results, evidence_results, trace,
+                                         kg_index=kg_index)
+                    if key is not None and complete:
+                        self.result_cache.put(key, results)
+                yield start + i, results
+    
+    def _retrieve_batch(self, queries: List[str],
+                        top_k: int) -> Tuple[List[Tuple[Dict[str, List], List[EvidenceTriple]]], bool]:
+        """
+        _retrieve for several queries, each method scoring the whole batch at once
+        
+        Returns ((results by method, evidence) per query, whether every method returned)
+        """
+        tasks = self.retrieval.retrieval_batch_tasks(queries, top_k * 2)
+        tasks['evidence'] = partial(self.evidence_reranker.get_top_evidence_batch,
+                                    [query.lower().split() for query in queries], top_k)
+        results = self.retrieval.run_batch(tasks)
+        complete = len(results) == len(tasks)
+        evidence = results.pop('evidence', [[] for _ in queries])
+        return [({method: hits[i] for method, hits in results.items()}, evidence[i])
+                for i in range(len(queries))], complete
+    
+    def _cached(self, query: str, top_k: int, use_mmr: bool) -> Tuple[str, List[Dict]]:
+        """(cache key, cached results); both None without a result cache"""
+        if self.result_cache is None:
+            return None, None
+        key = self.result_cache.make_key(query, self.index_generation, top_k=top_k, use_mmr=use_mmr)
+        return key, self.result_cache.get(key)
+    
+    def _log_search(self, query: str, top_k: int, use_mmr: bool, results: List[Dict], trace: StageTrace):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("search query=%r top_k=%d use_mmr=%s results=%d stages_ms=%s",
+                         query, top_k, use_mmr, len(results), trace.timings_ms(),
+                         extra={'query': query, 'top_k': top_k, 'stages_ms': trace.timings_ms()})
+    
+    def _retrieval_tasks(self, query: str, top_k: int) -> Dict:
+        """Retrieval methods plus the KG evidence lookup, which are all independent"""
+        tasks = self.retrieval.retrieval_tasks(query, top_k * 2)
+        tasks['evidence'] = partial(self._top_evidence, query, top_k)
+        return tasks
+    
+    def _retrieve(self, query: str, top_k: int,
+                  trace: StageTrace) -> Tuple[Dict[str, List], List[EvidenceTriple], bool]:
+        """
+        (results by retrieval method, top KG evidence triples, whether every method returned) for the query
+        """
+        if self.retrieval.executor is not None:
+            # Fan out; a method past its timeout is missing from the results
+            tasks = self._retrieval_tasks(query, top_k)
+            with trace.stage('retrieve'):
+                retrieval_results = self.retrieval.run_concurrently(tasks)
+            complete = len(retrieval_results) == len(tasks)
+            return retrieval_results, retrieval_results.pop('evidence', []), complete
         
         # Step 1: Retrieve using all methods
-        retrieval_results = self.retrieval.retrieve_all(query, top_k * 2)
-        print(f"DEBUG: Retrieval results: {retrieval_results}")
+        with trace.stage('retrieve'):
+            retrieval_results = self.retrieval.retrieve_all(query, top_k * 2)
         
         # Step 2: Get evidence-based reranking for KG results
+        with trace.stage('evidence'):
+            evidence_results = self._top_evidence(query, top_k)
+        return retrieval_results, evidence_results, True
+    
+    def _top_evidence(self, query: str, top_k: int) -> List[EvidenceTriple]:
         query_terms = query.lower().split()
-        evidence_results = self.evidence_reranker.get_top_evidence(query_terms, top_k)
-        print(f"DEBUG: Evidence results count: {len(evidence_results)}")
-        
+        return self.evidence_reranker.get_top_evidence(query_terms, top_k)
+    
+    def _rank(self, query: str, top_k: int, use_mmr: bool, retrieval_results: Dict[str, List],
+              evidence_results: List[EvidenceTriple], trace: StageTrace, kg_index: Tuple = None) -> List[Dict]:
+        """Fuse, rerank and format retrieval results; kg_index skips the KG generation check"""
         # Add evidence results to retrieval results
         if evidence_results:
             evidence_formatted = [{
@@ -57,122 +361,198 @@ class SpaceBiologySearchEngine:
             retrieval_results['evidence'] = evidence_formatted
         
         # Step 3: Fuse rankings using RRF
-        fused_results = self.rrf.fuse_retrieval_results(retrieval_results)
-        print(f"DEBUG: Fused results count: {len(fused_results)}")
+        with trace.stage('fuse'):
+            fused_results = self.rrf.fuse_retrieval_results(retrieval_results, top_n=top_k * 2)
         
         # Step 4: Cross-encoder reranking
-        cross_reranked = self.cross_encoder.rerank(
-            query, 
-            fused_results[:top_k * 2], 
-            self.documents
-        )
-        print(f"DEBUG: Cross-reranked count: {len(cross_reranked)}")
+        with trace.stage('cross_encode'):
+            cross_reranked = self.cross_encoder.rerank(
+                query, 
+                fused_results[:top_k * 2], 
+                self.documents
+            )
         
         # Step 5: Feature-based scoring enhancement
-        enhanced_results = []
-        for item_id, score in cross_reranked:
-            if isinstance(item_id, int) and item_id < len(self.documents):
-                doc_text = self.documents[item_id]
-                feature_score = self.feature_scorer.score(query, doc_text)
-                final_score = 0.6 * score + 0.4 * feature_score
-                enhanced_results.append((item_id, final_score))
-            else:
-                enhanced_results.append((item_id, score))
-        print(f"DEBUG: Enhanced results count: {len(enhanced_results)}")
+        with trace.stage('feature_score'):
+            enhanced_results = []
+            for item_id, score in cross_reranked:
+                if isinstance(item_id, (int, np.integer)) and item_id < len(self.documents):
+                    doc_text = self.documents[item_id]
+                    feature_score = self.feature_scorer.score(query, doc_text)
+                    final_score = 0.6 * score + 0.4 * feature_score
+                    enhanced_results.append((item_id, final_score))
+                else:
+                    enhanced_results.append((item_id, score))
         
         # Step 6: MMR for diversity (optional)
         if use_mmr:
-            print(f"DEBUG: Using MMR with {len(enhanced_results)} enhanced results")
-            final_results = self.mmr.rerank_with_mmr(
-                query, 
-                enhanced_results, 
-                self.documents, 
-                top_k
-            )
+            with trace.stage('mmr'):
+                final_results = self.mmr.rerank_with_mmr(
+                    query, 
+                    enhanced_results, 
+                    self.documents, 
+                    top_k
+                )
         else:
             final_results = sorted(enhanced_results, key=lambda x: x[1], reverse=True)[:top_k]
-        print(f"DEBUG: Final results count: {len(final_results)}")
-        print(f"DEBUG: Final results: {final_results}")
         
         # Format results - find document IDs and associated triples
-        formatted_results = []
-        
-        for item_id, score in final_results:
-            print(f"DEBUG: Processing item_id: {item_id}, type: {type(item_id)}, score: {score}")
-            if (isinstance(item_id, (int, np.integer)) and int(item_id) < len(self.documents)):
-                print(f"DEBUG: Processing as document ID: {item_id}")
-                # Document result
-                doc_text = self.documents[int(item_id)]
-                result = {
-                    'document_id': int(item_id),
-                    'document': doc_text[:500] + "..." if len(doc_text) > 500 else doc_text,
-                    'score': score,
-                    'type': 'document'
-                }
-                print(f"DEBUG: Added document result for ID {item_id}")
-                formatted_results.append(result)
-            else:
-                # KG result - find associated document and triple
-                term = str(item_id)
-                print(f"DEBUG: Processing KG term: {term}")
-                
-                # Find triples containing this term
-                triples = self.kg_storage.get_evidence_triples_ranked(0.0)
-                print(f"DEBUG: Found {len(triples)} total triples for term '{term}'")
-                if len(triples) > 0:
-                    print(f"DEBUG: First triple example: {triples[0].subject} -> {triples[0].predicate} -> {triples[0].object}")
-                    print(f"DEBUG: First triple evidence: {triples[0].evidence[:100] if triples[0].evidence else 'None'}...")
-                matching_triple = None
-                doc_id = None
-                
-                for t in triples:
-                    # Check if term matches or if evidence contains the term
-                    term_match = (term.lower() in t.subject.lower() or 
-                                 term.lower() in t.object.lower() or
-                                 (t.evidence and term.lower() in str(t.evidence).lower()))
-                    
-                    if term_match or not matching_triple:  # Take first triple if no exact match
-                        matching_triple = t
-                        print(f"DEBUG: Checking triple for document match: {t.subject} -> {t.predicate} -> {t.object}")
-                        
-                        # Find document ID by matching evidence text
-                        for i, doc in enumerate(self.documents):
-                            if t.evidence and t.evidence.strip() in doc:
-                                doc_id = i
-                                print(f"DEBUG: Found document match at ID {doc_id}")
-                                break
-                        
-                        if doc_id is not None:
-                            break  # Found a match, stop looking
-                
-                if doc_id is not None and doc_id < len(self.documents):
-                    doc_text = self.documents[doc_id]
-                    result = {
-                        'document_id': doc_id,
-                        'document': doc_text[:500] + "..." if len(doc_text) > 500 else doc_text,
-                        'score': score,
-                        'type': 'document_with_triple'
-                    }
-                    if matching_triple:
-                        result['triple'] = {
-                            'subject': matching_triple.subject,
-                            'predicate': matching_triple.predicate,
-                            'object': matching_triple.object,
-                            'confidence': matching_triple.confidence
-                        }
-                    formatted_results.append(result)
-                else:
-                    # Fallback for terms without document match
-                    print(f"DEBUG: No document match found for term '{term}', using fallback")
-                    formatted_results.append({
-                        'term': term,
-                        'score': score,
-                        'type': 'knowledge_graph_term'
-                    })
-        
-        print(f"DEBUG: Formatted results count: {len(formatted_results)}")
+        with trace.stage('format'):
+            formatted_results = [self._format_result(item_id, score, kg_index) for item_id, score in final_results]
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("search query=%r retrieved=%s evidence=%d fused=%d reranked=%d final=%d",
+                         query, {method: len(items) for method, items in retrieval_results.items()},
+                         len(evidence_results), len(fused_results), len(cross_reranked), len(final_results))
         return formatted_results
     
+    def _format_result(self, item_id, score, kg_index: Tuple = None) -> Dict:
+        """Format a fused item as a document, document-with-triple or KG term result"""
+        if (isinstance(item_id, (int, np.integer)) and int(item_id) < len(self.documents)):
+            # Document result
+            return dict(self._document_fields(int(item_id)), score=score, type='document')
+        
+        # KG result - find associated document and triple
+        term = str(item_id)
+        if kg_index is None:
+            self._ensure_kg_index()
+            kg_index = self._kg_index
+        term_triples, default_triple, _ = kg_index
+        match = term_triples.get(term.lower(), default_triple)
+        
+        if match is None:
+            # Fallback for terms without document match
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("no document match for KG term %r", term)
+            return {
+                'term': term,
+                'score': score,
+                'type': 'knowledge_graph_term'
+            }
+        
+        triple, doc_id = match
+        return {
+            **self._document_fields(doc_id),
+            'score': score,
+            'type': 'document_with_triple',
+            'triple': {
+                'subject': triple.subject,
+                'predicate': triple.predicate,
+                'object': triple.object,
+                'confidence': triple.confidence
+            }
+        }
+    
+    def _document_fields(self, doc_id: int) -> Dict:
+        """Document id and text preview, plus the source paper and section for passages"""
+        doc_text = self.documents[doc_id]
+        fields = {
+            'document_id': doc_id,
+            'document': doc_text[:500] + "..." if len(doc_text) > 500 else doc_text,
+        }
+        if hasattr(self.documents, 'paper_id') and self.documents.paper_id(doc_id) is not None:
+            fields['paper_id'] = self.documents.paper_id(doc_id)
+            fields['section'] = self.documents.section(doc_id)
+        return fields
+    
+    def _ensure_kg_index(self):
+        """Rebuild the KG lookup tables if the stored KG changed since they were built"""
+        generation = self.kg_storage.get_generation()
+        if generation != self._kg_generation:
+            self._build_kg_index(generation)
+    
+    def _build_kg_index(self, generation: int = None):
+        """
+        Build the evidence -> document id map and the term -> triple index
+        
+        Triples are visited in confidence order, so each term keeps the most
+        confident triple whose evidence occurs in a document.
+        """
+        if generation is None:
+            generation = self.kg_storage.get_generation()
+        
+        # A passage store resolves evidence itself, searching the source paper's
+        # passages first, so its texts are never all materialized here
+        documents = self.documents
+        doc_ids = {}
+        if not hasattr(documents, 'find_passage'):
+            for i, doc in enumerate(documents):
+                doc_ids.setdefault(doc, i)
+                doc_ids.setdefault(doc.strip(), i)
+        
+        evidence_doc_ids = {}
+        term_triples = {}
+        default_triple = None
+        for t in self.kg_storage.get_evidence_triples_ranked(0.0):
+            doc_id = self._evidence_doc_id(t, documents, doc_ids, evidence_doc_ids)
+            if doc_id is None:
+                continue
+            
+            match = (t, doc_id)
+            if default_triple is None:
+                default_triple = match
+            for key in self._triple_terms(t):
+                term_triples.setdefault(key, match)
+        
+        self._kg_index = (term_triples, default_triple, evidence_doc_ids)
+        self._kg_generation = generation
+    
+    def _index_triples(self, triples: List[EvidenceTriple], generation: int):
+        """
+        Add newly stored triples to a copy of the KG term index and swap it in
+        
+        A term moves to a new triple only if it is more confident, as in a full
+        build; an upsert that lowers a confidence is settled by the next compaction.
+        """
+        if self._kg_generation is None:
+            self._build_kg_index(generation)
+            return
+        documents = self.documents
+        term_triples, default_triple, evidence_doc_ids = self._kg_index
+        term_triples = dict(term_triples)
+        # Evidence not found before is looked up again: documents may have been added since
+        evidence_doc_ids = {evidence: doc_id for evidence, doc_id in evidence_doc_ids.items() if doc_id is not None}
+        for t in sorted(triples, key=lambda t: t.confidence, reverse=True):
+            doc_id = self._evidence_doc_id(t, documents, None, evidence_doc_ids)
+            if doc_id is None:
+                continue
+            
+            match = (t, doc_id)
+            if default_triple is None or t.confidence > default_triple[0].confidence:
+                default_triple = match
+            for key in self._triple_terms(t):
+                current = term_triples.get(key)
+                if current is None or t.confidence > current[0].confidence:
+                    term_triples[key] = match
+        
+        self._kg_index = (term_triples, default_triple, evidence_doc_ids)
+        self._kg_generation = generation
+    
+    @staticmethod
+    def _evidence_doc_id(triple, documents, doc_ids: Dict, evidence_doc_ids: Dict):
+        """Document id holding the triple's evidence, memoized in evidence_doc_ids"""
+        if not triple.evidence or not triple.evidence.strip():
+            return None
+        evidence = triple.evidence.strip()
+        if evidence not in evidence_doc_ids:
+            if hasattr(documents, 'find_passage'):
+                doc_id = documents.find_passage(evidence, triple.source_id)
+            else:
+                doc_id = doc_ids.get(evidence) if doc_ids else None
+                if doc_id is None:
+                    # Evidence quoted from inside a longer document
+                    doc_id = next((i for i, doc in enumerate(documents) if evidence in doc), None)
+            evidence_doc_ids[evidence] = doc_id
+        return evidence_doc_ids[evidence]
+    
+    @staticmethod
+    def _triple_terms(triple) -> Set[str]:
+        """Lowercased keys a KG term can be looked up by for this triple"""
+        keys = {triple.subject.lower(), triple.object.lower()}
+        for text in (triple.subject, triple.object, triple.evidence):
+            keys.update(re.findall(r"[a-z0-9]+", text.lower()))
+        return keys
+    
     def get_method_results(self, query: str, top_k: int = 10) -> Dict:
         """Get results from individual retrieval methods for analysis"""
         return self.retrieval.retrieve_all(query, top_k)
\ No newline at end of file
@@ -0,0 +1,128 @@
+from abc import ABC, abstractmethod
+from typing import Iterator, List, Optional, Sequence
+import threading
+
+class DocumentSegments:
+    """
+    Read-only document sequence (e.g. a PassageStore) followed by appended texts
+
+    Appending returns a new DocumentSegments, so a reader holding the old one
+    keeps a consistent view while documents are added.
+    """
+
+    def __init__(self, base: Sequence[str], appended: tuple = ()):
+        self.base = base
+        self.appended = appended
+
+    def __len__(self) -> int:
+        return len(self.base) + len(self.appended)
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        if i < len(self.base):
+            return self.base[i]
+        return self.appended[i - len(self.base)]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.base
+        yield from self.appended
+
+    def paper_id(self, i: int) -> Optional[str]:
+        if i < len(self.base) and hasattr(self.base, 'paper_id'):
+            return self.base.paper_id(i)
+        return None
+
+    def section(self, i: int) -> Optional[str]:
+        if i < len(self.base) and hasattr(self.base, 'section'):
+            return self.base.section(i)
+        return None
+
+    def find_passage(self, text: str, paper_id: str = None) -> Optional[int]:
+        """Id of the first document containing text, searching the base first"""
+        if hasattr(self.base, 'find_passage'):
+            hit = self.base.find_passage(text, paper_id)
+        else:
+            hit = next((i for i, doc in enumerate(self.base) if text in doc), None)
+        if hit is not None:
+            return hit
+        return next((len(self.base) + i for i, doc in enumerate(self.appended) if text in doc), None)
+
+def extend_documents(documents: Sequence[str], texts: List[str]) -> Sequence[str]:
+    """New document sequence with texts appended; documents itself is left unchanged"""
+    if isinstance(documents, list):
+        return documents + list(texts)
+    if isinstance(documents, DocumentSegments):
+        return DocumentSegments(documents.base, documents.appended + tuple(texts))
+    return DocumentSegments(documents, tuple(texts))
+
+def iter_head(documents: Sequence[str], n: int) -> Iterator[str]:
+    """Stream documents[0:n] without slicing (stores are not sliceable)"""
+    for i in range(n):
+        yield documents[i]
+
+class SegmentedRetriever(ABC):
+    """
+    Copy-on-write base for retrievers that take incremental updates
+
+    A retriever's searchable state is one immutable snapshot, self._state:
+    a base segment with frozen vocabulary/IDF statistics plus a small delta
+    segment of appended documents scored with those same statistics.
+    Searches read self._state once and never lock; writers build a new
+    snapshot under self._lock and publish it with a single assignment.
+    compact() refits the statistics over every document off the lock and
+    swaps the result in, replaying documents that arrived meanwhile.
+
+    Subclasses keep the delta texts in state.delta_texts and implement
+    _append(state, texts) and _rebuild(state, documents).
+    """
+
+    def _init_segments(self, state):
+        self._state = state
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+
+    @property
+    def num_docs(self) -> int:
+        return self._state.num_docs
+
+    @property
+    def pending_documents(self) -> int:
+        """Documents in the delta segment, waiting for the next compaction"""
+        return len(self._state.delta_texts)
+
+    def add_documents(self, texts: List[str]):
+        """Append documents; they get ids num_docs, num_docs + 1, ..."""
+        texts = list(texts)
+        if not texts:
+            return
+        with self._lock:
+            self._state = self._append(self._state, texts)
+
+    def compact(self, documents: Sequence[str]):
+        """
+        Rebuild the statistics over documents[:num_docs] and merge the delta into the base
+
+        Args:
+            documents: Every document in id order, including the appended ones
+        """
+        with self._compact_lock:
+            snapshot = self._state
+            if not snapshot.delta_texts:
+                return
+            missing = snapshot.num_docs - len(documents)
+            if missing > 0:
+                # Appended after the caller read documents; the delta holds their texts
+                documents = extend_documents(documents, list(snapshot.delta_texts[-missing:]))
+            rebuilt = self._rebuild(snapshot, documents)
+            with self._lock:
+                arrived = self._state.delta_texts[len(snapshot.delta_texts):]
+                self._state = self._append(rebuilt, list(arrived)) if arrived else rebuilt
+
+    @abstractmethod
+    def _append(self, state, texts: List[str]):
+        """New state with texts scored by state's statistics and added to its delta"""
+
+    @abstractmethod
+    def _rebuild(self, state, documents: Sequence[str]):
+        """New state with statistics refitted over documents[:state.num_docs] and an empty delta"""
@@ -0,0 +1,175 @@
+from typing import List, Tuple, Optional
+from collections import OrderedDict
+import hashlib
+import threading
+import time
+import numpy as np
+
+try:
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+    HAS_TRANSFORMERS = True
+except ImportError:
+    HAS_TRANSFORMERS = False
+
+class ScoreCache:
+    """Thread-safe LRU map of (query hash, passage id) -> cross-encoder score"""
+
+    def __init__(self, maxsize: int = 50000):
+        self.maxsize = maxsize
+        self._scores = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key) -> Optional[float]:
+        with self._lock:
+            score = self._scores.get(key)
+            if score is None:
+                self.misses += 1
+                return None
+            self._scores.move_to_end(key)
+            self.hits += 1
+            return score
+
+    def put(self, key, score: float):
+        with self._lock:
+            self._scores[key] = score
+            self._scores.move_to_end(key)
+            while len(self._scores) > self.maxsize:
+                self._scores.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+def query_hash(query: str) -> bytes:
+    """Cache key for a query; whitespace differences do not change it"""
+    return hashlib.blake2b(" ".join(query.split()).encode('utf-8'), digest_size=8).digest()
+
+class TransformerCrossEncoderReranker:
+    """
+    Reranks candidates with a local transformer cross-encoder on CPU
+
+    Drop-in replacement for CrossEncoderReranker (same fit/rerank interface).
+    Query-passage pairs are scored in length-bucketed batches, each padded
+    only to its own longest pair, with passages truncated to max_length
+    tokens. Scores are cached per (query, passage id), so repeated and
+    paginated queries only score new passages.
+
+    With a deadline, candidates are scored in fused order, one window of
+    batches at a time; once the next window would overrun the deadline,
+    the remaining candidates keep their fused order below the reranked ones.
+    """
+
+    def __init__(self, model_path: str, batch_size: int = 16, max_length: int = 256,
+                 cache_size: int = 50000, deadline_ms: float = None, window: int = 64):
+        """
+        Args:
+            model_path: Local directory of a sequence-classification cross-encoder
+                (e.g. a downloaded cross-encoder/ms-marco-MiniLM-L-6-v2)
+            batch_size: Pairs per forward pass
+            max_length: Token budget per query-passage pair; passages are truncated to fit
+            cache_size: Entries in the (query hash, passage id) -> score LRU cache
+            deadline_ms: Default time budget per rerank call; None scores every candidate
+            window: Candidates length-bucketed together; the deadline is checked per window
+        """
+        if not HAS_TRANSFORMERS:
+            raise ImportError("transformers and torch are required for TransformerCrossEncoderReranker")
+        self.model_path = model_path
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.deadline_ms = deadline_ms
+        self.window = window
+        self.cache = ScoreCache(cache_size)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        self.model = AutoModelForSequenceClassification.from_pretrained(model_path)
+        self.model.eval()
+        # Rough cap before tokenizing so long passages are not tokenized in full
+        self.max_chars = max_length * 8
+        self._seconds_per_pair = None
+
+    def fit(self, documents: List[str]):
+        """Nothing to fit; kept for interface compatibility with CrossEncoderReranker"""
+
+    def score_pairs(self, query: str, texts: List[str]) -> np.ndarray:
+        """Relevance probabilities for (query, text) pairs, batched by token length"""
+        if not texts:
+            return np.zeros(0, dtype=np.float32)
+        encoded = self.tokenizer([query] * len(texts), [text[:self.max_chars] for text in texts],
+                                 truncation='only_second', max_length=self.max_length)
+        features = [{key: values[i] for key, values in encoded.items()} for i in range(len(texts))]
+        # Similar lengths share a batch, so little of each batch is padding
+        order = sorted(range(len(texts)), key=lambda i: len(features[i]['input_ids']))
+        scores = np.zeros(len(texts), dtype=np.float32)
+        with torch.inference_mode():
+            for start in range(0, len(order), self.batch_size):
+                batch_ids = order[start:start + self.batch_size]
+                batch = self.tokenizer.pad([features[i] for i in batch_ids], return_tensors='pt')
+                logits = self.model(**batch).logits
+                if logits.shape[-1] == 1:
+                    probabilities = torch.sigmoid(logits[:, 0])
+                else:
+                    probabilities = torch.softmax(logits, dim=-1)[:, -1]
+                scores[batch_ids] = probabilities.float().numpy()
+        return scores
+
+    def rerank(self, query: str, candidates: List[Tuple], documents: List[str] = None,
+               deadline_ms: float = None) -> List[Tuple]:
+        """
+        Rerank candidates using cross-encoder scores
+
+        Args:
+            query: Search query
+            candidates: List of (item_id, initial_score) tuples in fused order
+            documents: Optional list of documents for item_ids that are indices
+            deadline_ms: Time budget for this call; defaults to self.deadline_ms
+        """
+        if not candidates:
+            return []
+        deadline_ms = self.deadline_ms if deadline_ms is None else deadline_ms
+        deadline = None if deadline_ms is None else time.perf_counter() + deadline_ms / 1000.0
+        qhash = query_hash(query)
+
+        cross_scores = [self.cache.get((qhash, self._passage_key(item_id))) for item_id, _ in candidates]
+        scored_until = 0
+        for start in range(0, len(candidates), self.window):
+            end = min(start + self.window, len(candidates))
+            missing = [i for i in range(start, end) if cross_scores[i] is None]
+            if missing and deadline is not None:
+                expected = len(missing) * (self._seconds_per_pair or 0.0)
+                if time.perf_counter() + expected > deadline:
+                    break
+            if missing:
+                began = time.perf_counter()
+                texts = [self._passage_text(candidates[i][0], documents) for i in missing]
+                for i, score in zip(missing, self.score_pairs(query, texts).tolist()):
+                    cross_scores[i] = score
+                    self.cache.put((qhash, self._passage_key(candidates[i][0])), score)
+                self._record_speed((time.perf_counter() - began) / len(missing))
+            scored_until = end
+
+        reranked = [(item_id, 0.7 * cross_scores[i] + 0.3 * initial_score)
+                    for i, (item_id, initial_score) in enumerate(candidates[:scored_until])]
+        reranked.sort(key=lambda x: x[1], reverse=True)
+        # Past the deadline: fused order, scored as if the cross-encoder gave 0
+        reranked.extend((item_id, 0.3 * initial_score) for item_id, initial_score in candidates[scored_until:])
+        return reranked
+
+    def _record_speed(self, seconds_per_pair: float):
+        """Exponential moving average used to predict whether a window fits the deadline"""
+        if self._seconds_per_pair is None:
+            self._seconds_per_pair = seconds_per_pair
+        else:
+            self._seconds_per_pair = 0.8 * self._seconds_per_pair + 0.2 * seconds_per_pair
+
+    @staticmethod
+    def _passage_key(item_id):
+        if isinstance(item_id, (int, np.integer)):
+            return int(item_id)
+        return hashlib.blake2b(str(item_id).encode('utf-8'), digest_size=8).digest()
+
+    @staticmethod
+    def _passage_text(item_id, documents: List[str] = None) -> str:
+        if documents and isinstance(item_id, (int, np.integer)):
+            return documents[item_id]
+        return str(item_id)
@@ -0,0 +1,79 @@
+"""Local stand-in for Ollama's /api/generate, shared by the tests and the benchmarks"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Union
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, as Ollama serves
+
+    def do_POST(self):
+        fake = self.server.fake
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with fake.lock:
+            fake.requests += 1
+            fake.connections.add(self.client_address)
+            fake.prompts.append(request['prompt'])
+            fail = fake.fail_every and fake.requests % fake.fail_every == 0
+        time.sleep(fake.latency)
+        answer = 503 if fail else fake.respond(request['prompt'])
+
+        if isinstance(answer, int):
+            self._send(answer, 'application/json', json.dumps({"error": f"HTTP {answer}"}))
+        elif request.get('stream', True):
+            # Streamed as NDJSON: the text, then the closing line
+            lines = [{"model": request['model'], "response": answer, "done": False},
+                     {"model": request['model'], "response": "", "done": True, "done_reason": "stop"}]
+            self._send(200, 'application/x-ndjson', "".join(json.dumps(line) + "\n" for line in lines))
+        else:
+            self._send(200, 'application/json',
+                       json.dumps({"model": request['model'], "response": answer, "done": True}))
+
+    def _send(self, status: int, content_type: str, body: str):
+        body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 64  # the default of 5 refuses bursts of new connections
+
+class FakeOllama:
+    """
+    Answers /api/generate on a local port with respond(prompt) after `latency` seconds
+
+    respond returns the generated text, or an int to answer with that HTTP
+    status instead; every fail_every-th request is answered with a 503.
+    Use as a context manager; url is the base URL to give the client.
+    """
+
+    def __init__(self, respond: Callable[[str], Union[str, int]], latency: float = 0.0, fail_every: int = 0):
+        self.respond = respond
+        self.latency = latency
+        self.fail_every = fail_every
+        self.lock = threading.Lock()
+        self.reset()
+        self._server = _Server(('127.0.0.1', 0), _Handler)
+        self._server.fake = self
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def reset(self):
+        """Forget the requests counted so far"""
+        self.requests = 0
+        self.connections = set()
+        self.prompts = []
+
+    def __enter__(self) -> 'FakeOllama':
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,84 @@
+import sys
+import os
+import json
+import re
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kg.kg_builder import KnowledgeGraphBuilder, ExtractionJournal
+from kg.kg_storage import KGStorage
+from tests.fake_ollama import FakeOllama
+
+def extraction(prompt):
+    """One relation per chunk, named after the marker word in the chunk text"""
+    marker = re.search(r"\b(?:paper|intro|results)\d+\b", prompt).group()
+    return json.dumps({
+        "entities": [{"id": "e1", "type": "condition", "name": "microgravity", "properties": {}}],
+        "relations": [{"subject": "e1", "predicate": "affects", "object": marker,
+                       "confidence": 0.8, "evidence": f"{marker} evidence"}]
+    })
+
+PAPERS = [(f"PMC{i}", f"paper{i} measured bone density in mice after flight.") for i in range(4)]
+
+def build(server, tmp_path, papers=PAPERS, workers=2, max_chunk_tokens=1000):
+    builder = KnowledgeGraphBuilder(base_url=server.url, cache_dir=str(tmp_path / 'cache'),
+                                    max_chunk_tokens=max_chunk_tokens)
+    storage = KGStorage(str(tmp_path / 'kg.db'))
+    builder.build_from_publications(papers, workers=workers, storage=storage,
+                                    journal_path=str(tmp_path / 'journal.jsonl'))
+    return builder.last_stats, storage
+
+def test_restart_skips_stored_papers(tmp_path):
+    with FakeOllama(extraction) as server:
+        stats, storage = build(server, tmp_path)
+        assert (stats.extracted, stats.failed) == (4, 0)
+        assert sorted(t.source_id for t in storage.get_all_triples()) == [p for p, _ in PAPERS]
+
+        server.reset()
+        stats, _ = build(server, tmp_path)
+        assert (stats.extracted, stats.skipped) == (0, 4)
+        assert server.requests == 0
+
+def test_failed_request_is_retried_on_restart(tmp_path):
+    down = {'paper2'}
+
+    def respond(prompt):
+        return 500 if any(marker in prompt for marker in down) else extraction(prompt)
+
+    with FakeOllama(respond) as server:
+        stats, _ = build(server, tmp_path)
+        assert (stats.extracted, stats.failed) == (3, 1)
+        assert ExtractionJournal(str(tmp_path / 'journal.jsonl')).completed() == {'PMC0', 'PMC1', 'PMC3'}
+
+        down.clear()
+        server.reset()
+        stats, storage = build(server, tmp_path)
+        assert (stats.extracted, stats.skipped, stats.failed) == (1, 3, 0)
+        assert server.requests == 1
+        assert len(storage.get_all_triples()) == 4
+
+def test_unparseable_chunk_is_asked_again_on_restart(tmp_path):
+    # Two sections, so the paper is extracted in two chunks
+    paper = ("PMC7", "Introduction\nintro7 spaceflight alters bone.\n\nResults\nresults7 mice lost bone density.")
+    garbled = {'results7'}
+
+    def respond(prompt):
+        return "not json" if any(marker in prompt for marker in garbled) else extraction(prompt)
+
+    with FakeOllama(respond) as server:
+        builder = KnowledgeGraphBuilder(base_url=server.url, max_chunk_tokens=12)
+        assert len(builder.chunk_text(paper[1])) == 2
+        stats, _ = build(server, tmp_path, [paper], workers=1, max_chunk_tokens=12)
+        assert (stats.extracted, stats.incomplete) == (1, 1)
+        assert ExtractionJournal(str(tmp_path / 'journal.jsonl')).completed() == set()
+
+        # Only the failed chunk is sent again; the other comes from the cache
+        garbled.clear()
+        server.reset()
+        stats, storage = build(server, tmp_path, [paper], workers=1, max_chunk_tokens=12)
+        assert (stats.extracted, stats.incomplete) == (1, 0)
+        assert server.requests == 1 and 'results7' in server.prompts[0]
+        assert {t.object for t in storage.get_all_triples()} == {'intro7', 'results7'}
+
+        server.reset()
+        stats, _ = build(server, tmp_path, [paper], workers=1, max_chunk_tokens=12)
+        assert stats.skipped == 1 and server.requests == 0
@@ -0,0 +1,81 @@
+import sys
+import os
+import asyncio
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from organize_using_gemma import GemmaClient, process_files_with_gemma
+from tests.fake_ollama import FakeOllama
+
+ANSWER = "Title: Bone loss in spaceflight\nAuthors: A Author, B Author"
+
+def write_papers(input_dir: Path, pmc_ids):
+    input_dir.mkdir()
+    for pmc_id in pmc_ids:
+        (input_dir / f'{pmc_id}.txt').write_text(f"Front matter of {pmc_id}\nAbstract\nBody of {pmc_id}.",
+                                                 encoding='utf-8')
+
+def organize(server, tmp_path, **client_args):
+    client = GemmaClient(server.url, backoff=0.0, **client_args)
+    try:
+        return asyncio.run(process_files_with_gemma(tmp_path / 'unsorted', tmp_path / 'out', tmp_path / 'sorted',
+                                                    client))
+    finally:
+        client.close()
+
+def test_retries_503_and_writes_each_paper(tmp_path):
+    write_papers(tmp_path / 'unsorted', ['PMC1', 'PMC2', 'PMC3'])
+    seen = set()
+
+    def respond(prompt):
+        # Each prompt fails once before it is answered
+        if prompt not in seen:
+            seen.add(prompt)
+            return 503
+        return ANSWER
+
+    with FakeOllama(respond) as server:
+        assert organize(server, tmp_path, concurrency=2) == 3
+        assert server.requests == 6
+
+    for pmc_id in ['PMC1', 'PMC2', 'PMC3']:
+        cleaned = (tmp_path / 'out' / f'{pmc_id}_gemma_cleaned.txt').read_text(encoding='utf-8')
+        assert cleaned.startswith("Title: Bone loss in spaceflight\n\nAuthors: A Author, B Author\n\nAbstract")
+        assert (tmp_path / 'sorted' / f'{pmc_id}.txt').read_text(encoding='utf-8') == cleaned
+
+def test_skips_papers_already_written(tmp_path):
+    write_papers(tmp_path / 'unsorted', ['PMC1', 'PMC2'])
+    with FakeOllama(lambda prompt: ANSWER) as server:
+        assert organize(server, tmp_path) == 2
+        server.reset()
+        assert organize(server, tmp_path) == 0
+        assert server.requests == 0
+
+def test_failed_paper_is_not_written_and_retried_next_run(tmp_path):
+    write_papers(tmp_path / 'unsorted', ['PMC1', 'PMC2'])
+    broken = {'PMC2'}
+
+    def respond(prompt):
+        return 503 if any(pmc_id in prompt for pmc_id in broken) else ANSWER
+
+    with FakeOllama(respond) as server:
+        assert organize(server, tmp_path, retries=2) == 1
+        # The first attempt and both retries
+        assert sum('PMC2' in prompt for prompt in server.prompts) == 3
+        assert not (tmp_path / 'out' / 'PMC2_gemma_cleaned.txt').exists()
+        assert not (tmp_path / 'sorted' / 'PMC2.txt').exists()
+
+        broken.clear()
+        server.reset()
+        assert organize(server, tmp_path) == 1
+        assert server.requests == 1
+        assert (tmp_path / 'sorted' / 'PMC2.txt').exists()
+
+def test_paper_without_abstract_is_skipped_without_a_request(tmp_path):
+    input_dir = tmp_path / 'unsorted'
+    input_dir.mkdir()
+    (input_dir / 'PMC9.txt').write_text("Only front matter, no body sections.", encoding='utf-8')
+    with FakeOllama(lambda prompt: ANSWER) as server:
+        assert organize(server, tmp_path) == 0
+        assert server.requests == 0
+    assert not (tmp_path / 'out' / 'PMC9_gemma_cleaned.txt').exists()
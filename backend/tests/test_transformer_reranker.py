@@ -0,0 +1,128 @@
+import sys
+import os
+import time
+from types import SimpleNamespace
+import numpy as np
+import pytest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search.transformer_reranker import TransformerCrossEncoderReranker, ScoreCache
+
+class StubReranker(TransformerCrossEncoderReranker):
+    """Model-free reranker: a passage "passage <n>" scores n / 100, after sleeping seconds_per_pair per pair"""
+
+    def __init__(self, window: int = 4, deadline_ms: float = None, cache_size: int = 1000,
+                 seconds_per_pair: float = 0.0, batch_size: int = 16, max_length: int = 256):
+        # The fields the real constructor sets, without loading a model
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.max_chars = max_length * 8
+        self.deadline_ms = deadline_ms
+        self.window = window
+        self.cache = ScoreCache(cache_size)
+        self._seconds_per_pair = None
+        self.seconds_per_pair = seconds_per_pair
+        self.batches = []
+
+    def score_pairs(self, query, texts):
+        self.batches.append(len(texts))
+        time.sleep(self.seconds_per_pair * len(texts))
+        return np.array([int(text.split()[-1]) / 100 for text in texts], dtype=np.float32)
+
+DOCUMENTS = [f"passage {i}" for i in range(12)]
+
+def fused(ids):
+    """Candidates in fused (RRF) order with decreasing scores"""
+    return [(i, 1 / (60 + rank)) for rank, i in enumerate(ids)]
+
+def test_candidates_are_scored_one_window_at_a_time():
+    reranker = StubReranker(window=4)
+    results = reranker.rerank("bone loss", fused(range(10)), DOCUMENTS)
+    assert reranker.batches == [4, 4, 2]
+    # Higher stub scores win over the small fused scores
+    assert [item_id for item_id, _ in results] == list(range(9, -1, -1))
+
+def test_cached_scores_are_reused_for_repeated_and_paginated_queries():
+    reranker = StubReranker(window=4)
+    reranker.rerank("bone loss", fused(range(6)), DOCUMENTS)
+    assert reranker.batches == [4, 2]
+
+    reranker.batches.clear()
+    first = reranker.rerank("bone  loss ", fused(range(6)), DOCUMENTS)
+    assert reranker.batches == []
+    assert reranker.cache.hits == 6
+    assert first == reranker.rerank("bone loss", fused(range(6)), DOCUMENTS)
+
+    # The next page only scores the passages not seen yet, window by window
+    reranker.batches.clear()
+    reranker.rerank("bone loss", fused(range(10)), DOCUMENTS)
+    assert reranker.batches == [2, 2]
+
+    # Another query has its own entries
+    reranker.batches.clear()
+    reranker.rerank("radiation", fused(range(4)), DOCUMENTS)
+    assert reranker.batches == [4]
+
+def test_score_cache_evicts_the_least_recently_used():
+    cache = ScoreCache(maxsize=2)
+    cache.put('a', 0.1)
+    cache.put('b', 0.2)
+    assert cache.get('a') == 0.1
+    cache.put('c', 0.3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (0.1, 0.3)
+    assert (cache.hits, cache.misses) == (3, 1)
+
+def test_deadline_keeps_unscored_candidates_in_fused_order_below_reranked_ones():
+    # A window takes ~100 ms, so only the first one fits a 150 ms budget
+    reranker = StubReranker(window=4, deadline_ms=150, seconds_per_pair=0.025)
+    candidates = fused([5, 0, 3, 1, 11, 2, 9, 4, 6, 10, 7, 8])
+    results = reranker.rerank("bone loss", candidates, DOCUMENTS)
+
+    assert reranker.batches == [4]
+    ids = [item_id for item_id, _ in results]
+    assert ids[:4] == [5, 3, 1, 0]
+    assert ids[4:] == [item_id for item_id, _ in candidates[4:]]
+    scores = [score for _, score in results]
+    assert min(scores[:4]) > max(scores[4:])
+    assert scores[4:] == sorted(scores[4:], reverse=True)
+
+def test_cached_candidates_are_not_dropped_by_the_deadline():
+    reranker = StubReranker(window=4)
+    reranker.rerank("bone loss", fused(range(12)), DOCUMENTS)
+    reranker.batches.clear()
+    results = reranker.rerank("bone loss", fused(range(12)), DOCUMENTS, deadline_ms=0)
+    assert reranker.batches == []
+    assert [item_id for item_id, _ in results] == list(range(11, -1, -1))
+
+class FakeTokenizer:
+    """One token per word; records (pairs, padded length) of every batch"""
+
+    def __init__(self, torch):
+        self.torch = torch
+        self.batches = []
+
+    def __call__(self, queries, texts, truncation, max_length):
+        input_ids = [[1] * min(len(text.split()), max_length) for text in texts]
+        return {'input_ids': input_ids, 'attention_mask': [[1] * len(ids) for ids in input_ids]}
+
+    def pad(self, features, return_tensors):
+        width = max(len(f['input_ids']) for f in features)
+        self.batches.append((len(features), width))
+        return {key: self.torch.tensor([f[key] + [0] * (width - len(f[key])) for f in features])
+                for key in features[0]}
+
+def test_score_pairs_batches_by_length():
+    torch = pytest.importorskip('torch')
+    reranker = StubReranker(batch_size=3, max_length=8)
+    reranker.tokenizer = FakeTokenizer(torch)
+    reranker.model = lambda input_ids, attention_mask: SimpleNamespace(
+        logits=attention_mask.sum(dim=1, keepdim=True).float() - 4)
+    texts = [" ".join(["word"] * n) for n in (6, 1, 12, 3, 2, 5, 4)]
+
+    scores = TransformerCrossEncoderReranker.score_pairs(reranker, "query", texts)
+
+    # Sorted by length, so each batch pads to its own longest pair; 12 words truncate to 8
+    assert reranker.tokenizer.batches == [(3, 3), (3, 6), (1, 8)]
+    lengths = np.array([6, 1, 8, 3, 2, 5, 4], dtype=np.float32)
+    np.testing.assert_allclose(scores, 1 / (1 + np.exp(-(lengths - 4))), rtol=1e-6)
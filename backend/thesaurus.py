@@ -1,57 +1,88 @@
-from typing import List, Set
-try:
-    from goatools.obo_parser import GODag
-    HAS_GO = True
-except ImportError:
-    HAS_GO = False
+from typing import List, Set, Optional
+import os
+import threading
+from functools import lru_cache
+from go_index import GOIndex, load_or_build
+
+GO_OBO_URL = 'http://purl.obolibrary.org/obo/go/go-basic.obo'
 
 class BiologyThesaurus:
-    def __init__(self):
-        self.go_dag = None
-        
-        if HAS_GO:
-            try:
-                import os
-                if not os.path.exists('go-basic.obo'):
-                    import urllib.request
-                    urllib.request.urlretrieve(
-                        'http://purl.obolibrary.org/obo/go/go-basic.obo',
-                        'go-basic.obo'
-                    )
-                self.go_dag = GODag('go-basic.obo')
-            except Exception:
-                pass
-    
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, obo_path: str = 'go-basic.obo', index_dir: str = 'go-basic.idx',
+                 memo_size: int = 4096):
+        self.obo_path = obo_path
+        self.index_dir = index_dir
+        self._go_index = None
+        self._go_loaded = False
+        self._go_lock = threading.Lock()
+        # Memoized lookups keyed by the lowercased term
+        self._map_term_cached = lru_cache(maxsize=memo_size)(self._map_term)
+        self._synonyms_cached = lru_cache(maxsize=memo_size)(self._get_synonyms)
+
+    @classmethod
+    def shared(cls) -> 'BiologyThesaurus':
+        """Process-wide instance, so the GO index is opened once per process"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @property
+    def go_index(self) -> Optional[GOIndex]:
+        """GO index, opened on first use (and built from the OBO file if needed)"""
+        if not self._go_loaded:
+            with self._go_lock:
+                if not self._go_loaded:
+                    self._go_index = self._load_go_index()
+                    self._go_loaded = True
+        return self._go_index
+
+    def _load_go_index(self) -> Optional[GOIndex]:
+        try:
+            if not os.path.exists(self.index_dir) and not os.path.exists(self.obo_path):
+                import urllib.request
+                partial = self.obo_path + '.part'
+                urllib.request.urlretrieve(GO_OBO_URL, partial)
+                os.replace(partial, self.obo_path)
+            return load_or_build(self.obo_path, self.index_dir)
+        except Exception:
+            return None
+
     def map_term(self, term: str) -> str:
         """Map term to canonical GO form"""
-        if self.go_dag:
+        return self._map_term_cached(term.lower())
+
+    def _map_term(self, term: str) -> str:
+        if self.go_index:
             go_term = self._search_go_term(term)
             if go_term:
                 return go_term.replace(" ", "_").lower()
-        
+
         return term.lower().strip().replace(" ", "_")
-    
+
     def _search_go_term(self, term: str) -> str:
-        """Search GO ontology for term"""
-        if not self.go_dag:
+        """Search GO ontology for the first term whose name contains term"""
+        if not self.go_index:
             return None
-            
-        term_lower = term.lower()
-        for go_id, go_term in self.go_dag.items():
-            if term_lower in go_term.name.lower():
-                return go_term.name
-        return None
-    
+
+        position = self.go_index.first_term_containing(term)
+        return self.go_index.name(position) if position is not None else None
+
     def get_synonyms(self, canonical_term: str) -> List[str]:
         """Get GO synonyms for term"""
-        if not self.go_dag:
-            return []
-            
-        for go_id, go_term in self.go_dag.items():
-            if canonical_term.replace("_", " ").lower() == go_term.name.lower():
-                return list(go_term.alt_ids) if hasattr(go_term, 'alt_ids') else []
-        return []
-    
+        return list(self._synonyms_cached(canonical_term.replace("_", " ").lower()))
+
+    def _get_synonyms(self, name: str) -> tuple:
+        if not self.go_index:
+            return ()
+
+        terms = self.go_index.terms_by_name(name)
+        if len(terms) == 0:
+            return ()
+        return tuple(self.go_index.term_alt_ids(int(terms[0])))
+
     def expand_query(self, terms: List[str]) -> Set[str]:
         """Expand query terms with GO synonyms"""
         expanded = set()
@@ -59,4 +90,4 @@ class BiologyThesaurus:
             canonical = self.map_term(term)
             expanded.add(canonical)
             expanded.update(self.get_synonyms(canonical))
-        return expanded
\ No newline at end of file
+        return expanded
@@ -1,35 +1,43 @@
 #!/usr/bin/env python3
 """
 Use Gemma to accurately extract authors from NASA papers
+
+Papers are read from unsorted/ and sent to Ollama a few at a time; each
+cleaned paper is written to gemma_organized/ and published to sorted/ as
+soon as its extraction finishes, so an interrupted run keeps its progress.
+
+Usage: python3 organize_using_gemma.py [input_dir] [output_dir] [sorted_dir]
+Environment: OLLAMA_URL (default http://localhost:11434), GEMMA_MODEL,
+GEMMA_CONCURRENCY (requests in flight, default 4), GEMMA_RETRIES
 """
 
+import asyncio
 import os
-import re
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Iterable, Optional
 import requests
-import json
-import time
+from requests.adapters import HTTPAdapter
 
-def extract_title_and_authors_with_gemma(content, pmc_id):
-    """Use Gemma to extract title and authors from paper content"""
-    
-    # Find Abstract and Summary sections
+DEFAULT_URL = 'http://localhost:11434'
+DEFAULT_MODEL = 'gemma2:2b'
+
+class RetryableError(Exception):
+    """A request that may succeed when sent again (connection error, timeout, 5xx)"""
+
+def find_body_start(content):
+    """Position of the Abstract or Summary heading, whichever comes first; -1 if neither exists"""
     abstract_pos = content.lower().find('abstract')
     summary_pos = content.lower().find('summary')
-    
-    # Skip only if neither abstract nor summary is found
-    if abstract_pos == -1 and summary_pos == -1:
-        return None, None  # No abstract or summary found, skip this file
-    
-    # Use whichever comes first (or the one that exists)
     if abstract_pos != -1 and summary_pos != -1:
-        text_sample = content[:min(abstract_pos, summary_pos)]
-    elif abstract_pos != -1:
-        text_sample = content[:abstract_pos]
-    else:
-        text_sample = content[:summary_pos]
-    
-    prompt = f"""Extract the title and all author names from this scientific paper text. 
+        return min(abstract_pos, summary_pos)
+    return abstract_pos if abstract_pos != -1 else summary_pos
+
+def build_prompt(text_sample):
+    return f"""Extract the title and all author names from this scientific paper text.
 
 Return in this exact format:
 Title: [paper title]
@@ -40,122 +48,229 @@ Text:
 
 Extraction:"""
 
-    try:
-        # Using Ollama API (adjust URL if needed)
-        response = requests.post('http://localhost:11434/api/generate',
-                               json={
-                                   'model': 'gemma2:2b',
-                                   'prompt': prompt,
-                                   'stream': False,
-                                   'options': {
-                                       'temperature': 0.1,
-                                       'top_p': 0.9
-                                   }
-                               },
-                               timeout=30)
-        
-        if response.status_code == 200:
-            result = response.json()
-            response_text = result.get('response', '').strip()
-            
-            # Parse title and authors
-            title = "Unknown Title"
-            authors = []
-            
-            for line in response_text.split('\n'):
-                line = line.strip()
-                if line.startswith('Title:'):
-                    title = line.replace('Title:', '').strip()
-                elif line.startswith('Authors:'):
-                    authors_text = line.replace('Authors:', '').strip()
-                    authors = [name.strip() for name in authors_text.split(',') if name.strip()]
-                    authors = authors[:10]  # Limit to reasonable number
-            
-            return title, authors
-            
-    except Exception as e:
-        print(f"Error with Gemma for {pmc_id}: {e}")
-    
-    return "Unknown Title", []
-
-def process_files_with_gemma(input_dir, output_dir):
-    """Process files using Gemma for author extraction"""
+def parse_extraction(response_text):
+    """Title and authors from a Gemma response in the prompt's format"""
+    title = "Unknown Title"
+    authors = []
+    for line in response_text.split('\n'):
+        line = line.strip()
+        if line.startswith('Title:'):
+            title = line.replace('Title:', '').strip()
+        elif line.startswith('Authors:'):
+            authors_text = line.replace('Authors:', '').strip()
+            authors = [name.strip() for name in authors_text.split(',') if name.strip()]
+            authors = authors[:10]  # Limit to reasonable number
+    return title, authors
+
+def clean_paper(content, start_pos, title, authors):
+    """Title + Authors + content from Abstract/Summary onwards"""
+    clean_content = f"Title: {title}\n\nAuthors: "
+    if authors:
+        clean_content += ", ".join(authors)
+    else:
+        clean_content += "Could not extract"
+    return clean_content + "\n\n" + content[start_pos:]
+
+def write_atomic(path, text):
+    """Write via a temporary file so readers never see a partial paper"""
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+class GemmaClient:
+    """
+    Ollama /api/generate client for asyncio callers
+
+    One requests.Session keeps connections to the server alive; calls run on
+    the client's own pool of `concurrency` threads (the default asyncio pool
+    is sized by CPU count, not by the server), and failed requests are
+    retried with exponential backoff.
+    """
+
+    def __init__(self, base_url: str = DEFAULT_URL, model: str = DEFAULT_MODEL, concurrency: int = 4,
+                 retries: int = 3, backoff: float = 1.0, timeout: float = 60):
+        """
+        Args:
+            base_url: Ollama server URL (e.g. a local stand-in server)
+            model: Model generating the extraction
+            concurrency: Requests in flight at once
+            retries: Attempts after the first for a retryable failure
+            backoff: Seconds before the first retry, doubled for each further one
+            timeout: Seconds to wait for one response
+        """
+        self.url = base_url.rstrip('/') + '/api/generate'
+        self.model = model
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='gemma')
+
+    def close(self):
+        self.executor.shutdown()
+        self.session.close()
+
+    def _generate(self, prompt: str) -> str:
+        try:
+            response = self.session.post(self.url,
+                                         json={
+                                             'model': self.model,
+                                             'prompt': prompt,
+                                             'stream': False,
+                                             'options': {
+                                                 'temperature': 0.1,
+                                                 'top_p': 0.9
+                                             }
+                                         },
+                                         timeout=self.timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise RetryableError(str(e)) from e
+        if response.status_code >= 500 or response.status_code == 429:
+            raise RetryableError(f"HTTP {response.status_code}")
+        response.raise_for_status()
+        return response.json().get('response', '').strip()
+
+    async def generate(self, prompt: str) -> str:
+        """Response text for prompt; raises once the retries are used up"""
+        async with self.semaphore:
+            for attempt in range(self.retries + 1):
+                try:
+                    return await asyncio.get_running_loop().run_in_executor(self.executor, self._generate, prompt)
+                except RetryableError:
+                    if attempt == self.retries:
+                        raise
+                # Jitter keeps concurrent retries from hitting the server in lockstep
+                await asyncio.sleep(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+
+async def extract_title_and_authors_with_gemma(client: GemmaClient, content, pmc_id):
+    """Use Gemma to extract title and authors from paper content"""
+    start_pos = find_body_start(content)
+    # Skip only if neither abstract nor summary is found
+    if start_pos == -1:
+        return None, None  # No abstract or summary found, skip this file
+
+    response_text = await client.generate(build_prompt(content[:start_pos]))
+    return parse_extraction(response_text)
+
+async def process_file(client: GemmaClient, file_path: Path, output_file: Path, sorted_dir: Optional[Path]):
+    """Clean one paper; returns False when it has no Abstract or Summary"""
+    content = await asyncio.to_thread(file_path.read_text, encoding='utf-8')
+    title, authors = await extract_title_and_authors_with_gemma(client, content, file_path.stem)
+    if title is None:
+        return False
+    clean_content = clean_paper(content, find_body_start(content), title, authors)
+    await asyncio.to_thread(write_atomic, output_file, clean_content)
+    if sorted_dir is not None:
+        await asyncio.to_thread(write_atomic, sorted_dir / f'{file_path.stem}.txt', clean_content)
+    return True
+
+async def process_files_with_gemma(input_dir, output_dir, sorted_dir=None, client: GemmaClient = None,
+                                   progress_every: int = 10):
+    """
+    Process files using Gemma for author extraction
+
+    Files are read lazily and at most twice the client's concurrency are
+    pending, so the input directory can be large. Papers with an output file
+    are skipped; a paper whose request failed is retried by the next run.
+
+    Args:
+        input_dir: Directory of PMC*.txt papers
+        output_dir: Receives <pmc_id>_gemma_cleaned.txt for each paper
+        sorted_dir: Optional corpus directory also receiving <pmc_id>.txt
+        client: GemmaClient to use; one with the defaults is created otherwise
+        progress_every: Print throughput after this many papers
+    """
     input_path = Path(input_dir)
     output_path = Path(output_dir)
     output_path.mkdir(exist_ok=True)
-    
-    txt_files = list(input_path.glob('PMC*.txt'))
-    print(f"Processing {len(txt_files)} files with Gemma...")
-    
-    processed = 0
-    skipped_files = []
-    for file_path in txt_files:
-        pmc_id = file_path.stem
-        output_file = output_path / f'{pmc_id}_gemma_cleaned.txt'
-        
-        # Skip if already processed
-        if output_file.exists():
-            continue
-            
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Get title and authors from Gemma
-            title, authors = extract_title_and_authors_with_gemma(content, pmc_id)
-            
-            if title is None:
+    sorted_path = Path(sorted_dir) if sorted_dir else None
+    if sorted_path is not None:
+        sorted_path.mkdir(exist_ok=True)
+    own_client = client is None
+    client = client or GemmaClient()
+
+    total = sum(1 for _ in input_path.glob('PMC*.txt'))
+    print(f"Processing {total} files with Gemma ({client.concurrency} concurrent requests)...")
+
+    processed, already_done = 0, 0
+    skipped_files, failed_files = [], []
+    start = time.perf_counter()
+    pending = {}
+
+    def collect(tasks: Iterable[asyncio.Task]):
+        nonlocal processed
+        for task in tasks:
+            pmc_id = pending.pop(task)
+            try:
+                cleaned = task.result()
+            except Exception as e:
+                print(f"Error processing {pmc_id}: {e}")
+                failed_files.append(pmc_id)
+                continue
+            if not cleaned:
                 skipped_files.append(pmc_id)
                 continue
-            
-            # Find Abstract and Summary positions
-            abstract_pos = content.lower().find('abstract')
-            summary_pos = content.lower().find('summary')
-            
-            # Determine starting position (use whichever comes first)
-            if abstract_pos != -1 and summary_pos != -1:
-                start_pos = min(abstract_pos, summary_pos)
-            elif abstract_pos != -1:
-                start_pos = abstract_pos
-            else:
-                start_pos = summary_pos
-            
-            # Create clean content: Title + Authors + content from Abstract/Summary onwards
-            clean_content = f"Title: {title}\n\nAuthors: "
-            if authors:
-                clean_content += ", ".join(authors)
-            else:
-                clean_content += "Could not extract"
-            
-            clean_content += "\n\n" + content[start_pos:]
-            
-            # Write cleaned file
-            output_file = output_path / f'{pmc_id}_gemma_cleaned.txt'
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(clean_content)
-            
             processed += 1
-            if processed % 10 == 0:
-                print(f"Processed {processed}/{len(txt_files)} files...")
-                time.sleep(1)  # Brief pause to avoid overwhelming the API
-                
-        except Exception as e:
-            print(f"Error processing {file_path}: {e}")
-    
-    print(f"Completed processing {processed} files with Gemma")
+            if processed % progress_every == 0:
+                elapsed = time.perf_counter() - start
+                print(f"Processed {processed + already_done}/{total} files "
+                      f"({processed / elapsed * 60:.1f} files/min)...")
+
+    try:
+        for file_path in input_path.glob('PMC*.txt'):
+            pmc_id = file_path.stem
+            output_file = output_path / f'{pmc_id}_gemma_cleaned.txt'
+            # Skip if already processed
+            if output_file.exists():
+                already_done += 1
+                continue
+            while len(pending) >= 2 * client.concurrency:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                collect(done)
+            pending[asyncio.create_task(process_file(client, file_path, output_file, sorted_path))] = pmc_id
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            collect(done)
+    finally:
+        if own_client:
+            client.close()
+
+    elapsed = time.perf_counter() - start
+    rate = processed / elapsed * 60 if elapsed > 0 else 0.0
+    print(f"Completed processing {processed} files with Gemma in {elapsed:.1f}s ({rate:.1f} files/min), "
+          f"{already_done} already done")
     if skipped_files:
         print(f"\nSkipped {len(skipped_files)} files without 'Abstract' or 'Summary':")
         for file_id in skipped_files:
             print(f"  - {file_id}")
+    if failed_files:
+        print(f"\n{len(failed_files)} files failed and will be retried by the next run:")
+        for file_id in failed_files:
+            print(f"  - {file_id}")
+    return processed
 
 def main():
     current_dir = Path(__file__).parent
-    input_dir = current_dir
-    output_dir = current_dir / 'gemma_organized'
-    
+    input_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else current_dir / 'unsorted'
+    output_dir = Path(sys.argv[2]) if len(sys.argv) > 2 else current_dir / 'gemma_organized'
+    sorted_dir = Path(sys.argv[3]) if len(sys.argv) > 3 else current_dir / 'sorted'
+    client = GemmaClient(base_url=os.environ.get('OLLAMA_URL', DEFAULT_URL),
+                         model=os.environ.get('GEMMA_MODEL', DEFAULT_MODEL),
+                         concurrency=int(os.environ.get('GEMMA_CONCURRENCY', 4)),
+                         retries=int(os.environ.get('GEMMA_RETRIES', 3)))
+
     print("Starting Gemma-based author extraction...")
-    process_files_with_gemma(input_dir, output_dir)
+    try:
+        asyncio.run(process_files_with_gemma(input_dir, output_dir, sorted_dir, client))
+    finally:
+        client.close()
     print("Gemma processing complete!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()